@@ -19,10 +19,15 @@ from lib.DobotDLL import DobotDllType as dType
 from lib.DobotFunction.Camera import (
     DeviceNameToNum,
     ImageCvt,
+    ProcessingPipeline,
     VideoCaptureWrapper,
     WebCam_OnOff,
     SnapshotCvt,
-    Contours,
+)
+from lib.utils.ImageProcessing.CenterOfGravity import (
+    DetectCOG,
+    DetectObjects,
+    OverlayRenderer,
 )
 from lib.DobotFunction.Communication import (
     Connect_Disconnect,
@@ -141,6 +146,8 @@ class Dobot_APP:
             "z": 0.0,
             "r": 0.0,
         }  # Dobotがオブジェクトを退避させる位置
+        # 1回の撮影で複数のオブジェクトを退避させる場合の，オブジェクトごとの退避位置のずらし幅[mm]
+        self.PlacePitch = {"x": 0.0, "y": 40.0}
         self
         # カメラ座標系とロボット座標系とのキャリブレーション時の左上の位置座標
         self.Alignment_1 = {"x": None, "y": None}
@@ -158,6 +165,7 @@ class Dobot_APP:
             "rgb": None,
             "bin": None,
         }
+        self.pipeline = None  # 画像処理パイプライン(設定が変わったときのみ作り直す)
         # --- 画像プレビュー画面の初期値 --- #
         self.fig_agg = None  # 画像のヒストグラムを表示する用の変数
         self.Image_height = 240  # 画面上に表示する画像の高さ
@@ -750,7 +758,7 @@ class Dobot_APP:
             # ------------- #
             [
                 sg.InputCombo(
-                    ("None", "Global", "Otsu", "Adaptive", "Two"),
+                    ("None", "Global", "Otsu", "Adaptive", "Two", "HSV"),
                     default_value="None",
                     size=(10, 1),
                     enable_events=True,
@@ -866,6 +874,7 @@ class Dobot_APP:
                     (
                         "image",
                         "outline",
+                        "components",
                     ),
                     default_value="image",
                     size=(10, 1),
@@ -1104,7 +1113,7 @@ class Dobot_APP:
                 self.Window["-color_Bk-"].update(disabled=False)
                 self.Window["-color_None-"].update(disabled=False)
 
-            elif values["-Binarization-"] == "Two":
+            elif values["-Binarization-"] in ("Two", "HSV"):
                 self.Window["-BG_W-"].update(disabled=False)
                 self.Window["-BG_Bk-"].update(disabled=False)
                 self.Window["-thresh_prev-"].update(disabled=False)
@@ -1171,6 +1180,16 @@ class Dobot_APP:
                 self.Window["-Calc_Ellipse-"].update(disabled=False)
                 self.Window["-Calc_CNN-"].update(disabled=False)
 
+            elif values["-CalcCOGMode-"] == "components":
+                # 連結成分から求めるため，保持する輪郭情報選択ダイヤログを無効化
+                self.Window["-RetrievalMode-"].update(disabled=True)
+                # 輪郭情報の近似計算ダイヤログを無効化
+                self.Window["-ApproximateMode-"].update(disabled=True)
+                # 角度情報計算ボタンを有効化
+                self.Window["-Not_calc_ori-"].update(disabled=False)
+                self.Window["-Calc_Ellipse-"].update(disabled=False)
+                self.Window["-Calc_CNN-"].update(disabled=False)
+
         # ---------------------------------------------
         # Dobotの接続を行う
         # ---------------------------------------------
@@ -2017,6 +2036,39 @@ class Dobot_APP:
 
         return response
 
+    def GetPipeline(
+        self, values: list, color: int, bg_color: int
+    ) -> ProcessingPipeline:
+        """画面上の設定に対応する画像処理パイプラインを返す関数．
+        設定が前回と同じ場合は，構築済みのパイプラインを使い回す．
+
+        Args:
+            values (list): Window上のボタンの状態などを記録している変数
+            color (int): 抽出する色
+            bg_color (int): 背景の色
+        Returns:
+            pipeline (ProcessingPipeline): 画像処理パイプライン
+        """
+        settings = {
+            "Color_Space": values["-Color_Space-"],
+            "Color_Density": values["-Color_Density-"],
+            "Binarization": values["-Binarization-"],
+            "LowerThreshold": int(values["-LowerThreshold-"]),
+            "UpperThreshold": int(values["-UpperThreshold-"]),
+            "AdaptiveThreshold_type": values["-AdaptiveThreshold_type-"],
+            "AdaptiveThreshold_BlockSize": int(values["-AdaptiveThreshold_BlockSize-"]),
+            "AdaptiveThreshold_Constant": int(values["-AdaptiveThreshold_Constant-"]),
+            "color": color,
+            "background_color": bg_color,
+        }
+        # パイプラインは画面にない設定(モルフォロジー処理など)も既定値で保持するため，画面の設定のみ比較する
+        current = None
+        if self.pipeline is not None:
+            current = {k: self.pipeline.settings[k] for k in settings}
+        if current != settings:
+            self.pipeline = ProcessingPipeline(**settings)
+        return self.pipeline
+
     def SnapshotBtn(
         self, cam: cv2.VideoCapture, values: list, drawing: bool = True
     ) -> Tuple[np.ndarray, np.ndarray]:
@@ -2050,17 +2102,7 @@ class Dobot_APP:
             bg_color = 0
 
         err, dst, l_th, u_th = SnapshotCvt(
-            cam,
-            Color_Space=values["-Color_Space-"],
-            Color_Density=values["-Color_Density-"],
-            Binarization=values["-Binarization-"],
-            LowerThreshold=int(values["-LowerThreshold-"]),
-            UpperThreshold=int(values["-UpperThreshold-"]),
-            AdaptiveThreshold_type=values["-AdaptiveThreshold_type-"],
-            AdaptiveThreshold_BlockSize=int(values["-AdaptiveThreshold_BlockSize-"]),
-            AdaptiveThreshold_Constant=int(values["-AdaptiveThreshold_Constant-"]),
-            color=color,
-            background_color=bg_color,
+            cam, pipeline=self.GetPipeline(values, color, bg_color)
         )
 
         if err != 5:
@@ -2135,19 +2177,7 @@ class Dobot_APP:
         else:
             bg_color = 0
 
-        err, dst, l_th, u_th = ImageCvt(
-            img,
-            Color_Space=values["-Color_Space-"],
-            Color_Density=values["-Color_Density-"],
-            Binarization=values["-Binarization-"],
-            LowerThreshold=int(values["-LowerThreshold-"]),
-            UpperThreshold=int(values["-UpperThreshold-"]),
-            AdaptiveThreshold_type=values["-AdaptiveThreshold_type-"],
-            AdaptiveThreshold_BlockSize=int(values["-AdaptiveThreshold_BlockSize-"]),
-            AdaptiveThreshold_Constant=int(values["-AdaptiveThreshold_Constant-"]),
-            color=color,
-            background_color=bg_color,
-        )
+        err, dst, l_th, u_th = self.GetPipeline(values, color, bg_color).run(img)
 
         if err != 5:
             sg.popup("画像処理エラー")
@@ -2233,21 +2263,31 @@ class Dobot_APP:
         """
 
         if len(bin_img.shape) == 2 and values["-Binarization-"] != "なし":
-            COG, dst_rgb = Contours(
-                rgb_img=rgb_img.copy(),
-                bin_img=bin_img.copy(),
-                CalcCOG=str(values["-CalcCOGMode-"]),
-                Retrieval=str(values["-RetrievalMode-"]),
-                Approximate=str(values["-ApproximateMode-"]),
-                orientation=values["-Calc_Ellipse-"],
-                drawing_figure=False,
-            )
+            # 重心の計算では描画も画像のコピーも行わない
+            result = {"COG": None}
+            try:
+                result = DetectCOG(
+                    bin_img,
+                    Retrieval=str(values["-RetrievalMode-"]),
+                    Approximate=str(values["-ApproximateMode-"]),
+                    min_area=100,
+                    cal_Method=str(values["-CalcCOGMode-"]),
+                    orientation=values["-Calc_Ellipse-"],
+                )
+            except Exception as e:
+                print(f"Gravity center position calculation error: {e}")
+            COG = result["COG"]
         else:
             sg.popup(_WebCam_err[7], title="チャネルエラー")
             return 7, []
 
         if drawing:
-            self.ImageDrawingWindow(dst_rgb)
+            # 表示する場合のみ，元画像のコピーに重心位置を描画する
+            if COG is None:
+                self.ImageDrawingWindow(rgb_img)
+            else:
+                renderer = OverlayRenderer(result, bin_img, contours=False)
+                self.ImageDrawingWindow(renderer.render(rgb_img))
 
         if COG:
             self.Window["-CenterOfGravity_x-"].update(str(COG[0]))
@@ -2268,12 +2308,11 @@ class Dobot_APP:
             img (np.ndarray): 画面に表示させたい画面
             hist_img (None|np.ndarray): ヒストグラム計算用の画像．指定されない場合は，表示画像でヒストグラムを計算．
         """
-        src = img.copy()
-        src = scale_box(src, self.Image_width, self.Image_height)
+        # scale_box は新しい配列を返すため，元の画像はコピーしなくても変更されない
+        src = scale_box(img, self.Image_width, self.Image_height)
 
         if type(hist_img) is np.ndarray:
-            metrix = hist_img.copy()
-            metrix = scale_box(metrix, self.Image_width, self.Image_height)
+            metrix = scale_box(hist_img, self.Image_width, self.Image_height)
         else:
             metrix = src
 
@@ -2341,7 +2380,8 @@ class Dobot_APP:
         """
         Task1 実行関数。
         キャリブレーションありの状態
-        オブジェクトの重心位置に移動→掴む→退避 動作を実行する
+        オブジェクトの重心位置に移動→掴む→退避 動作を，1回の撮影で見つかった全てのオブジェクトに対して実行する
+        i 番目のオブジェクトは，退避位置を `PlacePitch` の i 倍ずらした位置に置く
 
         Args:
             cam(cv2.VideoCapture): 接続しているカメラ情報
@@ -2354,39 +2394,66 @@ class Dobot_APP:
             sg.popup("カメラが接続されていません。", _WebCam_err[2])
             return
 
+        # 1回の撮影で見つかった全てのオブジェクトを，面積の大きい順に掴む
         self.SnapshotBtn(cam, values, drawing=False)
-        # 画像を撮影 & 重心位置を計算
-        err, COG = self.ContoursBtn(
-            self.IMAGE["rgb"], self.IMAGE["bin"], values, drawing=False
-        )
-        if err == 7:
-            sg.popup("画像のチャネル数が不正です。", titile=_WebCam_err[err])
+        if self.IMAGE["bin"] is None:
+            return
+        if len(self.IMAGE["bin"].shape) != 2 or values["-Binarization-"] == "なし":
+            sg.popup("画像のチャネル数が不正です。", title=_WebCam_err[7])
+            return
+        objects = DetectObjects(self.IMAGE["bin"], min_area=100, sort_by="area")
+        if len(objects) == 0:
+            sg.popup("オブジェクトが見つかりませんでした。", title="エラー")
             return
 
         # 最終的に戻ってくる初期位置を保持
         init_pose = self.InitPose
-        # 現在のDobotの姿勢を取得
-        pose = self.GetPose_UpdateWindow()  # pose -> self.CurrentPose
         # ---------------------- #
         # Dobotの移動後の姿勢を計算 #
         # ---------------------- #
-        if len(self.IMAGE_Org.shape) == 2:
-            h, w = self.IMAGE_Org.shape
-        elif len(self.IMAGE_Org.shape) == 3:
-            h, w, c = self.IMAGE_Org.shape
-        try:
-            pose["x"] = (
-                self.Alignment_1["x"]
-                + COG[1] * (self.Alignment_2["x"] - self.Alignment_1["x"]) / h
-            )
-            pose["y"] = (
-                self.Alignment_1["y"]
-                + COG[0] * (self.Alignment_2["y"] - self.Alignment_1["y"]) / w
-            )
-        except ZeroDivisionError:  # ゼロ割が発生した場合
-            sg.popup("画像のサイズが計測されていません", title="エラー")
-            return
+        # 物体の重心は二値画像の座標なので，二値画像の大きさで正規化する
+        h, w = self.IMAGE["bin"].shape
+
+        for i, obj in enumerate(objects):
+            COG = [obj["cx"], obj["cy"]]
+            self.Window["-CenterOfGravity_x-"].update(str(int(COG[0])))
+            self.Window["-CenterOfGravity_y-"].update(str(int(COG[1])))
+            # 現在のDobotの姿勢を取得
+            pose = self.GetPose_UpdateWindow()  # pose -> self.CurrentPose
+            try:
+                pose["x"] = (
+                    self.Alignment_1["x"]
+                    + COG[1] * (self.Alignment_2["x"] - self.Alignment_1["x"]) / h
+                )
+                pose["y"] = (
+                    self.Alignment_1["y"]
+                    + COG[0] * (self.Alignment_2["y"] - self.Alignment_1["y"]) / w
+                )
+            except ZeroDivisionError:  # ゼロ割が発生した場合
+                sg.popup("画像のサイズが計測されていません", title="エラー")
+                return
+            # 前に置いたオブジェクトの上に重ならないように，退避位置をずらす
+            place = (i * self.PlacePitch["x"], i * self.PlacePitch["y"])
+            self._PickAndPlace(pose, values, place_offset=place)
+
+        # グリッパを初期位置まで移動させる．
+        SetPoseAct(self.api, pose=init_pose, ptpMoveMode=values["-MoveMode-"])
 
+    def _PickAndPlace(
+        self,
+        pose: Dict[str, float],
+        values: list,
+        place_offset: Tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        """
+        オブジェクトの真上の姿勢 pose から，掴む→退避位置に置く 動作を実行する関数．
+
+        Args:
+            pose (Dict[str, float]): オブジェクトの重心の真上の Dobot の姿勢
+            values (list): ウインドウ上のボタンの状態などを記録している変数
+            place_offset (Tuple[float, float], optional):
+                退避位置 `RecordPose` からの x, y 方向のずれ[mm]．Defaults to (0.0, 0.0).
+        """
         # Dobotをオブジェクト重心の真上まで移動させる。
         SetPoseAct(self.api, pose=pose, ptpMoveMode=values["-MoveMode-"])
         # グリッパーを開く。
@@ -2402,6 +2469,8 @@ class Dobot_APP:
         SetPoseAct(self.api, pose=pose, ptpMoveMode=values["-MoveMode-"])
         # 退避位置まで移動させる。
         pose = self.RecordPose.copy()
+        pose["x"] += place_offset[0]
+        pose["y"] += place_offset[1]
         # DobotをZ=20の位置まで上昇させる。
         pose["z"] = 20
         SetPoseAct(
@@ -2419,8 +2488,6 @@ class Dobot_APP:
         SetPoseAct(self.api, pose=pose, ptpMoveMode=values["-MoveMode-"])
         # グリッパを閉じる．
         GripperAutoCtrl(self.api)
-        # グリッパを初期位置まで移動させる．
-        SetPoseAct(self.api, pose=init_pose, ptpMoveMode=values["-MoveMode-"])
 
     def Task2(self, cam: cv2.VideoCapture, values: list):
         """
@@ -1,6 +1,7 @@
+import math
 import re
 import sys
-from typing import Dict, Tuple, Union, List, Literal
+from typing import Any, Dict, Iterable, Tuple, Union, List, Literal
 from PySimpleGUI.PySimpleGUI import No
 
 sys.path.append(".")
@@ -11,15 +12,26 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import threading
+import time
 
 from lib.utils.ImageProcessing.Binarization import (
     GlobalThreshold,
     AdaptiveThreshold,
     TwoThreshold,
+    HSVBounds,
+    HSVThreshold,
 )
-from lib.utils.ImageProcessing.Contrast import Contrast_cvt
-from lib.utils.ImageProcessing.CenterOfGravity import CenterOfGravity
+from lib.utils.ImageProcessing.Contrast import Contrast_cvt, ContrastLUT
+from lib.utils.ImageProcessing.CenterOfGravity import CenterOfGravity, DetectCOG
 from lib.utils.ImageProcessing.GrayScale import AutoGrayScale
+from lib.utils.ImageProcessing.Morphology import CleanMask
+from lib.utils.ImageProcessing.FrameCache import FrameCache
+from lib.utils.ImageProcessing.pyramid import ImagePyramid
+from lib.utils.ImageProcessing.PointOperation import (
+    ApplyPointLUT,
+    CompilePointLUT,
+    IsPointOperation,
+)
 
 
 def DeviceNameToNum(device_name: str) -> int:
@@ -86,17 +98,41 @@ def WebCam_OnOff(device_num: int, cam: Union[cv2.VideoCapture, None] = None):
 
 # bufferless VideoCapture
 class VideoCaptureWrapper:
-    def __init__(self, device_num: int, cam: Union[cv2.VideoCapture, None] = None):
+    def __init__(
+        self,
+        device_num: int,
+        cam: Union[cv2.VideoCapture, None] = None,
+        buffer_size: int = 3,
+    ):
         """
         WebCameraを読み込むクラス
         参考: [opencvのキャプチャデバイス（カメラ）から最新のフレームを取得する方法](https://stackoverflow.com/questions/43665208/how-to-get-the-latest-frame-from-capture-device-camera-in-opencv)
 
+        読み込み用のスレッドが grab と retrieve(デコード)を両方行い，事前に確保したリングバッファに書き込む．
+        `VideoCapture` はこのスレッドからしか操作しないため，`read` と競合しない．
+        各フレームには取得時刻(`time.monotonic`)と通し番号を付ける．
+
         Args:
             device_num (int): カメラデバイスを番号で指定
                 0:PC内臓カメラ
                 1:外部カメラ
             cam (Union[cv2.VideoCapture, None], optional): 接続しているカメラ情報. Defaults to None.
+            buffer_size (int, optional): リングバッファのフレーム数(2 以上). Defaults to 3.
         """
+        if buffer_size < 2:
+            raise ValueError("`buffer_size` は 2 以上を指定してください。")
+        # 最後に read / read_next で返したフレームの通し番号と取得時刻
+        self.seq = 0
+        self.timestamp = None
+
+        # リングバッファ (最初のフレームの大きさで確保する)
+        self._frames: List[Union[np.ndarray, None]] = [None] * buffer_size
+        self._stamps = [(0, 0.0)] * buffer_size  # (通し番号, 取得時刻)
+        self._latest = -1  # 最新のフレームのインデックス
+        self._seq = 0  # 最新のフレームの通し番号
+        self._running = False
+        self._cond = threading.Condition()
+
         if cam is None:  # カメラが接続されていないとき
             self.cam = cv2.VideoCapture(device_num)
             # バッファサイズを小さくすることによる高速化
@@ -107,6 +143,7 @@ class VideoCaptureWrapper:
                 self.err_num = 2
             # 接続できた場合
             else:
+                self._running = True
                 self.t = threading.Thread(target=self._reader)
                 self.t.daemon = True
                 self.t.start()
@@ -123,26 +160,105 @@ class VideoCaptureWrapper:
         return self.err_num
 
     def release(self) -> Tuple[int, None]:
-        """カメラを解放する関数
+        """カメラを解放する関数．読み込み用のスレッドを停止してから解放する．
 
         Returns:
             response(int): 動作終了を表すフラグ
                 1: release
         """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if getattr(self, "t", None) is not None:
+            self.t.join(timeout=1.0)
         self.cam.release()
         return 1, None
 
-    # grab frames as soon as they are available
     def _reader(self):
-        while True:
-            ret = self.cam.grab()
-            if not ret:
+        """フレームを取得できるたびに，最新のフレームとは別のバッファへデコードして公開する"""
+        while self._running:
+            if not self.cam.grab():
                 break
+            stamp = time.monotonic()
+            # 書き込むのは最新のフレーム以外のバッファなので，デコード中にロックは不要
+            idx = (self._latest + 1) % len(self._frames)
+            ret, frame = self.cam.retrieve(self._frames[idx])
+            if not ret:
+                continue
+            with self._cond:
+                self._frames[idx] = frame
+                self._seq += 1
+                self._stamps[idx] = (self._seq, stamp)
+                self._latest = idx
+                self._cond.notify_all()
 
-    # retrieve latest frame
-    def read(self):
-        ret, frame = self.cam.retrieve()
-        return ret, frame
+        # カメラから取得できなくなった場合は待機中の read_next を解除する
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _copy_latest(self, copy: bool) -> Tuple[bool, Union[np.ndarray, None]]:
+        """最新のフレームを返す関数 (self._cond を取得した状態で呼び出す)"""
+        if self._latest < 0:
+            return False, None
+        frame = self._frames[self._latest]
+        if copy:
+            frame = frame.copy()
+        else:
+            # バッファは書き換えられるため，呼び出し側からは変更できないようにする
+            frame = frame.view()
+            frame.flags.writeable = False
+        self.seq, self.timestamp = self._stamps[self._latest]
+        return True, frame
+
+    def read(self, copy: bool = True) -> Tuple[bool, Union[np.ndarray, None]]:
+        """
+        最新のフレームを待たずに返す関数．
+        返したフレームの通し番号と取得時刻は `seq`, `timestamp` に保持する．
+
+        Args:
+            copy (bool, optional):
+                フレームを複製して返す．False の場合はバッファの読み取り専用のビューを返す．
+                ビューは buffer_size - 1 フレーム後に上書きされる．Defaults to True.
+
+        Returns:
+            Tuple[bool, Union[np.ndarray, None]]: 返り値．
+                * ret (bool): フレームを取得できたか．
+                * frame (Union[np.ndarray, None]): 最新のフレーム (BGR)．
+        """
+        with self._cond:
+            return self._copy_latest(copy)
+
+    def read_next(
+        self,
+        after_seq: Union[int, None] = None,
+        timeout: Union[float, None] = 1.0,
+        copy: bool = True,
+    ) -> Tuple[bool, Union[np.ndarray, None]]:
+        """
+        通し番号が after_seq より新しいフレームが取得されるまで待ち，最新のフレームを返す関数．
+        既に新しいフレームがある場合は待たずに返す．
+
+        Args:
+            after_seq (Union[int, None], optional):
+                フレームの通し番号．None の場合は最後に読み込んだフレームの番号(`seq`)．Defaults to None.
+            timeout (Union[float, None], optional): 待機する最大の時間[s]．None の場合は無制限．Defaults to 1.0.
+            copy (bool, optional): フレームを複製して返す (`read` を参照)．Defaults to True.
+
+        Returns:
+            Tuple[bool, Union[np.ndarray, None]]: 返り値．
+                * ret (bool): 新しいフレームを取得できたか．タイムアウトした場合は False．
+                * frame (Union[np.ndarray, None]): 最新のフレーム (BGR)．
+        """
+        if after_seq is None:
+            after_seq = self.seq
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._seq > after_seq or not self._running, timeout
+            )
+            if self._seq <= after_seq:
+                return False, None
+            return self._copy_latest(copy)
 
 
 def Snapshot(cam: cv2.VideoCapture) -> np.ndarray:
@@ -247,13 +363,327 @@ def Color_cvt(src: np.ndarray, color_type: str):
         return dst
 
 
+class ProcessingPipeline(object):
+    """
+    `ImageCvt` の設定を1度だけ解釈し，フレーム毎の画像処理を使い回すためのクラス．
+    各処理段の関数は生成時に決定し，出力先の uint8 バッファはフレームサイズに合わせて確保したものを再利用する．
+    `run` の返り値の画像は次の `run` で上書きされるため，保持する場合はコピーすること．
+    `run` に `FrameCache` を渡すと，同じフレームの同じ領域に対する適応的二値化処理の近傍の平均や積分画像を，
+    設定の異なるパイプラインの間でも共有する．
+    """
+
+    def __init__(
+        self,
+        Color_Space: Literal["RGB", "Gray", "HSV"] = "RGB",
+        Color_Density: Literal[
+            "None", "Linear", "Non-Linear", "Histogram-Flatten"
+        ] = "None",
+        Binarization: Literal[
+            "None", "Global", "Otsu", "Adaptive", "Two", "HSV"
+        ] = "None",
+        LowerThreshold: int = 10,
+        UpperThreshold: int = 150,
+        AdaptiveThreshold_type: Literal["Mean", "Gaussian", "Wellner"] = "Mean",
+        AdaptiveThreshold_BlockSize: int = 11,
+        AdaptiveThreshold_Constant: int = 2,
+        color: int = 4,
+        background_color: Literal[0, 1] = 0,
+        HSV_range: Union[Tuple[Tuple[int, int, int], Tuple[int, int, int]], None] = None,
+        Morphology_ksize: int = 0,
+        Morphology_min_area: int = 0,
+        Morphology_fill_holes: bool = False,
+    ) -> None:
+        """
+        Args:
+            引数は `ImageCvt` と同じ．
+        """
+        self.settings = {
+            "Color_Space": Color_Space,
+            "Color_Density": Color_Density,
+            "Binarization": Binarization,
+            "LowerThreshold": LowerThreshold,
+            "UpperThreshold": UpperThreshold,
+            "AdaptiveThreshold_type": AdaptiveThreshold_type,
+            "AdaptiveThreshold_BlockSize": AdaptiveThreshold_BlockSize,
+            "AdaptiveThreshold_Constant": AdaptiveThreshold_Constant,
+            "color": color,
+            "background_color": background_color,
+            "HSV_range": HSV_range,
+            "Morphology_ksize": Morphology_ksize,
+            "Morphology_min_area": Morphology_min_area,
+            "Morphology_fill_holes": Morphology_fill_holes,
+        }
+        self._buffers = {}
+        # `run` に渡されたキャッシュと，二値化処理の入力画像の内容を表すキー
+        self._cache = None
+        self._cache_key = None
+        # 二値化処理後のマスクの雑音除去
+        self._morphology = (
+            Morphology_ksize > 0 or Morphology_min_area > 0 or Morphology_fill_holes
+        )
+
+        # 色空間変換
+        if Color_Space == "RGB":
+            self._color_stage = None
+        elif Color_Space == "Gray":
+            self._color_stage = self._gray
+        elif Color_Space == "HSV":
+            self._color_stage = self._hsv
+        else:
+            raise ValueError("選択された変換は存在しません。")
+
+        # 濃度変換
+        self._density_lut = None
+        if Color_Density == "None":
+            self._density_stage = None
+        elif IsPointOperation(Color_Density):
+            self._density_lut = ContrastLUT(Color_Density)
+            self._density_stage = self._density_point
+        elif Color_Density == "Histogram-Flatten":
+            self._density_stage = self._density_hist
+        else:
+            self._density_stage = None
+
+        # 二値化処理の対象チャンネル(None: 画像全体)
+        if Color_Space == "RGB" and Binarization in ("Global", "Otsu", "Adaptive"):
+            self._channel = color if color in (0, 1, 2) else -1
+        else:
+            self._channel = None
+        # 二値化処理の入力画像は色空間変換・濃度変換・チャンネルの選択で決まる
+        self._stage_key = (Color_Space, Color_Density, self._channel)
+
+        # 二値化処理
+        self._bin_lut = None
+        self._invert = background_color == 0
+        if self._channel == -1:  # 選択された色のチャンネルが存在しない
+            self._bin_stage = None
+        elif Binarization == "Global" and IsPointOperation(Color_Density):
+            # 濃度変換・大域的二値化処理・背景色の反転を1回の LUT で行う
+            self._bin_lut = CompilePointLUT(
+                Color_Density, "Global", LowerThreshold=LowerThreshold, invert=self._invert
+            )
+            self._bin_stage = self._bin_point
+            self._invert = False
+        elif Binarization == "Global":
+            self._bin_stage = self._bin_global
+        elif Binarization == "Otsu":
+            self._bin_stage = self._bin_otsu
+        elif Binarization == "Adaptive":
+            self._bin_stage = self._bin_adaptive
+        elif Binarization == "Two" and color != 5:
+            if Color_Space == "Gray" and IsPointOperation(Color_Density):
+                self._bin_lut = CompilePointLUT(
+                    Color_Density,
+                    "Two",
+                    LowerThreshold=LowerThreshold,
+                    UpperThreshold=UpperThreshold,
+                    PickupColor=color,
+                    invert=self._invert,
+                )
+                self._bin_stage = self._bin_point
+                self._invert = False
+            else:
+                self._bin_stage = self._bin_two
+        elif Binarization == "HSV" and (color != 5 or HSV_range is not None):
+            if Color_Space == "Gray":
+                raise ValueError("HSV による二値化処理はカラー画像でのみ使用できます。")
+            HSVBounds(color, HSV_range)  # 範囲の確認
+            self._bin_stage = self._bin_hsv
+        else:
+            self._bin_stage = None
+
+    def run(
+        self,
+        src: Union[np.ndarray, Dict[str, np.ndarray]],
+        roi: Union[Tuple[int, int, int, int], None] = None,
+        cache: Union[FrameCache, None] = None,
+    ) -> Tuple[int, Dict[str, np.ndarray], Union[None, float], Union[None, float]]:
+        """
+        1フレーム分の画像処理を行う関数．
+
+        Args:
+            src (Union[np.ndarray, Dict[str, np.ndarray]]): 変換前の画像データ．
+            roi (Union[Tuple[int, int, int, int], None], optional):
+                処理する領域 (x0, y0, x1, y1)．指定した場合は切り出した領域のみを処理し，
+                返り値の画像も切り出した領域の大きさになる．Defaults to None.
+            cache (Union[FrameCache, None], optional):
+                src のフレームのキャッシュ．適応的二値化処理("Mean", "Bradley")の近傍の平均・積分画像を共有する．
+                Defaults to None.
+
+        Returns:
+            `ImageCvt` と同じ．
+        """
+        if type(src) == np.ndarray:
+            frame = src
+        elif type(src) == dict:
+            try:
+                frame = src["rgb"]
+            except KeyError as e:
+                raise KeyError(f"{e}, comment: `rgb` does not exist in src.")
+        else:
+            raise TypeError("An undefined value was assigned to `src`.")
+        if cache is not None and cache.frame is not frame:
+            raise ValueError("`cache` は src のフレームのキャッシュでなければなりません。")
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
+        self._cache = cache
+        self._cache_key = (self._stage_key, None if roi is None else tuple(roi))
+
+        img = {
+            "rgb": None,
+            "bin": None,
+        }
+        self._l_th = self._u_th = None
+
+        # ------------------ #
+        # 撮影した画像を変換する #
+        # ------------------ #
+        # 色空間変換
+        if self._color_stage is not None:
+            frame = self._color_stage(frame)
+        # 濃度変換前の画像(LUT で濃度変換と二値化処理をまとめる場合に使用)
+        self._src = frame
+        # 濃度変換
+        if self._density_stage is not None:
+            frame = self._density_stage(frame)
+        img["rgb"] = frame
+
+        # 二値化処理
+        if self._bin_stage is not None:
+            img["bin"] = self._bin_stage(frame)
+            if self._invert:
+                img["bin"] = cv2.bitwise_not(img["bin"], dst=img["bin"])
+            # 輪郭抽出の前に細かい雑音を除去する
+            if self._morphology:
+                img["bin"] = CleanMask(
+                    img["bin"],
+                    ksize=self.settings["Morphology_ksize"],
+                    min_area=self.settings["Morphology_min_area"],
+                    fill_holes=self.settings["Morphology_fill_holes"],
+                    dst=img["bin"],
+                )
+
+        self._src = None
+        self._cache = None
+        return 5, img, self._l_th, self._u_th
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        名前ごとに確保した uint8 バッファを返す関数．サイズが足りない場合のみ確保し直す．
+
+        Args:
+            name (str): バッファ名
+            shape (Tuple[int, ...]): 必要な配列の形状
+
+        Return:
+            buf (np.ndarray): 連続した uint8 配列
+        """
+        size = int(np.prod(shape))
+        storage = self._buffers.get(name)
+        if storage is None or storage.size < size:
+            storage = np.empty(size, dtype=np.uint8)
+            self._buffers[name] = storage
+        return storage[:size].reshape(shape)
+
+    def _select(self, img: np.ndarray, name: str) -> np.ndarray:
+        """二値化処理の対象チャンネルを取り出す関数"""
+        if self._channel is None:
+            return img
+        return cv2.extractChannel(
+            img, self._channel, dst=self._buffer(name, img.shape[:2])
+        )
+
+    # ---------- #
+    # 色空間変換 #
+    # ---------- #
+    def _gray(self, src: np.ndarray) -> np.ndarray:
+        # グレースケール化してから1チャンネルの画像をバッファ上で平滑化する
+        return AutoGrayScale(src, clearly=True, dst=self._buffer("gray", src.shape[:2]))
+
+    def _hsv(self, src: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(src, cv2.COLOR_RGB2HSV, dst=self._buffer("hsv", src.shape))
+
+    # ---------- #
+    # 濃度変換 #
+    # ---------- #
+    def _density_point(self, src: np.ndarray) -> np.ndarray:
+        return cv2.LUT(src, self._density_lut, dst=self._buffer("density", src.shape))
+
+    def _density_hist(self, src: np.ndarray) -> np.ndarray:
+        return Contrast_cvt(src, "Histogram-Flatten")
+
+    # ---------- #
+    # 二値化処理 #
+    # ---------- #
+    def _bin_point(self, img: np.ndarray) -> np.ndarray:
+        src = self._select(self._src, "channel")
+        self._l_th = self.settings["LowerThreshold"]
+        if self.settings["Binarization"] == "Two":
+            self._u_th = self.settings["UpperThreshold"]
+        return ApplyPointLUT(src, self._bin_lut, dst=self._buffer("bin", src.shape[:2]))
+
+    def _bin_global(self, img: np.ndarray) -> np.ndarray:
+        src = self._select(img, "channel")
+        self._l_th = self.settings["LowerThreshold"]
+        _, dst = cv2.threshold(
+            src,
+            self._l_th,
+            255,
+            cv2.THRESH_BINARY,
+            dst=self._buffer("bin", src.shape[:2]),
+        )
+        return dst
+
+    def _bin_otsu(self, img: np.ndarray) -> np.ndarray:
+        src = self._select(img, "channel")
+        self._l_th, dst = GlobalThreshold(src, Type="Otsu")
+        return dst
+
+    def _bin_adaptive(self, img: np.ndarray) -> np.ndarray:
+        src = self._select(img, "channel")
+        return AdaptiveThreshold(
+            img=src,
+            method=str(self.settings["AdaptiveThreshold_type"]),
+            block_size=self.settings["AdaptiveThreshold_BlockSize"],
+            C=self.settings["AdaptiveThreshold_Constant"],
+            cache=self._cache,
+            cache_key=self._cache_key,
+        )
+
+    def _bin_two(self, img: np.ndarray) -> np.ndarray:
+        self._l_th = self.settings["LowerThreshold"]
+        self._u_th = self.settings["UpperThreshold"]
+        return TwoThreshold(
+            img=img,
+            LowerThreshold=self._l_th,
+            UpperThreshold=self._u_th,
+            PickupColor=self.settings["color"],
+            dst=self._buffer("bin", img.shape[:2]),
+        )
+
+    def _bin_hsv(self, img: np.ndarray) -> np.ndarray:
+        # 色空間変換で HSV 画像を作成済みの場合はそれを使い回し，そうでなければバッファ上で1回だけ変換する
+        is_hsv = self.settings["Color_Space"] == "HSV"
+        return HSVThreshold(
+            img,
+            PickupColor=self.settings["color"],
+            hsv_range=self.settings["HSV_range"],
+            is_hsv=is_hsv,
+            hsv=None if is_hsv else self._buffer("hsv", img.shape),
+            dst=self._buffer("bin", img.shape[:2]),
+        )
+
+
 def ImageCvt(
     src: Dict[str, np.ndarray],
     Color_Space: Literal["RGB", "Gray"] = "RGB",
     Color_Density: Literal[
         "None", "Linear", "Non-Linear", "Histogram-Flatten"
     ] = "None",
-    Binarization: Literal["None", "Global", "Otsu", "Adaptive", "Two"] = "None",
+    Binarization: Literal[
+        "None", "Global", "Otsu", "Adaptive", "Two", "HSV"
+    ] = "None",
     LowerThreshold: int = 10,
     UpperThreshold: int = 150,
     AdaptiveThreshold_type: Literal["Mean", "Gaussian", "Wellner"] = "Mean",
@@ -261,9 +691,16 @@ def ImageCvt(
     AdaptiveThreshold_Constant: int = 2,
     color: int = 4,
     background_color: Literal[0, 1] = 0,
+    HSV_range: Union[Tuple[Tuple[int, int, int], Tuple[int, int, int]], None] = None,
+    Morphology_ksize: int = 0,
+    Morphology_min_area: int = 0,
+    Morphology_fill_holes: bool = False,
+    roi: Union[Tuple[int, int, int, int], None] = None,
 ) -> Tuple[int, np.ndarray, Union[None, float], Union[None, float]]:
     """
     入力画像に対して指定の処理を施す関数．
+    連続したフレームを処理する場合は `ProcessingPipeline` を1度だけ作成して使い回すこと．
+    N×H×W×C の配列やイテレータでまとめて処理する場合は `BatchImageCvt` を使用する．
 
     Args:
         src (Dict[Union[str: np.ndarray, str:None]]): 変換前の画像データ．
@@ -272,8 +709,9 @@ def ImageCvt(
         Color_Density (Literal["None", "Linear", "Non-Linear", "Histogram-Flatten"], optional):
             画像の濃度変換.
             Defaults to "None".
-        Binarization (Literal["None", "Global", "Otsu", "Adaptive", "Two"], optional):
+        Binarization (Literal["None", "Global", "Otsu", "Adaptive", "Two", "HSV"], optional):
             画像の二値化.
+            * HSV: color で選んだ色(または HSV_range)の HSV の範囲を抽出する．
             Defaults to "None".
         LowerThreshold (int, optional): [description]. Defaults to 10.
         UpperThreshold (int, optional): [description]. Defaults to 150.
@@ -290,6 +728,17 @@ def ImageCvt(
         background_color (Literal[0, 1], optional): 背景の色．Defaults to 0.
             * 0: 背景が黒．
             * 1: 背景が白．
+        HSV_range (Union[Tuple[Tuple[int, int, int], Tuple[int, int, int]], None], optional):
+            Binarization="HSV" で抽出する HSV の範囲 ((H, S, V) の下限, (H, S, V) の上限)．
+            H は 0-179 で，下限が上限より大きい場合は 0 を跨ぐ範囲(赤など)を表す．
+            None の場合は color に対応する `PickupColorHSV` の範囲を使用する．Defaults to None.
+        Morphology_ksize (int, optional):
+            二値化処理後のオープニング・クロージングの構造要素のサイズ．0 の場合は行わない．Defaults to 0.
+        Morphology_min_area (int, optional):
+            二値化処理後に残す連結成分の最小の面積[px]．0 の場合は行わない．Defaults to 0.
+        Morphology_fill_holes (bool, optional): 二値化処理後に物体の穴を埋める．Defaults to False.
+        roi (Union[Tuple[int, int, int, int], None], optional):
+            処理する領域 (x0, y0, x1, y1)．None の場合は画像全体を処理する．Defaults to None.
 
     Returns:
         Tuple[int, np.ndarray, np.ndarray]: 返り値．
@@ -298,115 +747,28 @@ def ImageCvt(
             * l_th (None|float): 下側の閾値．二値化処理を使用しなかった場合はNone．
             * u_th (None|float): 上側の閾値．2つの二値化処理以外を指定した場合はNone．
     """
-    img = {
-        "rgb": None,
-        "bin": None,
-    }
-
-    if type(src) == np.ndarray:
-        img["rgb"] = src
-    elif type(src) == dict:
-        try:
-            img["rgb"] = src["rgb"]
-        except KeyError as e:
-            raise (f"{e}, comment: `rgb` does not exist in src.")
-    else:
-        raise ("An undefined value was assigned to `src`.")
-
-    img["rgb_bin"] = np.zeros((img["rgb"].shape[0], img["rgb"].shape[1]))
-    r = g = b = np.zeros((img["rgb"].shape[0], img["rgb"].shape[1]))
-    l_th = u_th = None
-
-    # ------------------ #
-    # 撮影した画像を変換する #
-    # ------------------ #
-    # 色空間変換
-    if Color_Space != "RGB":
-        img["rgb"] = Color_cvt(img["rgb"], Color_Space)
-    # 濃度変換
-    if Color_Density != "None":
-        img["rgb"] = Contrast_cvt(img["rgb"], Color_Density)
-    # 二値化処理
-    if Binarization == "None":
-        return 5, img, l_th, u_th
-    else:
-        # 大域的二値化処理
-        if Binarization == "Global":
-            if Color_Space == "RGB":
-                r, g, b = cv2.split(img["rgb"])
-                if color == 0:  # Red
-                    l_th, img["bin"] = GlobalThreshold(r, threshold=LowerThreshold)
-                elif color == 1:  # Green
-                    l_th, img["bin"] = GlobalThreshold(g, threshold=LowerThreshold)
-                elif color == 2:
-                    l_th, img["bin"] = GlobalThreshold(b, threshold=LowerThreshold)
-                else:
-                    pass
-            else:
-                l_th, img["bin"] = GlobalThreshold(img["rgb"], threshold=LowerThreshold)
-        # 大津の二値化処理
-        elif Binarization == "Otsu":
-            if Color_Space == "RGB":
-                r, g, b = cv2.split(img["rgb"])
-                if color == 0:
-                    l_th, img["bin"] = GlobalThreshold(r, Type="Otsu")
-                elif color == 1:
-                    l_th, img["bin"] = GlobalThreshold(g, Type="Otsu")
-                elif color == 2:
-                    l_th, img["bin"] = GlobalThreshold(b, Type="Otsu")
-                else:
-                    pass
-            else:
-                l_th, img["bin"] = GlobalThreshold(img["rgb"], Type="Otsu")
-        # 適応的二値化処理
-        elif Binarization == "Adaptive":
-            if Color_Space == "RGB":
-                r, g, b = cv2.split(img["rgb"])
-                if color == 0:
-                    img["bin"] = AdaptiveThreshold(
-                        img=r,
-                        method=str(AdaptiveThreshold_type),
-                        block_size=AdaptiveThreshold_BlockSize,
-                        C=AdaptiveThreshold_Constant,
-                    )
-                elif color == 1:
-                    img["bin"] = AdaptiveThreshold(
-                        img=g,
-                        method=str(AdaptiveThreshold_type),
-                        block_size=AdaptiveThreshold_BlockSize,
-                        C=AdaptiveThreshold_Constant,
-                    )
-                elif color == 2:
-                    img["bin"] = AdaptiveThreshold(
-                        img=b,
-                        method=str(AdaptiveThreshold_type),
-                        block_size=AdaptiveThreshold_BlockSize,
-                        C=AdaptiveThreshold_Constant,
-                    )
-                else:
-                    pass
-            else:
-                img["bin"] = AdaptiveThreshold(
-                    img=img["rgb"],
-                    method=str(AdaptiveThreshold_type),
-                    block_size=AdaptiveThreshold_BlockSize,
-                    C=AdaptiveThreshold_Constant,
-                )
-        # 2つの閾値を用いた二値化処理
-        elif Binarization == "Two" and color != 5:
-            img["bin"] = TwoThreshold(
-                img=img["rgb"],
-                LowerThreshold=LowerThreshold,
-                UpperThreshold=UpperThreshold,
-                PickupColor=color,
-            )
-            l_th = LowerThreshold
-            u_th = UpperThreshold
+    frame = src.get("rgb") if type(src) == dict else src
+    if type(frame) == np.ndarray and frame.ndim == 4:
+        raise ValueError("複数フレームの配列は `BatchImageCvt` で処理してください。")
 
-        if background_color == 0:
-            img["bin"] = cv2.bitwise_not(img["bin"])
+    pipeline = ProcessingPipeline(
+        Color_Space=Color_Space,
+        Color_Density=Color_Density,
+        Binarization=Binarization,
+        LowerThreshold=LowerThreshold,
+        UpperThreshold=UpperThreshold,
+        AdaptiveThreshold_type=AdaptiveThreshold_type,
+        AdaptiveThreshold_BlockSize=AdaptiveThreshold_BlockSize,
+        AdaptiveThreshold_Constant=AdaptiveThreshold_Constant,
+        color=color,
+        background_color=background_color,
+        HSV_range=HSV_range,
+        Morphology_ksize=Morphology_ksize,
+        Morphology_min_area=Morphology_min_area,
+        Morphology_fill_holes=Morphology_fill_holes,
+    )
 
-    return 5, img, l_th, u_th
+    return pipeline.run(src, roi=roi)
 
 
 def SnapshotCvt(
@@ -415,7 +777,9 @@ def SnapshotCvt(
     Color_Density: Literal[
         "None", "Linear", "Non-Linear", "Histogram-Flatten"
     ] = "None",
-    Binarization: Literal["None", "Global", "Otsu", "Adaptive", "Two"] = "None",
+    Binarization: Literal[
+        "None", "Global", "Otsu", "Adaptive", "Two", "HSV"
+    ] = "None",
     LowerThreshold: int = 10,
     UpperThreshold: int = 150,
     AdaptiveThreshold_type: Literal["Mean", "Gaussian", "Wellner"] = "Mean",
@@ -423,6 +787,7 @@ def SnapshotCvt(
     AdaptiveThreshold_Constant: int = 2,
     color: int = 4,
     background_color: Literal[0, 1] = 0,
+    pipeline: Union[ProcessingPipeline, None] = None,
 ) -> Tuple[int, np.ndarray, np.ndarray, Union[None, float], Union[None, float]]:
     """
     スナップショットを撮影し，二値化処理を行う関数．
@@ -435,8 +800,9 @@ def SnapshotCvt(
         Color_Density (Literal["None", "Linear", "Non-Linear", "Histogram-Flatten"], optional):
             画像の濃度変換.
             Defaults to "None".
-        Binarization (Literal["None", "Global", "Otsu", "Adaptive", "Two"], optional):
+        Binarization (Literal["None", "Global", "Otsu", "Adaptive", "Two", "HSV"], optional):
             画像の二値化.
+            * HSV: color で選んだ色(または HSV_range)の HSV の範囲を抽出する．
             Defaults to "None".
         LowerThreshold (int, optional): [description]. Defaults to 10.
         UpperThreshold (int, optional): [description]. Defaults to 150.
@@ -453,6 +819,9 @@ def SnapshotCvt(
         background_color (Literal[0, 1], optional): 背景の色．Defaults to 0.
             * 0: 背景が黒．
             * 1: 背景が白．
+        pipeline (Union[ProcessingPipeline, None], optional):
+            構築済みの画像処理パイプライン．指定した場合は画像処理の設定の引数は無視され，
+            フレーム間でパイプラインとバッファを使い回す．Defaults to None.
 
     Returns:
         Tuple[int, np.ndarray, np.ndarray]: 返り値．
@@ -472,6 +841,9 @@ def SnapshotCvt(
     if err != 3:
         return 4, [], 0, 0  # WebCam_NotGetImage
 
+    if pipeline is not None:
+        return pipeline.run(img)
+
     err, img, l_th, u_th = ImageCvt(
         img,
         Color_Space=Color_Space,
@@ -492,18 +864,20 @@ def SnapshotCvt(
 def Contours(
     rgb_img: np.ndarray,
     bin_img: np.ndarray,
-    CalcCOG: Literal["image", "outline"] = "image",
+    CalcCOG: Literal["image", "outline", "components"] = "image",
     Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
     Approximate: Literal["Keep", "Not-Keep"] = "Keep",
     orientation: bool = False,
     drawing_figure: bool = True,
+    offset: Tuple[int, int] = (0, 0),
 ) -> Tuple[Union[List[float], None], np.ndarray]:
     """スナップショットの撮影からオブジェクトの重心位置計算までの一連の画像処理を行う関数。
+    1フレーム用．複数フレームの重心位置は `BatchImageCvt` でまとめて求める．
 
     Args:
         rgb_img (np.ndarray): 計算された重心位置を重ねて表示するRGB画像
         bin_img (np.ndarray): 重心計算対象の二値画像．
-        CalcCOG (Literal["image", "outline"], optional):
+        CalcCOG (Literal["image", "outline", "components"], optional):
             重心位置の計算対象を指定．Defaults to "image".
         Retrieval (Literal["LIST", "EXTERNAL", "CCOMP", "TREE"], optional):
             2値画像の画素値が 255 の部分と 0 の部分を分離した際に，その親子関係を保持するか指定．
@@ -516,8 +890,10 @@ def Contours(
             輪郭の中間点を保持するか指定．Default to "Keep".
         orientation (bool, optional):
             オブジェクトの輪郭情報に基づいて姿勢を推定する関数．
-            `CalcCOG = "outline"` の場合のみ適用可能．Default to False.
+            `CalcCOG` が "outline", "components" の場合のみ適用可能．Default to False.
         drawing_figure (bool, optional): 図を描画する．Default to True.
+        offset (Tuple[int, int], optional):
+            bin_img を切り出した領域の左上の座標 (x, y)．重心位置は元画像の座標で返す．Default to (0, 0).
 
     Returns:
         COG (List[float]): COG=[x, y, angle]
@@ -540,6 +916,7 @@ def Contours(
             cal_Method=CalcCOG,
             orientation=orientation,
             drawing_figure=drawing_figure,
+            offset=offset,
         )
     except Exception as e:
         print(f"Gravity center position calculation error: {e}")
@@ -547,6 +924,368 @@ def Contours(
         return COG, rgb_img
 
 
+class ROITracker(object):
+    """
+    前回検出した物体の外接矩形の周辺だけを処理する ROI モードのクラス．
+    窓の中に物体がない場合や，物体が窓の端(画像の端を除く)に接して窓からはみ出している場合は，
+    同じフレームの全体を探索し直す．
+    画像ピラミッドや適応的二値化処理の積分画像などはフレームごとの `FrameCache` に保持し，
+    同じフレームでは1度だけ作成する．
+    """
+
+    def __init__(self, margin: int = 96, pyramid_level: int = 0) -> None:
+        """
+        Args:
+            margin (int, optional):
+                前回の外接矩形から窓の端までの距離[px]．1フレームの間に物体が移動する距離より大きくすること．
+                Defaults to 96.
+            pyramid_level (int, optional):
+                画像全体を探索する場合に `CoarseToFineCOG` で使用するピラミッドのレベル．
+                0 の場合は元の解像度で探索する．Defaults to 0.
+        """
+        self.margin = int(margin)
+        self.pyramid_level = int(pyramid_level)
+        self.cache = FrameCache(max_level=self.pyramid_level)
+        self.COG = None
+        self.rect = None
+        self.roi = None
+
+    def reset(self) -> None:
+        """前回の検出結果を破棄し，次のフレームは全体を探索する"""
+        self.COG = None
+        self.rect = None
+        self.roi = None
+
+    def Window(
+        self, rect: Tuple[int, int, int, int], shape: Tuple[int, ...]
+    ) -> Tuple[int, int, int, int]:
+        """
+        外接矩形の周辺の窓を画像内に収めて返す関数．
+
+        Args:
+            rect (Tuple[int, int, int, int]): 物体の外接矩形 (x, y, w, h)
+            shape (Tuple[int, ...]): 画像の形状
+
+        Return:
+            roi (Tuple[int, int, int, int]): 窓 (x0, y0, x1, y1)
+        """
+        return _Window(rect, shape, self.margin)
+
+    def locate(
+        self,
+        frame: np.ndarray,
+        pipeline: ProcessingPipeline,
+        CalcCOG: Literal["image", "outline", "components"] = "image",
+        Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
+        Approximate: Literal["Keep", "Not-Keep"] = "Keep",
+        orientation: bool = False,
+        min_area: int = 100,
+        subpixel: bool = False,
+    ) -> Tuple[Union[List[float], None], Dict[str, np.ndarray]]:
+        """
+        ROI モードで重心位置を求める関数．
+
+        Args:
+            frame (np.ndarray): 撮影した画像
+            pipeline (ProcessingPipeline): 画像処理のパイプライン
+            CalcCOG, Retrieval, Approximate, orientation, min_area: `CenterOfGravity` と同じ．
+            subpixel (bool, optional):
+                frame の輝度で重み付けしたサブピクセル精度の重心を求める(`RefineCentroid`)．Defaults to False.
+
+        Returns:
+            COG (Union[List[float], None]): 元画像の座標での重心位置 [x, y, angle]．求まらなかった場合は None．
+            img (Dict[str, np.ndarray]): 処理した領域の画像 {"rgb", "bin"}．
+        """
+        kwargs = {
+            "Retrieval": Retrieval,
+            "Approximate": Approximate,
+            "min_area": min_area,
+            "cal_Method": CalcCOG,
+            "orientation": orientation,
+        }
+        # 同じフレームを続けて処理する場合はピラミッドや積分画像などを使い回す
+        if self.cache.frame is not frame:
+            self.cache.update(frame)
+
+        result, img = None, None
+        if self.roi is not None:
+            result, img = _DetectCOG(
+                frame, pipeline, self.roi, kwargs, subpixel, self.cache
+            )
+            # 窓からはみ出した物体の重心は切り取られた部分だけで求まるので使用しない
+            if result is not None and _IsClipped(result["rect"], self.roi, frame.shape):
+                result = None
+        if result is None and self.pyramid_level > 0:
+            # 画像全体を縮小画像で探索する
+            result, img = _CoarseToFine(
+                self.cache.pyramid,
+                pipeline,
+                self.pyramid_level,
+                self.margin,
+                kwargs,
+                subpixel,
+                self.cache,
+            )
+        elif result is None:
+            # 画像全体を探索する
+            result, img = _DetectCOG(frame, pipeline, None, kwargs, subpixel, self.cache)
+
+        self.COG = None if result is None else result["COG"]
+        self.rect = None if result is None else result["rect"]
+        self.roi = None if result is None else self.Window(self.rect, frame.shape)
+        return self.COG, img
+
+
+def _Window(
+    rect: Tuple[int, int, int, int], shape: Tuple[int, ...], margin: int
+) -> Tuple[int, int, int, int]:
+    """外接矩形 (x, y, w, h) を上下左右に margin[px] 広げた窓 (x0, y0, x1, y1) を画像内に収めて返す関数"""
+    h, w = shape[:2]
+    x, y, rw, rh = (int(v) for v in rect)
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + rw + margin, w), min(y + rh + margin, h)
+    return x0, y0, x1, y1
+
+
+def _IsClipped(
+    rect: Tuple[int, int, int, int],
+    roi: Tuple[int, int, int, int],
+    shape: Tuple[int, ...],
+) -> bool:
+    """外接矩形 (x, y, w, h) が，画像の端ではない窓の端に接しているか判定する関数"""
+    h, w = shape[:2]
+    x, y, rw, rh = rect
+    x0, y0, x1, y1 = roi
+    return (
+        (x <= x0 and x0 > 0)
+        or (y <= y0 and y0 > 0)
+        or (x + rw >= x1 and x1 < w)
+        or (y + rh >= y1 and y1 < h)
+    )
+
+
+def _DetectCOG(
+    frame: np.ndarray,
+    pipeline: ProcessingPipeline,
+    roi: Union[Tuple[int, int, int, int], None],
+    kwargs: Dict,
+    subpixel: bool = False,
+    cache: Union[FrameCache, None] = None,
+) -> Tuple[Union[Dict[str, Any], None], Dict[str, np.ndarray]]:
+    """
+    指定した領域の画像処理と重心位置の計算を行う関数．subpixel の場合は frame の輝度で重心を求め直す．
+    重心位置が求まった場合は `DetectCOG` の返り値(元画像の座標)を，求まらなかった場合は None を返す．
+    cache は frame の `FrameCache` で，`ProcessingPipeline.run` に渡す．
+    """
+    _, img, _, _ = pipeline.run(frame, roi=roi, cache=cache)
+    bin_img = img["bin"]
+    if bin_img is None or not cv2.countNonZero(bin_img):
+        return None, img
+    offset = (0, 0) if roi is None else (roi[0], roi[1])
+    try:
+        result = DetectCOG(
+            bin_img,
+            offset=offset,
+            refine_img=frame if subpixel else None,
+            **kwargs,
+        )
+    except IndexError:
+        # 面積が min_area を超える輪郭が存在しない
+        return None, img
+    if result["COG"] is None:
+        return None, img
+    return result, img
+
+
+def CoarseToFineCOG(
+    frame: Union[np.ndarray, ImagePyramid, FrameCache],
+    pipeline: ProcessingPipeline,
+    level: int = 2,
+    margin: int = 96,
+    CalcCOG: Literal["image", "outline", "components"] = "image",
+    Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
+    Approximate: Literal["Keep", "Not-Keep"] = "Keep",
+    orientation: bool = False,
+    min_area: int = 100,
+    subpixel: bool = False,
+) -> Tuple[Union[List[float], None], Dict[str, np.ndarray]]:
+    """
+    画像ピラミッドの縮小画像で物体を探し，元の解像度では見つかった物体の外接矩形の周辺の窓だけで重心位置を求め直す関数．
+    探索の計算量は元の解像度のおよそ 1/4**level になる．
+
+    Args:
+        frame (Union[np.ndarray, ImagePyramid, FrameCache]):
+            撮影した画像，またはその画像の `ImagePyramid`・`FrameCache`．
+            同じフレームを複数回処理する場合はピラミッドかキャッシュを渡すと縮小画像を使い回せる．
+            キャッシュの場合は元の解像度の適応的二値化処理の積分画像なども使い回す．
+        pipeline (ProcessingPipeline): 画像処理のパイプライン
+        level (int, optional): 物体を探索するピラミッドのレベル．Defaults to 2.
+        margin (int, optional):
+            元の解像度で重心を求め直す窓の大きさ (縮小画像の外接矩形を拡大した矩形から窓の端までの距離[px])．
+            Defaults to 96.
+        CalcCOG, Retrieval, Approximate, orientation, min_area: `CenterOfGravity` と同じ．
+        subpixel (bool, optional): 元の解像度でサブピクセル精度の重心を求める．Defaults to False.
+
+    Returns:
+        COG (Union[List[float], None]): 元画像の座標での重心位置 [x, y, angle]．求まらなかった場合は None．
+        img (Dict[str, np.ndarray]): 最後に処理した領域の画像 {"rgb", "bin"}．
+    """
+    cache = None
+    if isinstance(frame, FrameCache):
+        cache = frame
+        pyr = frame.pyramid
+    elif isinstance(frame, ImagePyramid):
+        pyr = frame
+    else:
+        pyr = ImagePyramid(frame, level)
+    kwargs = {
+        "Retrieval": Retrieval,
+        "Approximate": Approximate,
+        "min_area": min_area,
+        "cal_Method": CalcCOG,
+        "orientation": orientation,
+    }
+    result, img = _CoarseToFine(pyr, pipeline, level, margin, kwargs, subpixel, cache)
+    return (None if result is None else result["COG"]), img
+
+
+def _CoarseToFine(
+    pyr: ImagePyramid,
+    pipeline: ProcessingPipeline,
+    level: int,
+    margin: int,
+    kwargs: Dict,
+    subpixel: bool = False,
+    cache: Union[FrameCache, None] = None,
+) -> Tuple[Union[Dict[str, Any], None], Dict[str, np.ndarray]]:
+    """
+    `CoarseToFineCOG` の処理を行い，`_DetectCOG` と同じ形式で返す関数．
+    cache は元の解像度のフレーム(pyr.base)の `FrameCache` で，縮小画像の処理には使用しない．
+    """
+    # 縮小画像で物体を探索する (面積の閾値も縮小率に合わせる)
+    coarse_kwargs = dict(kwargs, min_area=kwargs["min_area"] / 4 ** level, orientation=False)
+    coarse, img = _DetectCOG(pyr[level], pipeline, None, coarse_kwargs)
+    if coarse is None:
+        return None, img
+
+    # 元の解像度で，見つかった物体の外接矩形を拡大した範囲の周辺だけ重心を求め直す
+    sx, sy = pyr.scale(level)
+    x, y, w, h = coarse["rect"]
+    rect = (
+        int(x * sx),
+        int(y * sy),
+        int(math.ceil((x + w) * sx)) - int(x * sx),
+        int(math.ceil((y + h) * sy)) - int(y * sy),
+    )
+    roi = _Window(rect, pyr.base.shape, margin)
+    result, img = _DetectCOG(pyr.base, pipeline, roi, kwargs, subpixel, cache)
+    if result is not None and _IsClipped(result["rect"], roi, pyr.base.shape):
+        # 縮小画像では見えなかった部分が窓からはみ出している場合は元の解像度で全体を探索する
+        result, img = _DetectCOG(pyr.base, pipeline, None, kwargs, subpixel, cache)
+    return result, img
+
+
+# `BatchImageCvt` の返り値の各フレームの結果
+BatchResultDtype = np.dtype(
+    [
+        ("index", np.int64),
+        ("l_th", np.float64),
+        ("u_th", np.float64),
+        ("cx", np.float64),
+        ("cy", np.float64),
+        ("angle", np.float64),
+        ("found", np.bool_),
+    ]
+)
+
+
+def BatchImageCvt(
+    frames: Union[np.ndarray, Iterable[np.ndarray]],
+    pipeline: Union[ProcessingPipeline, None] = None,
+    CalcCOG: Union[Literal["image", "outline", "components"], None] = "image",
+    Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
+    Approximate: Literal["Keep", "Not-Keep"] = "Keep",
+    orientation: bool = False,
+    min_area: int = 100,
+    **kwargs,
+) -> np.ndarray:
+    """
+    複数フレームに対して `ImageCvt` と `Contours` の処理をまとめて行う関数．
+    全フレームで1つの `ProcessingPipeline` を使い回すため，LUT・カーネル・出力先のバッファは共有される．
+    `ImageCvt`, `Contours` の返り値(1フレーム分の画像と重心位置)は GUI から使用されているため変更せず，
+    複数フレームの入力はこの関数で受け付けて，結果を1つの構造化配列で返す．
+
+    Args:
+        frames (Union[np.ndarray, Iterable[np.ndarray]]):
+            N×H×W×C (または N×H×W) の配列，もしくは画像を順に返すイテレータ．
+        pipeline (Union[ProcessingPipeline, None], optional):
+            構築済みの画像処理パイプライン．None の場合は kwargs から構築する．Defaults to None.
+        CalcCOG (Union[Literal["image", "outline", "components"], None], optional):
+            重心位置の計算対象．None の場合は重心を計算せず閾値のみを返す．Defaults to "image".
+        Retrieval (Literal["LIST", "EXTERNAL", "CCOMP", "TREE"], optional):
+            輪郭の親子関係の保持方法．Defaults to "TREE".
+        Approximate (Literal["Keep", "Not-Keep"], optional):
+            輪郭の中間点を保持するか指定．Defaults to "Keep".
+        orientation (bool, optional): オブジェクトの姿勢を推定する．Defaults to False.
+        min_area (int, optional): 輪郭として扱う領域の面積の閾値．Defaults to 100.
+        **kwargs: `ImageCvt` の画像処理の設定 (`Color_Space`, `Binarization` など)．
+
+    Returns:
+        result (np.ndarray): `BatchResultDtype` の構造化配列 (フレーム数の長さ)．
+            * index: フレーム番号
+            * l_th, u_th: 閾値．使用しなかった場合は NaN
+            * cx, cy, angle: 重心位置と回転角度．求まらなかった場合は NaN
+            * found: 重心位置が求まったか
+    """
+    if pipeline is None:
+        pipeline = ProcessingPipeline(**kwargs)
+    elif kwargs:
+        raise ValueError("`pipeline` を指定した場合は画像処理の設定を指定できません。")
+
+    if type(frames) == np.ndarray and frames.ndim not in (3, 4):
+        raise ValueError("`frames` は N×H×W×C または N×H×W の配列を指定してください。")
+
+    rows = []
+    for i, frame in enumerate(frames):
+        _, img, l_th, u_th = pipeline.run(frame)
+
+        COG = None
+        bin_img = img["bin"]
+        if CalcCOG is not None and bin_img is not None and cv2.countNonZero(bin_img):
+            try:
+                COG, _ = CenterOfGravity(
+                    rgb_img=None,
+                    bin_img=bin_img,
+                    Retrieval=Retrieval,
+                    Approximate=Approximate,
+                    min_area=min_area,
+                    cal_Method=CalcCOG,
+                    orientation=orientation,
+                )
+            except IndexError:
+                # 面積が min_area を超える輪郭が存在しない
+                COG = None
+
+        cx = cy = angle = np.nan
+        if COG is not None:
+            cx, cy = COG[0], COG[1]
+            if COG[2] is not None:
+                angle = COG[2]
+        rows.append(
+            (
+                i,
+                np.nan if l_th is None else l_th,
+                np.nan if u_th is None else u_th,
+                cx,
+                cy,
+                angle,
+                COG is not None,
+            )
+        )
+
+    return np.array(rows, dtype=BatchResultDtype)
+
+
 if __name__ == "__main__":
     response, cam = WebCam_OnOff(device_num=0)
     if response == 1:
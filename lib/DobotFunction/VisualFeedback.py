@@ -9,7 +9,7 @@ sys.path.append("../../")
 
 import cv2
 
-from lib.DobotFunction.Camera import SnapshotCvt, Contours
+from lib.DobotFunction.Camera import ProcessingPipeline, ROITracker, Snapshot
 
 
 class VisualFeedback(object):
@@ -186,40 +186,47 @@ class VisualFeedback(object):
         K_p = float(values["-Kp-"])
         K_i = float(values["-Ki-"])
 
-        dst_org = dst_bin = None
+        dst_org = None
         COG = []
         e_x = e_y = 0
 
         return_param = {"pose": None, "COG": []}
         try:
+            # 画像処理の設定はループ中に変わらないので，パイプラインを1度だけ作成する
+            pipeline = ProcessingPipeline(
+                Color_Space=values["-Color_Space-"],
+                Color_Density=values["-Color_Density-"],
+                Binarization=values["-Binarization-"],
+                LowerThreshold=int(values["-LowerThreshold-"]),
+                UpperThreshold=int(values["-UpperThreshold-"]),
+                AdaptiveThreshold_type=values["-AdaptiveThreshold_type-"],
+                AdaptiveThreshold_BlockSize=int(
+                    values["-AdaptiveThreshold_BlockSize-"]
+                ),
+                AdaptiveThreshold_Constant=int(
+                    values["-AdaptiveThreshold_Constant-"]
+                ),
+                color=color,
+            )
+            # 物体はフレーム間でほとんど動かないので，前回検出した物体の周辺だけを処理する
+            tracker = ROITracker()
             while True:
                 # スナップショット撮影
-                _, dst_org, dst_bin = SnapshotCvt(
-                    cam,
-                    Color_Space=values["-Color_Space-"],
-                    Color_Density=values["-Color_Density-"],
-                    Binarization=values["-Binarization-"],
-                    LowerThreshold=int(values["-LowerThreshold-"]),
-                    UpperThreshold=int(values["-UpperThreshold-"]),
-                    AdaptiveThreshold_type=values["-AdaptiveThreshold_type-"],
-                    AdaptiveThreshold_BlockSize=int(
-                        values["-AdaptiveThreshold_BlockSize-"]
-                    ),
-                    AdaptiveThreshold_Constant=int(
-                        values["-AdaptiveThreshold_Constant-"]
-                    ),
-                    color=color,
-                )
+                err, dst_org = Snapshot(cam)
+                if err != 3:
+                    ui_que.put(return_param)
+                    return
 
                 # 重心位置計算
-                COG, dst_org = Contours(
-                    rgb_img=dst_org.copy(),
-                    bin_img=dst_bin.copy(),
+                COG, _ = tracker.locate(
+                    dst_org,
+                    pipeline,
                     CalcCOG=str(values["-CalcCOGMode-"]),
                     Retrieval=str(values["-RetrievalMode-"]),
                     Approximate=str(values["-ApproximateMode-"]),
                     orientation=True,
-                    drawing_figure=False,
+                    # 量子化誤差による無駄な補正動作を減らすため，重心は小数で求める
+                    subpixel=True,
                 )
 
                 # 重心位置が取得できた場合
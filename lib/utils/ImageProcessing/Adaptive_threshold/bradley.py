@@ -3,56 +3,81 @@ from typing import Union, Tuple
 import cv2
 import numpy as np
 
-def Bradley_threshold(src: np.ndarray, kernel_size: Union[int, Tuple[int, int]]=5, T: int=0.30):
-    if kernel_size == None:
-        raise("It is invalid to assign None to `kernel_size`.")
+def Bradley_threshold(
+    src: np.ndarray,
+    kernel_size: Union[int, Tuple[int, int]]=5,
+    T: int=0.30,
+    int_img: Union[np.ndarray, None]=None,
+) -> np.ndarray:
+    """Bradley の適応的二値化処理を行う関数
+
+    積分画像をシフトしたスライスの加減算で全画素の矩形和を一括で計算する．
+    画像端では矩形を画像内にクリップし，矩形の面積が 0 になる画素も従来のループ実装と同じ値を返す．
+
+    Args:
+        src (np.ndarray): 入力画像
+        kernel_size (Union[int, Tuple[int, int]], optional): 平均を計算する近傍領域のサイズ. Defaults to 5.
+        T (int, optional): 平均値から閾値を決めるときの割合[%]. Defaults to 0.30.
+        int_img (Union[np.ndarray, None], optional):
+            事前に計算した `cv2.integral` の積分画像 (h+1, w+1)．
+            指定しない場合は関数内で計算する．Defaults to None.
+
+    Returns:
+        res (np.ndarray): 二値画像(0 or 255)
+    """
+    if kernel_size is None:
+        raise ValueError("It is invalid to assign None to `kernel_size`.")
     if isinstance(kernel_size, int):
         # int 型の場合の処理
         k = int(kernel_size)/2
     elif isinstance(kernel_size, tuple):
         # tuple 型の場合の処理
-        k = int(max(kernel_size/2))
+        k = int(max(kernel_size)/2)
     else:
-        raise("An unknown type was assigned to `kernel_size`.")
+        raise TypeError("An unknown type was assigned to `kernel_size`.")
 
     if len(src.shape) == 3:
         new_img = cv2.cvtColor(src, cv2.COLOR_RGB2GRAY)
     else:
-        new_img = src.copy()
-    res = np.zeros_like(new_img)
+        new_img = src
+    (h, w) = new_img.shape
 
     # 積分画像作成
-    int_img = cv2.integral(new_img)
+    if int_img is None:
+        int_img = cv2.integral(new_img)
+    elif int_img.shape != (h + 1, w + 1):
+        raise ValueError("The shape of `int_img` does not match `src`.")
 
-    (h, w) = new_img.shape
-    s2 = k
-    for col in range(w):
-        for row in range(h):
-            y0 = int(max(row-s2, 0))
-            y1 = int(min(row+s2, h-1))
-            x0 = int(max(col-s2, 0))
-            x1 = int(min(col+s2, w-1))
-            count = (y1-y0)*(x1-x0)
-            sum_ = -1
-            if count == 0:
-                if x0 == x1 and y0 == y1:
-                    sum_ = int_img[y0, x0]
-                if x1 == x0 and y0 != y1:
-                    sum_ = int_img[y1, x1] - int_img[y0, x1]
-                if y1 == y0 and x1 != x0:
-                    sum_ = int_img[y1, x1] - int_img[y1, x0]
-            else:
-                sum_ = int(int_img[y1, x1]) - int(int_img[y0, x1]) - int(int_img[y1, x0]) + int(int_img[y0, x0])
-                if sum_ < 0: sum_ = -1 * sum_
-
-            # mat[row,col] = sum_/count
-            mean = sum_/count
-
-            if new_img[row, col] < mean * (100-T)/100:
-            # if new_img[row, col] < mean * T:
-                res[row, col] = 0
-            else:
-                res[row, col] = 255
+    # 各行・各列の矩形の端点 (int() による 0 方向への切り捨てを再現する)
+    rows = np.arange(h)
+    cols = np.arange(w)
+    y0 = np.maximum(rows - k, 0).astype(np.intp)
+    y1 = np.minimum(rows + k, h - 1).astype(np.intp)
+    x0 = np.maximum(cols - k, 0).astype(np.intp)
+    x1 = np.minimum(cols + k, w - 1).astype(np.intp)
+
+    # 積分画像の四隅をシフトしたスライスとして取り出す
+    int_img = int_img.astype(np.int64, copy=False)
+    a = int_img[y1][:, x1]
+    b = int_img[y0][:, x1]
+    c = int_img[y1][:, x0]
+    d = int_img[y0][:, x0]
+
+    count = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+    sum_ = np.abs(a - b - c + d)
+
+    # 矩形の面積が 0 になる画素 (kernel_size < 2 や幅 1 の画像) の扱い
+    deg_y = (y0 == y1)[:, None]
+    deg_x = (x0 == x1)[None, :]
+    sum_ = np.where(deg_x & deg_y, d, sum_)
+    sum_ = np.where(deg_x & ~deg_y, a - b, sum_)
+    sum_ = np.where(deg_y & ~deg_x, a - c, sum_)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sum_ / count
+        thresh = mean * (100-T)/100
+
+    res = np.where(new_img < thresh, 0, 255).astype(np.uint8)
 
     return res
 
@@ -66,10 +91,6 @@ def get_int_img(src: np.ndarray) -> np.ndarray:
     Returns:
         int_img[np.ndarray]: 積分画像
     """
-    h, w = src.shape
     #integral img
-    int_img = np.zeros_like(src, dtype=np.uint32)
-    for col in range(w):
-        for row in range(h):
-            int_img[row,col] = src[0:row+1,0:col+1].sum()
-    return int_img
+    int_img = np.cumsum(np.cumsum(src, axis=0, dtype=np.uint64), axis=1)
+    return int_img.astype(np.uint32)
@@ -1,47 +1,62 @@
+from typing import Union
+
+import cv2
 import numpy as np
 
-def Wellner_threshold(src: np.ndarray) -> np.ndarray:
+def Wellner_threshold(
+    src: np.ndarray,
+    t: int = 15,
+    s: Union[int, None] = None,
+    serpentine: bool = False,
+) -> np.ndarray:
+    """Wellner の適応的二値化処理を行う関数
+
+    画素を1列に並べ，直前 s 画素の移動平均を累積和の差分から求めることで，
+    画像サイズに対して線形時間で二値化する．
+
+    Args:
+        src (np.ndarray): 入力画像
+        t (int, optional): 移動平均から閾値を決めるときの割合[%]. Defaults to 15.
+        s (Union[int, None], optional):
+            移動平均を計算する画素数．None の場合は画像の幅の 1/8 (最小 1)．Defaults to None.
+        serpentine (bool, optional):
+            True の場合は Wellner の原論文と同様に，奇数行を逆向きに走査する．Defaults to False.
+
+    Returns:
+        output (np.ndarray): 二値画像(移動平均より暗い画素が 255)
+    """
     if type(src) != np.ndarray:
-        raise("An undefined value was assigned to `binary_type`.")
-    new_img = src.copy()
+        raise TypeError("An undefined value was assigned to `src`.")
 
     if len(src.shape) == 2:
-        pass
+        new_img = src
     elif len(src.shape) == 3:
         # グレースケール化
-        new_img = new_img.convert('L')
+        new_img = cv2.cvtColor(src, cv2.COLOR_RGB2GRAY)
     else:
-        raise("Invalid input size for src.")
+        raise ValueError("Invalid input size for src.")
 
     (h, w) = new_img.shape
-    # 画素値を1行に整列
-    new_img = new_img.reshape((-1, 1))
-
-    # もし画像の幅が8で割り切れない場合
-    if w % 8 != 0:
-        raise("`w` is not divisible by `8`.")
-    else: s = int(w / 8)
-
-    t = 15
-    output = np.empty(0)
-    #移動平均(Moving average)を計算するためのlistを作成
-    MA_list = np.zeros((s))
-
-    for i, v in enumerate(new_img):
-        # list内の移動平均を計算する
-        MA = MA_list.sum() / s
-        MA_list_2 = MA_list[:-1].copy()
-        MA_list = np.insert(MA_list_2, 0, v)
-        #---------------------
-        # 二値化処理する
-        #---------------------
-        if v < MA * ((100-t) / 100):
-            v = 255
-        else:
-            v = 0
-
-        v = np.array(v)
-        output = np.r_[output, v]
-    # print('処理が終了しました。')
-    output = output.reshape((h, w)).astype(np.uint8)
+    if s is None:
+        s = max(w // 8, 1)
+
+    # 蛇行走査の場合は奇数行を反転させてから1行に整列
+    if serpentine:
+        new_img = new_img.copy()
+        new_img[1::2] = new_img[1::2, ::-1]
+    flat = new_img.ravel()
+
+    # 直前 s 画素の和を累積和から計算する (先頭 s 画素は 0 で埋めた窓として扱う)
+    csum = np.zeros(flat.size + 1, dtype=np.int64)
+    np.cumsum(flat, out=csum[1:])
+    start = np.maximum(np.arange(flat.size) - s, 0)
+    MA = (csum[:-1] - csum[start]) / s
+
+    #---------------------
+    # 二値化処理する
+    #---------------------
+    output = np.where(flat < MA * ((100-t) / 100), 255, 0).astype(np.uint8)
+    output = output.reshape((h, w))
+    if serpentine:
+        output[1::2] = output[1::2, ::-1]
     return output
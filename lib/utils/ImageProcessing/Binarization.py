@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Literal, Tuple
+from typing import Hashable, List, Literal, Sequence, Tuple, Union
 
 sys.path.append(".")
 sys.path.append("..")
@@ -12,6 +12,7 @@ import numpy as np
 from lib.utils.ImageProcessing.GrayScale import AutoGrayScale
 from lib.utils.ImageProcessing.Adaptive_threshold.bradley import Bradley_threshold
 from lib.utils.ImageProcessing.Adaptive_threshold.wellner import Wellner_threshold
+from lib.utils.ImageProcessing.FrameCache import FrameCache
 
 
 def GlobalThreshold(
@@ -83,46 +84,98 @@ def _OtsuThreshold(img: np.ndarray, min_value: int = 0, max_value: int = 255) ->
             変換後の画像データ
     """
     # ヒストグラムの算出
-    hist = [np.sum(img == i) for i in range(256)]
-    s_max = (0, -10)
+    hist = np.bincount(img.ravel(), minlength=256)[:256]
+    levels = np.arange(256)
+
+    # 閾値 th ごとのクラス1(th 未満)とクラス2(th 以上)の画素数と画素値の総和を累積和で計算
+    c_hist = np.cumsum(hist)
+    c_moment = np.cumsum(levels * hist)
+    n1 = np.concatenate(([0], c_hist[:-1]))
+    m1 = np.concatenate(([0], c_moment[:-1]))
+    n2 = c_hist[-1] - n1
+    m2 = c_moment[-1] - m1
+    n1 = n1.astype(np.float64)
+    n2 = n2.astype(np.float64)
+
+    # クラス1とクラス2の画素値の平均を計算
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu1 = np.where(n1 == 0, 0.0, m1 / n1)
+        mu2 = np.where(n2 == 0, 0.0, m2 / n2)
+
+    # 全ての閾値についてクラス間分散の分子を計算
+    s = n1 * n2 * (mu1 - mu2) ** 2
 
-    for th in range(256):
-        # クラス1とクラス2の画素数を計算
-        n1 = float(sum(hist[:th]))
-        n2 = float(sum(hist[th:]))
+    # クラス間分散が最大のとき閾値を取得
+    t = int(np.argmax(s))
 
-        # クラス1とクラス2の画素値の平均を計算
-        if n1 == 0:
-            mu1 = 0
-        else:
-            mu1 = sum([i * hist[i] for i in range(0, th)]) / n1
-        if n2 == 0:
-            mu2 = 0
-        else:
-            mu2 = sum([i * hist[i] for i in range(th, 256)]) / n2
+    # 算出した閾値で二値化処理
+    dst = np.where(img < t, min_value, max_value).astype(img.dtype)
 
-        # クラス間分散の分子を計算
-        s = n1 * n2 * (float(mu1) - float(mu2)) ** 2
+    return t, dst
 
-        # クラス間分散の分子が最大のとき、クラス間分散の分子と閾値を記録
-        if s > s_max[1]:
-            s_max = (th, s)
 
-    # クラス間分散が最大のとき閾値を取得
-    t = s_max[0]
+def MultiOtsuThreshold(img: np.ndarray, n_thresholds: int = 2) -> Tuple[int, ...]:
+    """
+    大津の手法を多クラスに拡張し，クラス間分散が最大となる複数の閾値を求める関数．
+    閾値を t1 < t2 < ... とすると，画素は [0, t1), [t1, t2), ..., [tn, 255] のクラスに分けられる．
+    ヒストグラムの累積モーメントを用いた動的計画法で計算するため，画像サイズに依らず高速に求まる．
 
-    # 算出した閾値で二値化処理
-    img[img < t] = min_value
-    img[img >= t] = max_value
+    Args:
+        img (np.ndarray):
+            グレースケール画像(uint8)
+        n_thresholds (int optional):
+            求める閾値の数(1 <= n_thresholds <= 3)
+            default: 2
 
-    return t, img
+    Returns:
+        thresholds (Tuple[int, ...]): 昇順に並べた閾値
+    """
+    if type(img) is not np.ndarray:  # 入力データがndarray型でない場合
+        raise ValueError("入力型が異なります。")
+    elif len(img.shape) != 2:  # 入力データがグレースケール画像でない場合
+        raise ValueError("入力はグレースケール画像でなければなりません。")
+    if not 1 <= n_thresholds <= 3:
+        raise ValueError("閾値の数は 1 から 3 の範囲で指定してください。")
+
+    hist = np.bincount(img.ravel(), minlength=256)[:256]
+    # 先頭に 0 を付けた累積画素数・累積モーメント (長さ 257)
+    P = np.concatenate(([0], np.cumsum(hist))).astype(np.float64)
+    S = np.concatenate(([0], np.cumsum(np.arange(256) * hist))).astype(np.float64)
+
+    # cost[a, b]: 画素値 [a, b) をひとつのクラスとしたときの S^2 / P
+    dP = P[None, :] - P[:, None]
+    dS = S[None, :] - S[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = np.where(dP > 0, dS ** 2 / dP, 0.0)
+    a, b = np.indices(cost.shape)
+    cost[a >= b] = -np.inf
+
+    # best[b]: 画素値 [0, b) を k+1 クラスに分けたときの最大値
+    best = cost[0]
+    args = []
+    for _ in range(n_thresholds):
+        total = best[:, None] + cost
+        arg = np.argmax(total, axis=0)
+        best = total[arg, np.arange(total.shape[1])]
+        args.append(arg)
+
+    # 最後のクラスの終端(256)から閾値を逆にたどる
+    thresholds = []
+    end = 256
+    for arg in reversed(args):
+        end = int(arg[end])
+        thresholds.append(end)
+
+    return tuple(reversed(thresholds))
 
 
 def AdaptiveThreshold(
     img: np.ndarray,
     method: Literal["Mean", "Gaussian", "Wellner"] = "Mean",
     block_size: int = 11,
-    C: int = 2
+    C: int = 2,
+    cache: Union[FrameCache, None] = None,
+    cache_key: Union[Hashable, None] = None,
 ):
     """
     適応的閾値処理では，画像の小領域ごとに閾値の値を計算する．
@@ -140,6 +193,11 @@ def AdaptiveThreshold(
         block_size (int optional): 閾値計算に使用する近傍領域のサイズ．
             ただし1より大きい奇数でなければならない．
         C (int optional): 計算された閾値から引く定数．
+        cache (Union[FrameCache, None], optional):
+            フレームごとの積分画像のキャッシュ．"Mean" の場合は近傍の平均を，"Bradley" の場合は積分画像を共有する．
+            "Mean" の結果は `cv2.adaptiveThreshold` と同じ．Defaults to None.
+        cache_key (Union[Hashable, None], optional):
+            img の内容を表すキー．cache に同じ key の計算結果があれば使い回す．Defaults to None.
     Return:
         dst (np.ndarray): 変換後の画像
     """
@@ -148,7 +206,12 @@ def AdaptiveThreshold(
     elif len(img.shape) != 2:  # 入力データがグレースケール画像でない場合
         raise ValueError("入力はグレースケール画像でなければなりません。")
 
-    if method == "Mean":
+    if method == "Mean" and cache is not None:
+        # cv2.adaptiveThreshold と同じく，(画素値 - 平均) > -ceil(C) の画素を白にする
+        mean = cache.BoxMean(block_size, img, cache_key)
+        diff = cv2.subtract(img, mean, dtype=cv2.CV_16S)
+        dst = cv2.compare(diff, -int(np.ceil(C)), cv2.CMP_GT)
+    elif method == "Mean":
         method = cv2.ADAPTIVE_THRESH_MEAN_C
         dst = cv2.adaptiveThreshold(
             src=img,
@@ -171,7 +234,8 @@ def AdaptiveThreshold(
     elif method == "Wellner":
         dst = Wellner_threshold(img)
     elif method == "Bradley":
-        dst = Bradley_threshold(img, kernel_size=block_size, T=C)
+        int_img = None if cache is None else cache.Integral(img, cache_key)
+        dst = Bradley_threshold(img, kernel_size=block_size, T=C, int_img=int_img)
 
     return dst
 
@@ -185,47 +249,93 @@ def _WellnerMethod(gray_img: np.ndarray, t: int = 15):
 
     Return:
         dst (np.ndarray): 変換後の画像
-    Raises:
-        ValueError: 画像の幅が8で割り切れなかった場合はエラー
     """
+    return Wellner_threshold(gray_img, t=t)
+
+
+# 抽出する色ごとの R, G, B チャンネルの条件
+# * "upper": 上側の閾値より大きい画素
+# * "lower": 下側の閾値以下の画素
+PickupColorBand = {
+    0: ("upper", "lower", "lower"),  # 赤
+    1: ("lower", "upper", "lower"),  # 緑
+    2: ("lower", "lower", "upper"),  # 青
+    3: ("upper", "upper", "upper"),  # 白
+    4: ("lower", "lower", "lower"),  # 黒
+}
+
+
+def ColorBandBounds(
+    PickupColor: int,
+    LowerThreshold: Union[int, Sequence[int]],
+    UpperThreshold: Union[int, Sequence[int]],
+) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+    """
+    `PickupColorBand` の表から，指定した色を抽出するための `cv2.inRange` の下限・上限を作成する関数．
 
-    # 画像の高さ(height), 幅(width), チャネル数(channel)を取得
-    (height, width) = gray_img.shape
+    Args:
+        PickupColor (int):
+            抽出したい色を指定する。
+            * 0: 赤, 1: 緑, 2: 青, 3: 白, 4: 黒色
+        LowerThreshold (Union[int, Sequence[int]]):
+            下側の閾値．チャンネル毎に指定する場合は (R, G, B) の順．
+        UpperThreshold (Union[int, Sequence[int]]):
+            上側の閾値．チャンネル毎に指定する場合は (R, G, B) の順．
 
-    # 画素値を1行に整列
-    gray_array = gray_img.reshape((-1, 1))
-    try:
-        # もし画像の幅が8で割り切れない場合
-        if width % 8 != 0:
-            raise ValueError("画像の幅が不正です！")  # 例外を発生させる
-        else:
-            s = int(width / 8)
-    except Exception as e:
-        print(e)
-        return None
+    Returns:
+        lowerb (Tuple[int, int, int]): 各チャンネルの下限(この値を含む)
+        upperb (Tuple[int, int, int]): 各チャンネルの上限(この値を含む)
+    """
+    if PickupColor not in PickupColorBand:
+        raise ValueError("選択されたカラーはピックアップできません。")
+
+    if np.isscalar(LowerThreshold):
+        LowerThreshold = (LowerThreshold,) * 3
+    if np.isscalar(UpperThreshold):
+        UpperThreshold = (UpperThreshold,) * 3
 
-    dst = np.empty(0)
-    # 移動平均(Moving average)を計算するためのlistを作成
-    MA_list = np.zeros((s))
-
-    for i, v in enumerate(gray_array):
-        # list内の移動平均を計算する
-        MA = MA_list.sum() / s
-        MA_list_2 = MA_list[:-1].copy()
-        MA_list = np.insert(MA_list_2, 0, v)
-        # ---------------------
-        # 二値化処理する
-        # ---------------------
-        if v < MA * ((100 - t) / 100):
-            v = 255
+    lowerb, upperb = [], []
+    for band, l_th, u_th in zip(PickupColorBand[PickupColor], LowerThreshold, UpperThreshold):
+        if band == "upper":
+            lowerb.append(int(u_th) + 1)
+            upperb.append(255)
         else:
-            v = 0
+            lowerb.append(0)
+            upperb.append(int(l_th))
 
-        v = np.array(v)
-        dst = np.r_[dst, v]
-    print("処理が終了しました。")
-    dst = dst.reshape((height, width)).astype(np.uint8)
-    return dst
+    return tuple(lowerb), tuple(upperb)
+
+
+def ColorBandThreshold(
+    img: np.ndarray,
+    LowerThreshold: Union[int, Sequence[int]] = 0,
+    UpperThreshold: Union[int, Sequence[int]] = 128,
+    PickupColor: int = 4,
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    1回の `cv2.inRange` で指定した色の領域を抽出する関数．
+
+    Args:
+        img (np.ndarray):
+            変換前のRGB画像
+        LowerThreshold (Union[int, Sequence[int]] optional):
+            下側の閾値．チャンネル毎に指定する場合は (R, G, B) の順．
+        UpperThreshold (Union[int, Sequence[int]] optional):
+            上側の閾値．チャンネル毎に指定する場合は (R, G, B) の順．
+        PickupColor (int optional):
+            抽出したい色を指定する。
+            * 0: 赤, 1: 緑, 2: 青, 3: 白, 4: 黒色
+            default: 4
+        dst (Union[np.ndarray, None] optional):
+            出力先の uint8 配列．指定した場合は新しい配列を確保せずに上書きする．
+
+    Return:
+        dst (np.ndarray):
+            抽出した領域が 255，それ以外が 0 の二値画像
+    """
+    lowerb, upperb = ColorBandBounds(PickupColor, LowerThreshold, UpperThreshold)
+    return cv2.inRange(img, lowerb, upperb, dst=dst)
 
 
 def TwoThreshold(
@@ -234,10 +344,12 @@ def TwoThreshold(
     UpperThreshold: int = 128,
     PickupColor: int = 4,
     Type: Literal["cv2", "Otsu"] = "cv2",
+    dst: Union[np.ndarray, None] = None,
 ):
     """
     上側と下側の2つの閾値で2値化を行う。
-    二値化には大局的閾値処理を用いる。
+    各チャンネルが上側の閾値より大きいか，下側の閾値以下かの組み合わせで色を判定し，
+    `ColorBandThreshold` で1回の走査で抽出する。
 
     Args:
         img (np.ndarray):
@@ -252,8 +364,11 @@ def TwoThreshold(
             default: 4
         Type (Literal["cv2", "Otsu"] optional):
             閾値の処理方法
-            * "cv2": OpenCVの関数を用いて二値化を行う: default
-            * "Otsu: 大津の二値化処理
+            * "cv2": 指定した閾値を用いる: default
+            * "Otsu: 多値の大津の二値化処理でチャンネル毎に下側・上側の閾値を自動で決める．
+                     LowerThreshold, UpperThreshold は無視される．
+        dst (Union[np.ndarray, None] optional):
+            出力先の uint8 配列．
 
     Return:
         IMAGE_bw (np.ndarray):
@@ -265,36 +380,122 @@ def TwoThreshold(
     elif len(img.shape) != 3:  # 入力データがグレースケール画像でない場合
         raise ValueError("入力はRGB画像でなければなりません。")
 
-    r, g, b = cv2.split(img)
+    if Type == "Otsu":
+        # 多値の大津の手法でチャンネル毎に下側・上側の閾値を自動で決める
+        # (クラス境界 t は「t 以上」を表すので，「上側の閾値より大きい」に合わせて 1 引く)
+        bounds = [
+            [t - 1 for t in MultiOtsuThreshold(img[:, :, i], n_thresholds=2)]
+            for i in range(3)
+        ]
+        LowerThreshold = [l_th for l_th, _ in bounds]
+        UpperThreshold = [u_th for _, u_th in bounds]
+
+    IMAGE_bw = ColorBandThreshold(
+        img,
+        LowerThreshold=LowerThreshold,
+        UpperThreshold=UpperThreshold,
+        PickupColor=PickupColor,
+        dst=dst,
+    )
 
-    # for Red
-    _, IMAGE_R_bw = GlobalThreshold(r, UpperThreshold, Type)
-    _, IMAGE_R__ = GlobalThreshold(r, LowerThreshold, Type)
-    IMAGE_R__ = cv2.bitwise_not(IMAGE_R__)
-    # for Green
-    _, IMAGE_G_bw = GlobalThreshold(g, UpperThreshold, Type)
-    _, IMAGE_G__ = GlobalThreshold(g, LowerThreshold, Type)
-    IMAGE_G__ = cv2.bitwise_not(IMAGE_G__)
-    # for Blue
-    _, IMAGE_B_bw = GlobalThreshold(b, UpperThreshold, Type)
-    _, IMAGE_B__ = GlobalThreshold(b, LowerThreshold, Type)
-    IMAGE_B__ = cv2.bitwise_not(IMAGE_B__)
+    return IMAGE_bw
 
-    IMAGE_bw = None
-    if PickupColor == 0:
-        IMAGE_bw = IMAGE_R_bw * IMAGE_G__ * IMAGE_B__  # 画素毎の積を計算 ⇒ 赤色部分の抽出
-    elif PickupColor == 1:
-        IMAGE_bw = IMAGE_G_bw * IMAGE_B__ * IMAGE_R__  # 画素毎の積を計算 ⇒ 緑色部分の抽出
-    elif PickupColor == 2:
-        IMAGE_bw = IMAGE_B_bw * IMAGE_R__ * IMAGE_G__  # 画素毎の積を計算 ⇒ 青色部分の抽出
-    elif PickupColor == 3:
-        IMAGE_bw = IMAGE_R_bw * IMAGE_G_bw * IMAGE_B_bw  # 画素毎の積を計算 ⇒ 白色部分の抽出
-    elif PickupColor == 4:
-        IMAGE_bw = IMAGE_R__ * IMAGE_G__ * IMAGE_B__  # 画素毎の積を計算 ⇒ 黒色部分の抽出
-    else:
-        raise ValueError("選択されたカラーはピックアップできません。")
 
-    return IMAGE_bw
+# 抽出する色ごとの HSV の範囲 ((H, S, V) の下限, (H, S, V) の上限)．上限・下限の値を含む．
+# H は OpenCV の 0-179，S, V は 0-255．赤のように H の下限が上限より大きい範囲は 0 を跨ぐ範囲を表す．
+PickupColorHSV = {
+    0: ((170, 80, 50), (10, 255, 255)),  # 赤
+    1: ((40, 60, 40), (85, 255, 255)),  # 緑
+    2: ((95, 80, 40), (130, 255, 255)),  # 青
+    3: ((0, 0, 200), (179, 40, 255)),  # 白
+    4: ((0, 0, 0), (179, 255, 50)),  # 黒
+}
+
+
+def HSVBounds(
+    PickupColor: int = 0,
+    hsv_range: Union[Tuple[Sequence[int], Sequence[int]], None] = None,
+) -> List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]]:
+    """
+    指定した色を `cv2.inRange` で抽出するための，HSV の下限・上限の組を作成する関数．
+    H の範囲が 0 を跨ぐ場合は，[下限, 179] と [0, 上限] の2つの範囲に分ける．
+
+    Args:
+        PickupColor (int, optional):
+            抽出したい色を指定する．`PickupColorHSV` の表を使用する．
+            * 0: 赤, 1: 緑, 2: 青, 3: 白, 4: 黒色
+            Defaults to 0.
+        hsv_range (Union[Tuple[Sequence[int], Sequence[int]], None], optional):
+            表の代わりに使用する HSV の範囲 ((H, S, V) の下限, (H, S, V) の上限)．Defaults to None.
+
+    Return:
+        bounds (List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]]):
+            (下限, 上限) の組の一覧 (値を含む)．H が 0 を跨がない場合は1組，跨ぐ場合は2組．
+    """
+    if hsv_range is None:
+        if PickupColor not in PickupColorHSV:
+            raise ValueError("選択されたカラーはピックアップできません。")
+        hsv_range = PickupColorHSV[PickupColor]
+
+    lowerb, upperb = (tuple(int(v) for v in b) for b in hsv_range)
+    if len(lowerb) != 3 or len(upperb) != 3:
+        raise ValueError("HSV の範囲は (H, S, V) の順に指定してください。")
+    if not (0 <= lowerb[0] <= 179 and 0 <= upperb[0] <= 179):
+        raise ValueError("H の範囲は 0 以上 179 以下で指定してください。")
+
+    if lowerb[0] <= upperb[0]:
+        return [(lowerb, upperb)]
+    # H が 0 を跨ぐ範囲
+    return [
+        (lowerb, (179, upperb[1], upperb[2])),
+        ((0, lowerb[1], lowerb[2]), upperb),
+    ]
+
+
+def HSVThreshold(
+    img: np.ndarray,
+    PickupColor: int = 0,
+    hsv_range: Union[Tuple[Sequence[int], Sequence[int]], None] = None,
+    is_hsv: bool = False,
+    hsv: Union[np.ndarray, None] = None,
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    HSV 空間の範囲で指定した色の領域を抽出する関数．
+    RGB 画像を入力した場合は `cv2.COLOR_RGB2HSV` で1回だけ HSV 変換する．
+    H の範囲が 0 を跨ぐ場合は，0 の両側の2つの範囲を抽出して合成する．
+
+    Args:
+        img (np.ndarray):
+            変換前の RGB 画像，または is_hsv=True の場合は `cv2.COLOR_RGB2HSV` で変換済みの HSV 画像
+        PickupColor (int, optional):
+            抽出したい色を指定する．
+            * 0: 赤, 1: 緑, 2: 青, 3: 白, 4: 黒色
+            Defaults to 0.
+        hsv_range (Union[Tuple[Sequence[int], Sequence[int]], None], optional):
+            表の代わりに使用する HSV の範囲 ((H, S, V) の下限, (H, S, V) の上限)．Defaults to None.
+        is_hsv (bool, optional): 入力が変換済みの HSV 画像である．Defaults to False.
+        hsv (Union[np.ndarray, None], optional): HSV 変換の出力先の uint8 配列．Defaults to None.
+        dst (Union[np.ndarray, None], optional): 出力先の uint8 配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray):
+            抽出した領域が 255，それ以外が 0 の二値画像
+    """
+    if type(img) is not np.ndarray:  # 入力データがndarray型でない場合
+        raise ValueError("入力型が異なります。")
+    elif len(img.shape) != 3:  # 入力データがカラー画像でない場合
+        raise ValueError("入力はRGB画像でなければなりません。")
+
+    bounds = HSVBounds(PickupColor, hsv_range)
+    if not is_hsv:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2HSV, dst=hsv)
+
+    lowerb, upperb = bounds[0]
+    dst = cv2.inRange(img, lowerb, upperb, dst=dst)
+    for lowerb, upperb in bounds[1:]:
+        dst = cv2.bitwise_or(dst, cv2.inRange(img, lowerb, upperb), dst=dst)
+    return dst
 
 
 if __name__ == "__main__":
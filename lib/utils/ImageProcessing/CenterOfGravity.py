@@ -1,6 +1,7 @@
+import math
 import sys
 import os
-from typing import List, Literal, Tuple, Union
+from typing import Any, Dict, List, Literal, Tuple, Union
 
 sys.path.append(".")
 sys.path.append("../")
@@ -12,6 +13,7 @@ import numpy as np
 CalcCOGMode = {
     "image": 0,
     "outline": 1,
+    "components": 2,
 }
 # 輪郭情報
 RetrievalMode = {
@@ -25,23 +27,88 @@ ApproximateMode = {
     "Keep": cv2.CHAIN_APPROX_NONE,
     "Not-Keep": cv2.CHAIN_APPROX_SIMPLE,
 }
+# `DetectObjects` の返り値の各オブジェクトの情報
+ObjectDtype = np.dtype(
+    [
+        ("id", np.int32),
+        ("cx", np.float64),
+        ("cy", np.float64),
+        ("area", np.int64),
+        ("x", np.int32),
+        ("y", np.int32),
+        ("w", np.int32),
+        ("h", np.int32),
+        ("angle", np.float64),
+        ("elongation", np.float64),
+    ]
+)
 
 
 def CenterOfGravity(
-    rgb_img: np.ndarray,
+    rgb_img: Union[np.ndarray, None],
     bin_img: np.ndarray,
     Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
     Approximate: Literal["Keep", "Not-Keep"] = "Keep",
     min_area=100,
-    cal_Method: Literal["image", "outline"] = "image",
+    cal_Method: Literal["image", "outline", "components"] = "image",
     orientation: bool = False,
     drawing_figure: bool = False,
+    offset: Tuple[int, int] = (0, 0),
+    min_elongation: float = 0.1,
+    refine_img: Union[np.ndarray, None] = None,
 ) -> Tuple[Union[List[float], None], np.ndarray]:
     """
     オブジェクトの図心を計算する関数
+    重心の計算は `DetectCOG`，描画は `OverlayRenderer` で行う．描画が不要な場合は `DetectCOG` を直接使用すること．
+
+    Args:
+        rgb_img (Union[np.ndarray, None]):
+            計算された重心位置を重ねて表示するRGB画像．この配列に直接描画する．None の場合は描画しない．
+        bin_img (np.ndarray): 重心計算対象の二値画像．
+        drawing_figure (bool optional): 輪郭線を描画し，描画した図をウインドウに表示する。default to True
+        その他の引数は `DetectCOG` と同じ．
+    Return:
+        G (Union[List[float], None]): G=[x, y, angle], オブジェクトの重心座標と，そのオブジェクトの2D平面での回転角度．
+        dst (np.ndarray): 重心位置が描画された画像
+    """
+    result = DetectCOG(
+        bin_img,
+        Retrieval=Retrieval,
+        Approximate=Approximate,
+        min_area=min_area,
+        cal_Method=cal_Method,
+        orientation=orientation,
+        offset=offset,
+        min_elongation=min_elongation,
+        refine_img=refine_img,
+    )
+    if result["COG"] is None or rgb_img is None:
+        return result["COG"], rgb_img
+
+    renderer = OverlayRenderer(result, bin_img, contours=drawing_figure)
+    rgb_img = renderer.render(rgb_img, dst=rgb_img)
+    if drawing_figure:
+        cv2.imshow("Convert", rgb_img)  # 画像を出力
+
+    return result["COG"], rgb_img
+
+
+def DetectCOG(
+    bin_img: np.ndarray,
+    Retrieval: Literal["LIST", "EXTERNAL", "CCOMP", "TREE"] = "TREE",
+    Approximate: Literal["Keep", "Not-Keep"] = "Keep",
+    min_area=100,
+    cal_Method: Literal["image", "outline", "components"] = "image",
+    orientation: bool = False,
+    offset: Tuple[int, int] = (0, 0),
+    min_elongation: float = 0.1,
+    refine_img: Union[np.ndarray, None] = None,
+) -> Dict[str, Any]:
+    """
+    オブジェクトの図心を計算する関数．描画は行わず，入力画像も変更しない．
+    描画が必要な場合は，返り値を `OverlayRenderer` に渡す．
 
     Args:
-        rgb_img (np.ndarray): 計算された重心位置を重ねて表示するRGB画像
         bin_img (np.ndarray): 重心計算対象の二値画像．
         Retrieval (Literal["LIST", "EXTERNAL", "CCOMP", "TREE"], optional):
             2値画像の画素値が 255 の部分と 0 の部分を分離した際に，その親子関係を保持するか指定．
@@ -55,20 +122,37 @@ def CenterOfGravity(
             * "Keep": 中間点も保持する。
             * cv2.CHAIN_APPROX_SIMPLE: 中間点は保持しない。
         min_area (int): 領域が占める面積の閾値を指定
-        cal_Method (Literal["image", "outline"] optional):
+        cal_Method (Literal["image", "outline", "components"] optional):
             重心位置の計算対象．Defaults to "image".
             * "image": 画像から重心を計算
             * "outline": オブジェクトの輪郭から重心を計算
-        orientation (bool, optional): オブジェクトの輪郭情報に基づいて姿勢を推定する関数．`cal_Method = 1` の場合のみ適用可能．Default to False.
-        drawing_figure (bool optional): 輪郭線と重心位置が示された図を描画する。default to True
+            * "components": 連結成分のラベリングを1回行い，面積が最大の連結成分の重心を計算．
+        orientation (bool, optional):
+            重心の計算に使用したモーメントから，オブジェクトの主軸の回転角度を推定する(`MomentOrientation`)．
+            円に近く主軸が定まらない場合の angle は None．Default to False.
+        offset (Tuple[int, int], optional):
+            bin_img を切り出した領域の左上の座標 (x, y)．重心と輪郭はこの分だけずらした元画像の座標で返す．
+            Defaults to (0, 0).
+        min_elongation (float, optional):
+            回転角度を採用する細長さの下限．これ未満のオブジェクトは円に近いとみなす．Defaults to 0.1.
+        refine_img (Union[np.ndarray, None], optional):
+            重心をサブピクセル精度で求め直すためのグレースケール画像または RGB 画像(元画像の座標)．
+            指定した場合，オブジェクトの外接矩形の周辺だけで輝度で重み付けした重心(`RefineCentroid`)を求め，
+            x, y を小数で返す．Defaults to None.
     Return:
-        G (Union[List[float], None]): G=[x, y, angle], オブジェクトの重心座標と，そのオブジェクトの2D平面での回転角度．
-        dst (np.ndarray): 重心位置が描画された二値画像
+        result (Dict[str, Any]): 検出結果
+            * "COG" (Union[List[float], None]): [x, y, angle]．オブジェクトが見つからない場合は None．
+            * "M" (Union[Dict[str, float], None]): 回転角度を求めたモーメント．主軸の描画に使用する．
+            * "rect" (Union[Tuple[int, int, int, int], None]): オブジェクトの外接矩形 (x, y, w, h)．元画像の座標．
+            * "contours" (Union[List[np.ndarray], None]): 抽出済みの輪郭(元画像の座標)．"outline" の場合のみ．
+            * "offset" (Tuple[int, int]): offset と同じ．
     """
     # ------------ #
     # 初期値設定 #
     # ------------ #
     angle = None
+    offset = (int(offset[0]), int(offset[1]))
+    result = {"COG": None, "M": None, "rect": None, "contours": None, "offset": offset}
     # 親子関係の保持設定
     if Retrieval in RetrievalMode:
         Retrieval = RetrievalMode[Retrieval]
@@ -91,6 +175,34 @@ def CenterOfGravity(
     if cal_Method == 0:
         M = cv2.moments(bin_img, False)
 
+    # 連結成分から重心を求める場合
+    elif cal_Method == 2:
+        n, labels, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            bin_img, 8, cv2.CV_32S, cv2.CCL_GRANA
+        )
+        if n <= 1:
+            return result
+        # 背景(ラベル 0)を除いて面積が最大の連結成分を選ぶ
+        label = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        if stats[label, cv2.CC_STAT_AREA] <= min_area:
+            return result
+
+        x, y, w, h = (int(v) for v in stats[label, :4])
+        result["rect"] = (x + offset[0], y + offset[1], w, h)
+        cx = int(centroids[label, 0]) + offset[0]
+        cy = int(centroids[label, 1]) + offset[1]
+        # マスク・モーメントは必要な場合のみ，選んだ連結成分の外接矩形内で求める
+        if refine_img is not None or orientation:
+            mask, _ = _ComponentMask(labels, label, stats[label])
+        if refine_img is not None:
+            cx, cy = __refine_cog(refine_img, mask, (x, y), offset, (cx, cy))
+        if orientation:
+            M = cv2.moments(mask, True)
+            angle = __moment_angle(M, min_elongation)
+            result["M"] = M
+        result["COG"] = [cx, cy, angle]
+        return result
+
     # 輪郭から重心を求める場合
     else:
         contours = _ExtractContours(
@@ -98,11 +210,11 @@ def CenterOfGravity(
             Retrieval=Retrieval,
             Approximate=Approximate,
             min_area=min_area,
+            offset=offset,
         )
-
-        # 等高線の描画（Contour line drawing）
-        if drawing_figure:
-            bin_img = __drawing_edge(bin_img, contours)
+        if not contours:
+            return result
+        result["contours"] = contours
 
         maxCont = contours[0]
         for c in contours:
@@ -111,44 +223,373 @@ def CenterOfGravity(
 
         M = cv2.moments(maxCont)
 
-        if orientation:
-            # オブジェクトの輪郭情報から回転角度を計算する．
-            # REF: https://seinzumtode.hatenadiary.jp/entry/20171121/1511241157
-            # OpenCV-Doc: http://labs.eecs.tottori-u.ac.jp/sd/Member/oyamada/OpenCV/html/py_tutorials/py_imgproc/py_contours/py_contour_features/py_contour_features.html
-            for i, cnt in enumerate(contours):
-                # ellipse = cv2.fitEllipse(cnt)
-                # dst_bin = cv2.ellipse(dst_bin, ellipse, (255, 0, 0), 2)
-                rect = cv2.minAreaRect(cnt)
-                # 角度計算の補正
-                # REF: https://stackoverflow.com/questions/15956124/minarearect-angles-unsure-about-the-angle-returned
-                _, (w, h), angle = rect
-                if w > h:
-                    angle += 90
-
-                # 外接矩形4点を求める
-                # box = cv2.boxPoints(ellipse)
-                box = cv2.boxPoints(rect)
-
-                box = np.int0(box)
-                rgb_img = cv2.drawContours(rgb_img, [box], 0, (0, 0, 255), 2)
-                # 小数点以下2桁に丸め
-                angle = round(angle, 2)
     if int(M["m00"]) == 0:
-        return None, rgb_img
+        return result
 
     try:
         cx, cy = int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
     except ZeroDivisionError:
-        return None, rgb_img
+        return result
+    # オブジェクトの外接矩形 (bin_img の座標)
+    if cal_Method == 0:
+        x, y, w, h = cv2.boundingRect(bin_img)
+        # 輪郭から求めた場合は輪郭の座標がすでにずれている
+        cx, cy = cx + offset[0], cy + offset[1]
+    else:
+        x, y, w, h = cv2.boundingRect(maxCont)
+        x, y = x - offset[0], y - offset[1]
+    result["rect"] = (x + offset[0], y + offset[1], w, h)
 
-    # 重心位置を円で表示
-    # 変数: img, 中心座標, 半径, 色
-    cv2.circle(rgb_img, center=(cx, cy), radius=10, color=100, thickness=2)
+    if refine_img is not None:
+        if cal_Method == 0:
+            mask = bin_img[y : y + h, x : x + w]
+        else:
+            # 外接矩形内の他のオブジェクトを含めないように，選んだ輪郭の内側だけをマスクにする
+            mask = _ContourMask(bin_img, maxCont, (x, y, w, h), offset)
+        cx, cy = __refine_cog(refine_img, mask, (x, y), offset, (cx, cy))
 
-    if drawing_figure:
-        cv2.imshow("Convert", rgb_img)  # 画像を出力
+    if orientation:
+        # 重心と同じモーメントから回転角度を計算する
+        angle = __moment_angle(M, min_elongation)
+        result["M"] = M
+
+    result["COG"] = [cx, cy, angle]
+    return result
+
+
+class OverlayRenderer(object):
+    """
+    `DetectCOG` の検出結果を，表示・保存などで必要になったときだけ描画するクラス．
+    検出処理では描画も画像のコピーも行わず，輪郭の抽出・描画は `render` を呼んだときに行う．
+    二値画像は参照のみを保持するため，`ProcessingPipeline` の出力を渡した場合は次の `run` の前に描画すること．
+    """
+
+    def __init__(
+        self,
+        result: Dict[str, Any],
+        bin_img: Union[np.ndarray, None] = None,
+        contours: bool = True,
+    ) -> None:
+        """
+        Args:
+            result (Dict[str, Any]): `DetectCOG` の返り値
+            bin_img (Union[np.ndarray, None], optional):
+                検出に使用した二値画像．輪郭が未抽出の場合はこの画像から抽出する．Defaults to None.
+            contours (bool, optional): 輪郭線を描画する．Defaults to True.
+        """
+        self.result = result
+        self.bin_img = bin_img
+        self.contours = contours
+
+    def render(
+        self, rgb_img: np.ndarray, dst: Union[np.ndarray, None] = None
+    ) -> np.ndarray:
+        """
+        輪郭線・主軸・重心位置を描画する関数．
+
+        Args:
+            rgb_img (np.ndarray): 描画する元画像
+            dst (Union[np.ndarray, None], optional):
+                描画先の配列．None の場合は rgb_img のコピーに描画し，rgb_img は変更しない．
+                rgb_img を指定すると直接描画する．Defaults to None.
+
+        Return:
+            dst (np.ndarray): 描画した画像
+        """
+        if dst is None:
+            dst = rgb_img.copy()
+        elif dst is not rgb_img:
+            np.copyto(dst, rgb_img)
+
+        COG = self.result["COG"]
+        if COG is None:
+            return dst
+
+        # 等高線の描画（Contour line drawing）
+        if self.contours:
+            contours = self._Contours()
+            if contours:
+                dst = cv2.drawContours(dst, contours, -1, color=(255, 0, 0), thickness=1)
+
+        cx, cy, angle = COG
+        M = self.result["M"]
+        if angle is not None and M is not None:
+            # 主軸の長さは λ1 の慣性半径の2倍 (楕円の長半径)
+            length = 2 * math.sqrt(max(M["mu20"], M["mu02"], 1.0) / max(M["m00"], 1.0))
+            theta = math.radians(angle + 90)
+            dx, dy = length * math.cos(theta), length * math.sin(theta)
+            dst = cv2.line(
+                dst,
+                (int(round(cx - dx)), int(round(cy - dy))),
+                (int(round(cx + dx)), int(round(cy + dy))),
+                (0, 0, 255),
+                2,
+            )
+
+        # 重心位置を円で表示
+        # 変数: img, 中心座標, 半径, 色
+        center = (int(round(cx)), int(round(cy)))
+        cv2.circle(dst, center=center, radius=10, color=100, thickness=2)
+        return dst
+
+    def _Contours(self) -> Union[List[np.ndarray], None]:
+        """描画する輪郭を返す関数．未抽出の場合は外接矩形の範囲の二値画像から抽出する．"""
+        if self.result["contours"] is not None:
+            return self.result["contours"]
+        rect = self.result["rect"]
+        if self.bin_img is None or rect is None:
+            return None
+        x, y, w, h = rect
+        ox, oy = self.result["offset"]
+        window = self.bin_img[y - oy : y - oy + h, x - ox : x - ox + w]
+        contours, _ = cv2.findContours(
+            window, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE, offset=(x, y)
+        )
+        if not contours:
+            return None
+        # 外接矩形には他の小さいオブジェクトの一部が含まれる場合があるので，面積が最大の輪郭のみ描画する
+        return [max(contours, key=cv2.contourArea)]
 
-    return [cx, cy, angle], rgb_img
+
+def MomentOrientation(
+    M: Dict[str, float], min_elongation: float = 0.1
+) -> Tuple[Union[float, None], float, bool]:
+    """
+    2次の中心モーメント (mu20, mu02, mu11) から，オブジェクトの主軸の回転角度と細長さを閉じた式で求める関数．
+    画像を走査し直さないため，重心の計算で求めたモーメントをそのまま使用できる．
+
+    Args:
+        M (Dict[str, float]): `cv2.moments` の返り値
+        min_elongation (float, optional):
+            回転角度を採用する細長さの下限．これ未満の場合は円に近く主軸が定まらないとみなす．Defaults to 0.1.
+
+    Returns:
+        angle (Union[float, None]):
+            回転角度[deg] (小数点以下2桁に丸めた値)．主軸の角度を θ として (θ mod 180) - 90 で，
+            従来の最小外接矩形による角度と同じ [-90, 90) の範囲．モーメントが 0 の場合は None．
+        elongation (float):
+            細長さ 1 - λ2/λ1 (λ1 >= λ2 は慣性モーメントの固有値)．円で 0，線分で 1 に近づく．
+        ambiguous (bool): elongation が min_elongation 未満で，回転角度が信頼できない
+    """
+    mu20, mu02, mu11 = M["mu20"], M["mu02"], M["mu11"]
+    diff = mu20 - mu02
+    root = math.sqrt(4 * mu11 * mu11 + diff * diff)
+    lam1 = (mu20 + mu02 + root) / 2
+    lam2 = (mu20 + mu02 - root) / 2
+    if lam1 <= 0:
+        return None, 0.0, True
+
+    elongation = 1 - max(lam2, 0.0) / lam1
+    theta = 0.5 * math.degrees(math.atan2(2 * mu11, diff))
+    # 丸めてから範囲に収める (θ = -0.001 などが 90 にならないように)
+    angle = round(round(theta, 2) % 180 - 90, 2)
+    return angle, elongation, elongation < min_elongation
+
+
+def __moment_angle(M: Dict[str, float], min_elongation: float) -> Union[float, None]:
+    """モーメントから回転角度を求める関数．円に近い場合は None を返す．"""
+    angle, _, ambiguous = MomentOrientation(M, min_elongation)
+    return None if ambiguous else angle
+
+
+def RefineCentroid(
+    img: np.ndarray,
+    rect: Tuple[int, int, int, int],
+    mask: np.ndarray,
+    margin: int = 1,
+) -> Union[Tuple[float, float], None]:
+    """
+    オブジェクトの外接矩形の周辺だけで，輝度で重み付けしたサブピクセル精度の重心を求める関数．
+    二値画像の重心は境界の画素を 0 か 1 で数えるため最大 1px 程度の量子化誤差を含む．
+    境界の画素の輝度は物体が画素を覆う割合に比例するため，物体と背景の輝度の間で正規化した値を重みとする．
+
+    Args:
+        img (np.ndarray): グレースケール画像または RGB 画像
+        rect (Tuple[int, int, int, int]): オブジェクトの外接矩形 (x, y, w, h)．img の座標．
+        mask (np.ndarray): 外接矩形の大きさのオブジェクトの二値マスク
+        margin (int, optional): 境界の画素として扱うマスクの外側の幅[px]．Defaults to 1.
+
+    Return:
+        COG (Union[Tuple[float, float], None]):
+            img の座標でのサブピクセル精度の重心 (x, y)．物体と背景の輝度差がない場合は None．
+    """
+    x, y, w, h = rect
+    if mask.shape[:2] != (h, w):
+        raise ValueError("`mask` の大きさが外接矩形と一致しません。")
+
+    # 境界の外側に背景だけの帯が残るように，外接矩形を 2 * margin 広げた窓を処理する
+    H, W = img.shape[:2]
+    pad = 2 * margin
+    x0, y0 = max(x - pad, 0), max(y - pad, 0)
+    x1, y1 = min(x + w + pad, W), min(y + h + pad, H)
+    win = img[y0:y1, x0:x1]
+    if len(win.shape) == 3:
+        win = cv2.cvtColor(win, cv2.COLOR_RGB2GRAY)
+    win = win.astype(np.float32)
+
+    inside = np.zeros(win.shape, dtype=np.uint8)
+    inside[y - y0 : y - y0 + h, x - x0 : x - x0 + w] = mask
+    # マスクを margin だけ膨張させた範囲を重心の計算対象とし，それ以外を背景とする
+    support = cv2.dilate(inside, None, iterations=margin) if margin > 0 else inside
+    background = support == 0
+    if not background.any():
+        return None
+    fg = float(win[inside > 0].mean())
+    bg = float(win[background].mean())
+    contrast = fg - bg
+    if abs(contrast) < 1:
+        return None
+
+    # 背景を 0，物体を 1 として輝度を正規化し，物体の内部は 1 に飽和させる
+    weight = (win - bg) * (1.0 / contrast)
+    np.clip(weight, 0, 1, out=weight)
+    weight[background] = 0
+    M = cv2.moments(weight, False)
+    if M["m00"] <= 0:
+        return None
+    return x0 + M["m10"] / M["m00"], y0 + M["m01"] / M["m00"]
+
+
+def __refine_cog(
+    refine_img: np.ndarray,
+    mask: np.ndarray,
+    origin: Tuple[int, int],
+    offset: Tuple[int, int],
+    COG: Tuple[int, int],
+) -> Tuple[float, float]:
+    """外接矩形内のマスクから `RefineCentroid` で重心を求め直す関数．求まらなかった場合は COG を返す．"""
+    h, w = mask.shape[:2]
+    rect = (origin[0] + offset[0], origin[1] + offset[1], w, h)
+    refined = RefineCentroid(refine_img, rect, mask)
+    return COG if refined is None else refined
+
+
+def DetectObjects(
+    bin_img: np.ndarray,
+    min_area: int = 100,
+    sort_by: Literal["area", "x", "y", "distance"] = "area",
+    origin: Union[Tuple[float, float], None] = None,
+    orientation: bool = False,
+    offset: Tuple[int, int] = (0, 0),
+    min_elongation: float = 0.1,
+) -> np.ndarray:
+    """
+    二値画像に含まれる面積が min_area より大きい全てのオブジェクトを検出する関数．
+    連結成分のラベリングを1回行うだけで，全オブジェクトの重心・面積・外接矩形を求める．
+    1回の撮影で複数のオブジェクトを順に処理する場合に使用する．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        min_area (int, optional): オブジェクトとみなす面積[px]の閾値．Defaults to 100.
+        sort_by (Literal["area", "x", "y", "distance"], optional):
+            オブジェクトの並び順．Defaults to "area".
+            * "area": 面積の大きい順
+            * "x": 重心の x 座標の小さい順
+            * "y": 重心の y 座標の小さい順
+            * "distance": origin からの距離の近い順
+        origin (Union[Tuple[float, float], None], optional):
+            sort_by="distance" の基準点 (x, y)．None の場合は画像の中心．Defaults to None.
+        orientation (bool, optional):
+            オブジェクトごとの中心モーメントから回転角度と細長さを求める(`MomentOrientation`)．
+            False の場合や円に近い場合 angle は NaN．Defaults to False.
+        min_elongation (float, optional): 回転角度を採用する細長さの下限．Defaults to 0.1.
+        offset (Tuple[int, int], optional):
+            bin_img を切り出した領域の左上の座標 (x, y)．座標は元画像の座標で返す．Defaults to (0, 0).
+
+    Return:
+        objects (np.ndarray):
+            `ObjectDtype` の構造化配列．id は連結成分のラベル番号，(x, y, w, h) は外接矩形．
+    """
+    if (type(bin_img) is not np.ndarray) or (len(bin_img.shape) != 2):
+        raise ValueError("入力画像が不正です！")
+    if sort_by not in ("area", "x", "y", "distance"):
+        raise ValueError("The `sort_by` is invalid.")
+
+    n, labels, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+        bin_img, 8, cv2.CV_32S, cv2.CCL_GRANA
+    )
+    # 背景(ラベル 0)と面積が小さい連結成分を除く
+    keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] > min_area) + 1
+
+    objects = np.empty(len(keep), dtype=ObjectDtype)
+    objects["id"] = keep
+    objects["cx"] = centroids[keep, 0] + offset[0]
+    objects["cy"] = centroids[keep, 1] + offset[1]
+    objects["area"] = stats[keep, cv2.CC_STAT_AREA]
+    objects["x"] = stats[keep, cv2.CC_STAT_LEFT] + offset[0]
+    objects["y"] = stats[keep, cv2.CC_STAT_TOP] + offset[1]
+    objects["w"] = stats[keep, cv2.CC_STAT_WIDTH]
+    objects["h"] = stats[keep, cv2.CC_STAT_HEIGHT]
+    objects["angle"] = np.nan
+    objects["elongation"] = np.nan
+
+    if orientation:
+        for obj in objects:
+            mask, _ = _ComponentMask(labels, obj["id"], stats[obj["id"]])
+            angle, elongation, ambiguous = MomentOrientation(
+                cv2.moments(mask, True), min_elongation
+            )
+            obj["elongation"] = elongation
+            if not ambiguous:
+                obj["angle"] = angle
+
+    if sort_by == "area":
+        order = np.argsort(-objects["area"], kind="stable")
+    elif sort_by == "distance":
+        if origin is None:
+            h, w = bin_img.shape
+            origin = (w / 2 + offset[0], h / 2 + offset[1])
+        dist = np.hypot(objects["cx"] - origin[0], objects["cy"] - origin[1])
+        order = np.argsort(dist, kind="stable")
+    else:
+        order = np.argsort(objects["c" + sort_by], kind="stable")
+    return objects[order]
+
+
+def _ComponentMask(
+    labels: np.ndarray, label: int, stat: np.ndarray
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    ラベル画像の1つの連結成分の外接矩形を切り出し，その連結成分を 255 とするマスクを作成する関数．
+
+    Args:
+        labels (np.ndarray): `cv2.connectedComponentsWithStats` のラベル画像
+        label (int): 連結成分のラベル
+        stat (np.ndarray): その連結成分の統計量 (x, y, w, h, area)
+
+    Returns:
+        mask (np.ndarray): 外接矩形の大きさのマスク
+        origin (Tuple[int, int]): 外接矩形の左上の座標 (x, y)
+    """
+    x, y, w, h = (int(v) for v in stat[:4])
+    mask = cv2.compare(labels[y : y + h, x : x + w], int(label), cv2.CMP_EQ)
+    return mask, (x, y)
+
+
+def _ContourMask(
+    bin_img: np.ndarray,
+    contour: np.ndarray,
+    rect: Tuple[int, int, int, int],
+    offset: Tuple[int, int] = (0, 0),
+) -> np.ndarray:
+    """
+    輪郭の外接矩形を切り出し，輪郭の内側にある bin_img の前景を 255 とするマスクを作成する関数．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        contour (np.ndarray): 輪郭 (bin_img の座標を offset だけずらした元画像の座標)
+        rect (Tuple[int, int, int, int]): 輪郭の外接矩形 (x, y, w, h)．bin_img の座標．
+        offset (Tuple[int, int], optional): 輪郭の座標のずれ (x, y)．Defaults to (0, 0).
+
+    Return:
+        mask (np.ndarray): 外接矩形の大きさのマスク
+    """
+    x, y, w, h = rect
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.drawContours(
+        mask, [contour], -1, 255, thickness=-1, offset=(-x - offset[0], -y - offset[1])
+    )
+    return cv2.bitwise_and(mask, bin_img[y : y + h, x : x + w])
 
 
 def _ExtractContours(
@@ -156,6 +597,7 @@ def _ExtractContours(
     Retrieval=cv2.RETR_EXTERNAL,
     Approximate=cv2.CHAIN_APPROX_NONE,
     min_area=100,
+    offset=(0, 0),
 ) -> np.ndarray:
     """
     画像に含まれるオブジェクトの輪郭(contours)を抽出する関数。
@@ -172,13 +614,16 @@ def _ExtractContours(
             * cv2.CHAIN_APPROX_NONE: 中間点も保持する。
             * cv2.CHAIN_APPROX_SIMPLE: 中間点は保持しない。
         min_area (int): 領域が占める面積の閾値を指定
+        offset (Tuple[int, int]): 輪郭の座標に加える値 (x, y)
 
     Returns:
         approx (list[int]): 近似した輪郭情報
     """
     # 輪郭検出（Detection contours）
     # contours: 輪郭線の画素位置の numpy 配列
-    contours, hierarchy = cv2.findContours(bin_img, Retrieval, Approximate)
+    contours, hierarchy = cv2.findContours(
+        bin_img, Retrieval, Approximate, offset=tuple(offset)
+    )
     # 小さい輪郭は誤検出として削除する
     contours = list(filter(lambda x: cv2.contourArea(x) > min_area, contours))
     # 輪郭近似（Contour approximation）
@@ -204,20 +649,6 @@ def __approx_contour(contours: List[int]) -> List[int]:
     return approx
 
 
-def __drawing_edge(src: np.ndarray, contours: list) -> np.ndarray:
-    """
-    入力されたimgに抽出した輪郭線を描く関数
-
-    Args:
-        src (np.ndarray): 輪郭線を描く元の画像データ
-        contours (list[int]): 画像から抽出した輪郭情報
-    Return:
-        dst (np.ndarray): 輪郭情報を描画した画像
-    """
-    dst = cv2.drawContours(src, contours, -1, color=(255, 0, 0), thickness=1)
-    return dst
-
-
 if __name__ == "__main__":
     from PIL import Image
     from matplotlib import pyplot as plt
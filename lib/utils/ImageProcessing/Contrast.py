@@ -1,7 +1,9 @@
 import os
 import sys
+import threading
 
-from typing import Literal
+from functools import lru_cache
+from typing import Literal, Union
 
 sys.path.append(".")
 sys.path.append("..")
@@ -10,6 +12,9 @@ sys.path.append("../../")
 import cv2
 import numpy as np
 
+# スレッド毎の CLAHE オブジェクトのキャッシュ
+_clahe_local = threading.local()
+
 
 def Contrast_cvt(src: np.ndarray, Color_Density: Literal["None", "Linear", "Non-Linear", "Histogram-Flatten"] = "None",) -> np.ndarray:
     """
@@ -24,15 +29,10 @@ def Contrast_cvt(src: np.ndarray, Color_Density: Literal["None", "Linear", "Non-
     Return:
     dst (np.ndarray): 変換後の画像
     """
-    a = 0.7
-    gamma = 0.5
-
     # new_img = src.copy()
 
-    if Color_Density == "Linear":  # 線形濃度変換を行う
-        dst = _LUT_curve(__curve_1, a, src)
-    elif Color_Density == "Non-Linear":  # ガンマ補正を行う
-        dst = _LUT_curve(__curve_5, gamma, src)
+    if Color_Density in ("Linear", "Non-Linear"):  # 線形濃度変換・ガンマ補正を行う
+        dst = cv2.LUT(src, ContrastLUT(Color_Density))
     elif Color_Density == "Histogram-Flatten":  # ヒストグラム平坦化を行う
         if len(src.shape) == 2:
             # if color_type == 'glay':  # グレー画像について変換
@@ -40,12 +40,56 @@ def Contrast_cvt(src: np.ndarray, Color_Density: Literal["None", "Linear", "Non-
         elif len(src.shape) == 3:
             # elif color_type == 'RGB':  # rgb画像について変換
             dst = _RGBHist(src)
-            dst = cv2.cvtColor(dst, cv2.COLOR_BGR2RGB)
     else:
         dst = src
     return dst
 
 
+def ContrastLUT(Color_Density: Literal["None", "Linear", "Non-Linear"] = "None") -> Union[np.ndarray, None]:
+    """
+    画素値ごとの濃度変換(点演算)を表す Look Up Table を返す関数．
+    ヒストグラム平坦化のように画素値だけで決まらない変換の場合は None を返す．
+
+    Args:
+        Color_Density (Literal["None", "Linear", "Non-Linear"], optional): 画像の濃度変換.
+            Defaults to "None".
+
+    Return:
+        LUT (Union[np.ndarray, None]): 256行の変換表．"None" の場合は恒等変換．
+    """
+    a = 0.7
+    gamma = 0.5
+
+    if Color_Density == "Linear":  # 線形濃度変換
+        return _CurveLUT(__curve_1, a)
+    elif Color_Density == "Non-Linear":  # ガンマ補正
+        return _CurveLUT(__curve_5, gamma)
+    elif Color_Density == "None":
+        return _CurveLUT(None, None)
+    else:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _CurveLUT(f, a: float) -> np.ndarray:
+    """
+    Look Up Tableを LUT[input][0] = output という256行の配列として作る。
+    曲線とパラメタの組ごとに1度だけ作成し，以降はキャッシュを返す．
+
+    Args:
+        f (function): 濃度変換に使用する曲線の関数．None の場合は恒等変換．
+        a (float): 曲線の計算に使用される変数
+
+    Return:
+        LUT (np.ndarray): 変換表
+    """
+    LUT = np.arange(256, dtype="uint8").reshape(-1, 1)
+    if f is not None:
+        LUT = f(a, LUT).astype("uint8")
+    LUT.setflags(write=False)
+    return LUT
+
+
 def _LUT_curve(f, a: float, rgb_img: np.ndarray) -> np.ndarray:
     """
     Look Up Tableを LUT[input][0] = output という256行の配列として作る。
@@ -60,10 +104,7 @@ def _LUT_curve(f, a: float, rgb_img: np.ndarray) -> np.ndarray:
         dst (np.ndarray): 変換後の画像
 
     """
-    LUT = np.arange(256, dtype="uint8").reshape(-1, 1)
-    LUT = np.array([f(a, x).astype("uint8") for x in LUT])
-
-    dst = cv2.LUT(rgb_img, LUT)
+    dst = cv2.LUT(rgb_img, _CurveLUT(f, a))
 
     return dst
 
@@ -117,10 +158,8 @@ def _GlayHist(
         dst (np.ndarray):
             変換後の画像
     """
-    dst = glay_img.copy()
-    clahe = cv2.createCLAHE(cliplimit=clip_limit, tileGridSize=grid)
-    dst = clahe.apply(dst)
-    # dst = new_img.copy()
+    clahe = _GetCLAHE(clip_limit, grid)
+    dst = clahe.apply(glay_img)
     dst[dst > thresh] = 255
     return dst
 
@@ -148,26 +187,44 @@ def _RGBHist(
         dst (np.ndarray):
             変換後の画像
     """
-    dst = rgb_img.copy()
-    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=grid)
-    r, g, b = cv2.split(dst)
+    clahe = _GetCLAHE(clip_limit, grid)
 
-    # r, g, bそれぞれで変換を行う
-    dst_R = clahe.apply(r)
-    dst_G = clahe.apply(g)
-    dst_B = clahe.apply(b)
+    # 輝度チャンネル(Y)のみを平坦化し，色差はそのまま残す
+    ycrcb = cv2.cvtColor(rgb_img, cv2.COLOR_RGB2YCrCb)
+    y = cv2.extractChannel(ycrcb, 0)
+    cv2.insertChannel(clahe.apply(y), ycrcb, 0)
+    dst = cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2RGB)
 
-    th_R, th_G, th_B = dst_R.copy(), dst_G.copy(), dst_B.copy()
-    th_R[dst_R > thresh] = 255
-    th_G[dst_G > thresh] = 255
-    th_B[dst_B > thresh] = 255
-
-    dst = cv2.merge((th_R, th_G, th_B))
-    dst = dst[:, :, ::-1]
+    dst[dst > thresh] = 255
 
     return dst
 
 
+def _GetCLAHE(clip_limit: float, grid: tuple) -> cv2.CLAHE:
+    """
+    (clip_limit, grid) ごとに CLAHE オブジェクトを使い回すための関数．
+    CLAHE は内部に作業領域を持つため，スレッド毎に別のキャッシュを持つ
+    (VF のワーカースレッドと GUI のプレビューで状態を共有しない)．
+
+    Args:
+        clip_limit (float): コントラストの強調制限
+        grid (tuple): タイルサイズ
+
+    Return:
+        clahe (cv2.CLAHE): CLAHE オブジェクト
+    """
+    cache = getattr(_clahe_local, "cache", None)
+    if cache is None:
+        cache = _clahe_local.cache = {}
+
+    key = (float(clip_limit), tuple(grid))
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=key[0], tileGridSize=key[1])
+        cache[key] = clahe
+    return clahe
+
+
 if __name__ == "__main__":
     import json
     from PIL import Image
@@ -38,6 +38,156 @@ def Harris(img: np.ndarray, blockSize: int =2, ksize: int =3, k: float =0.04):
     return dst
 
 
+class CornerTracker(object):
+    """Harrisコーナーを1度だけ検出し、以降のフレームではピラミッド Lucas-Kanade 法で追跡するクラス
+
+    追跡できた点が min_tracks を下回った場合のみ、コーナーを検出し直すため、
+    フレーム毎の計算は画像全体のコーナー応答ではなく追跡点の更新だけになる。
+    検出し直す場合も追跡中の点とその識別番号はそのまま残し、追跡中の点から min_distance 以上離れたコーナーだけを補充する。
+
+    Parameters
+    ----------
+    max_corners (int):
+        検出するコーナーの最大数
+        default: 100
+    quality (float):
+        最も強いコーナーの応答に対する、検出するコーナーの応答の下限の割合
+        default: 0.01
+    min_distance (int):
+        コーナー同士の最小距離 (非極大値抑制)
+        default: 10
+    blockSize (int):
+        コーナー検出の際に考慮する隣接領域のサイズ
+        default: 3
+    k (float):
+        Harrisコーナー検出のフリーパラメータ
+        default 0.04
+    min_tracks (int):
+        追跡を続ける点の最小数。None の場合は max_corners の半分
+        default None
+    win_size (tuple):
+        Lucas-Kanade 法の探索窓のサイズ
+        default (21, 21)
+    max_level (int):
+        Lucas-Kanade 法で使用するピラミッドの最大レベル
+        default 3
+    fb_threshold (float):
+        前後方向に追跡した位置のずれの許容値[px]。None の場合は確認しない
+        default 1.0
+    """
+
+    def __init__(
+        self,
+        max_corners: int = 100,
+        quality: float = 0.01,
+        min_distance: int = 10,
+        blockSize: int = 3,
+        k: float = 0.04,
+        min_tracks: int = None,
+        win_size: tuple = (21, 21),
+        max_level: int = 3,
+        fb_threshold: float = 1.0,
+    ):
+        self.max_corners = max_corners
+        self.quality = quality
+        self.min_distance = min_distance
+        self.blockSize = blockSize
+        self.k = k
+        self.min_tracks = max_corners // 2 if min_tracks is None else min_tracks
+        self.win_size = tuple(win_size)
+        self.max_level = max_level
+        self.fb_threshold = fb_threshold
+        # コーナーの位置の修正の設定
+        self.subpix_win = (5, 5)
+        self.criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+        self.reset()
+
+    def reset(self):
+        """追跡中の点を破棄し、次のフレームでコーナーを検出し直す"""
+        self.points = np.empty((0, 2), dtype=np.float32)
+        self.ids = np.empty((0,), dtype=np.int64)
+        self._next_id = 0
+        self._prev = None
+
+    def update(self, img: np.ndarray):
+        """新しいフレームでコーナーを追跡する関数
+
+        Parameters
+        ----------
+        img (ndarray):
+            入力画像 (RGB またはグレースケール)
+
+        Returns
+        -------
+        points (ndarray):
+            (N, 2) のサブピクセル精度のコーナー座標 (x, y)
+        ids (ndarray):
+            (N,) の各コーナーの識別番号。補充した点には新しい番号が割り当てられる
+        """
+        if len(img.shape) != 2:
+            gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = img
+
+        if self._prev is not None and self._prev.shape == gray.shape and len(self.points) > 0:
+            self._track(gray)
+        if len(self.points) < self.min_tracks:
+            self._detect(gray)
+
+        # 入力画像は呼び出し側で上書きされる可能性があるため、次のフレーム用に保持する
+        if self._prev is None or self._prev.shape != gray.shape:
+            self._prev = np.empty_like(gray)
+        np.copyto(self._prev, gray)
+        return self.points, self.ids
+
+    def _track(self, gray: np.ndarray):
+        """前フレームの点を Lucas-Kanade 法で追跡する関数"""
+        prev = self.points.reshape(-1, 1, 2)
+        lk = dict(winSize=self.win_size, maxLevel=self.max_level, criteria=self.criteria)
+        nxt, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, prev, None, **lk)
+        good = status.ravel() == 1
+
+        if self.fb_threshold is not None:
+            # 逆方向に追跡して元の位置に戻らない点は誤追跡として除く
+            back, status_b, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev, nxt, None, **lk)
+            err = np.linalg.norm((back - prev).reshape(-1, 2), axis=1)
+            good &= (status_b.ravel() == 1) & (err < self.fb_threshold)
+
+        self.points = nxt.reshape(-1, 2)[good]
+        self.ids = self.ids[good]
+
+    def _detect(self, gray: np.ndarray):
+        """追跡中の点の周辺を除いてHarrisコーナーを検出し、サブピクセル精度に修正して補充する関数"""
+        n = self.max_corners - len(self.points)
+        if n <= 0:
+            return
+        # 追跡中の点から min_distance 未満の位置では検出しない
+        mask = np.full(gray.shape, 255, dtype=np.uint8)
+        for x, y in self.points:
+            cv2.circle(mask, (int(round(x)), int(round(y))), self.min_distance, 0, -1)
+
+        corners = cv2.goodFeaturesToTrack(
+            gray,
+            maxCorners=n,
+            qualityLevel=self.quality,
+            minDistance=self.min_distance,
+            mask=mask,
+            blockSize=self.blockSize,
+            useHarrisDetector=True,
+            k=self.k,
+        )
+        if corners is None:
+            return
+
+        corners = cv2.cornerSubPix(gray, corners, self.subpix_win, (-1, -1), self.criteria)
+        corners = corners.reshape(-1, 2)
+        self.points = np.concatenate([self.points, corners]).astype(np.float32)
+        self.ids = np.concatenate(
+            [self.ids, np.arange(self._next_id, self._next_id + len(corners))]
+        )
+        self._next_id += len(corners)
+
+
 if __name__ == "__main__":
     from matplotlib import pyplot as plt
     from PIL import Image
@@ -8,6 +8,8 @@ sys.path.append("../../")
 import numpy as np
 import cv2
 
+from lib.utils.ImageProcessing.Kernels import laplacian
+
 
 def canny(src, thresh1=100, thresh2=200):
     """
@@ -28,8 +30,7 @@ def canny(src, thresh1=100, thresh2=200):
         出力画像
 
     """
-    new_img = src.copy()
-    dst = cv2.Canny(new_img, thresh1, thresh2)
+    dst = cv2.Canny(src, thresh1, thresh2)
 
     return dst
 
@@ -54,8 +55,7 @@ def LoG(src, ksize=(3, 3), sigmaX=1.3, l_ksize=3):
     dst : OpenCV型
         出力画像
     """
-    new_img = src.copy()
-    dst = cv2.GaussianBlur(new_img, ksize, sigmaX)
+    dst = cv2.GaussianBlur(src, ksize, sigmaX)
     dst = laplacian(dst, ksize=l_ksize)
 
     return dst
@@ -0,0 +1,241 @@
+import re
+import sys
+from typing import Dict, Sequence, Tuple, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import cv2
+import numpy as np
+
+# プレヴィットフィルタのカーネル (Kernels.prewitt と同じ)
+PrewittKernel = {
+    "x": np.array([[1, 1, 1], [0, 0, 0], [-1, -1, -1]], dtype=np.float32),
+    "y": np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]], dtype=np.float32),
+}
+
+
+def ParseFilterSpec(spec: str) -> Tuple[str, Dict[str, Union[str, float, int]]]:
+    """
+    フィルタの指定文字列を解釈する関数。
+
+    Parameters
+    ----------
+    spec (str):
+        フィルタの指定。σ は "1.3"、"σ=1.3"、"sigma=1.3" のいずれでも指定できる。
+        * "gaussian <σ> [ksize]"   : ガウシアンフィルタ (ksize を省略すると σ から自動で決定)
+        * "sobel x|y|xy [σ]"       : ソーベルフィルタ (x, y は int16 の微分値、xy は float32 の勾配強度)
+        * "canny <th1>/<th2> [σ]"  : Canny エッジ検出 (ソーベルフィルタの結果を共有する)
+        * "laplacian [ksize]"      : ラプラシアンフィルタ (int16)
+        * "log <σ> [ksize]"        : ガウシアンフィルタの後のラプラシアンフィルタ (int16)
+        * "prewitt x|y"            : プレヴィットフィルタ (uint8)
+        σ を指定したソーベル・Canny は、同じ σ のガウシアンフィルタの結果を入力とする。
+        ソーベルフィルタは `cv2.Canny` と同じく画像の端を BORDER_REPLICATE で拡張する。
+
+    Returns
+    -------
+    name (str):
+        フィルタ名
+    params (Dict[str, Union[str, float, int]]):
+        フィルタのパラメタ
+    """
+    tokens = [re.sub(r"^(σ|sigma)=", "", t) for t in spec.strip().lower().split()]
+    if not tokens:
+        raise ValueError("The filter spec is empty.")
+    name, args = tokens[0], tokens[1:]
+
+    try:
+        if name == "gaussian" and 1 <= len(args) <= 2:
+            ksize = int(args[1]) if len(args) > 1 else 0
+            params = {"sigma": float(args[0]), "ksize": ksize}
+        elif name == "sobel" and 1 <= len(args) <= 2 and args[0] in ("x", "y", "xy"):
+            params = {"axis": args[0], "sigma": float(args[1]) if len(args) > 1 else 0.0}
+        elif name == "canny" and 1 <= len(args) <= 2:
+            th1, th2 = args[0].split("/")
+            params = {
+                "th1": float(th1),
+                "th2": float(th2),
+                "sigma": float(args[1]) if len(args) > 1 else 0.0,
+            }
+        elif name == "laplacian" and len(args) <= 1:
+            params = {"sigma": 0.0, "ksize": int(args[0]) if args else 3}
+        elif name == "log" and 1 <= len(args) <= 2:
+            ksize = int(args[1]) if len(args) > 1 else 3
+            params = {"sigma": float(args[0]), "ksize": ksize}
+        elif name == "prewitt" and len(args) == 1 and args[0] in ("x", "y"):
+            params = {"axis": args[0]}
+        else:
+            raise ValueError
+    except ValueError:
+        raise ValueError("Invalid filter spec: '{}'".format(spec))
+
+    return name, params
+
+
+class FilterBank(object):
+    """
+    複数のフィルタ出力を1度にまとめて計算するクラス。
+    ガウシアンフィルタの結果(σ ごと)とソーベルフィルタの微分値は各フィルタで共有し、1フレームにつき1回だけ計算する。
+    中間結果のバッファは呼び出し間で使い回すため、入力画像のコピーは作成しない。
+
+    Parameters
+    ----------
+    specs (Sequence[str]):
+        計算するフィルタの指定 (`ParseFilterSpec` を参照)。返り値の辞書のキーになる。
+    """
+
+    def __init__(self, specs: Sequence[str]):
+        self.specs = list(specs)
+        self._filters = [(spec,) + ParseFilterSpec(spec) for spec in self.specs]
+        self._buffers = {}
+
+    def __call__(
+        self,
+        src: np.ndarray,
+        out: Union[Dict[str, np.ndarray], None] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        全てのフィルタを適用する関数。
+
+        Parameters
+        ----------
+        src (ndarray):
+            入力画像 (uint8)
+        out (Dict[str, ndarray]):
+            フィルタの指定をキーとする出力先の配列。指定した出力はその配列に書き込む。
+            指定しない出力はクラス内のバッファに書き込まれ、次の呼び出しで上書きされる。
+            default None
+
+        Returns
+        -------
+        dsts (Dict[str, ndarray]):
+            フィルタの指定をキーとする出力画像
+        """
+        if type(src) != np.ndarray:
+            raise TypeError("An undefined value was assigned to `src`.")
+        if out is None:
+            out = {}
+
+        self._src = src
+        self._blurs = {}
+        self._grads = {}
+        dsts = {}
+        for spec, name, params in self._filters:
+            dst = out.get(spec)
+            if name == "gaussian":
+                dsts[spec] = self._blur(params["sigma"], params["ksize"], dst)
+            elif name == "sobel":
+                dx, dy = self._sobel(params["sigma"])
+                if params["axis"] == "x":
+                    dsts[spec] = _copy_to(dx, dst)
+                elif params["axis"] == "y":
+                    dsts[spec] = _copy_to(dy, dst)
+                else:
+                    fx = self._buffer(("fx", params["sigma"]), dx.shape, np.float32)
+                    fy = self._buffer(("fy", params["sigma"]), dy.shape, np.float32)
+                    np.copyto(fx, dx)
+                    np.copyto(fy, dy)
+                    if dst is None:
+                        dst = self._buffer(spec, dx.shape, np.float32)
+                    dsts[spec] = cv2.magnitude(fx, fy, dst)
+            elif name == "canny":
+                dx, dy = self._sobel(params["sigma"])
+                if dst is None:
+                    dst = self._buffer(spec, dx.shape[:2], np.uint8)
+                dsts[spec] = cv2.Canny(dx, dy, params["th1"], params["th2"], edges=dst)
+            elif name in ("laplacian", "log"):
+                blur = self._blur(params["sigma"], 0)
+                if dst is None:
+                    dst = self._buffer(spec, blur.shape, np.int16)
+                dsts[spec] = cv2.Laplacian(
+                    blur, cv2.CV_16S, dst=dst, ksize=params["ksize"]
+                )
+            elif name == "prewitt":
+                if dst is None:
+                    dst = self._buffer(spec, src.shape, src.dtype)
+                dsts[spec] = cv2.filter2D(
+                    src, -1, PrewittKernel[params["axis"]], dst=dst
+                )
+
+        # 入力画像への参照を残さない
+        self._src = self._blurs = self._grads = None
+        return dsts
+
+    def _buffer(self, key, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """キーごとに確保したバッファを返す関数。形状や型が変わった場合のみ確保し直す。"""
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+
+    def _blur(
+        self, sigma: float, ksize: int, dst: Union[np.ndarray, None] = None
+    ) -> np.ndarray:
+        """σ ごとに1回だけガウシアンフィルタを適用する関数 (σ, ksize がともに 0 の場合は入力画像)"""
+        if sigma == 0 and ksize == 0:
+            return self._src if dst is None else _copy_to(self._src, dst)
+        key = (sigma, ksize)
+        blur = self._blurs.get(key)
+        if blur is None:
+            if dst is None:
+                dst = self._buffer(("blur",) + key, self._src.shape, self._src.dtype)
+            blur = cv2.GaussianBlur(self._src, (ksize, ksize), sigma, dst=dst)
+            self._blurs[key] = blur
+        elif dst is not None:
+            blur = _copy_to(blur, dst)
+        return blur
+
+    def _sobel(self, sigma: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        σ ごとに1回だけ x, y 方向のソーベルフィルタ (int16) を適用する関数。
+        境界は `cv2.Canny` の内部のソーベルフィルタと同じく BORDER_REPLICATE とする。
+        """
+        grads = self._grads.get(sigma)
+        if grads is None:
+            blur = self._blur(sigma, 0)
+            dx = self._buffer(("dx", sigma), blur.shape, np.int16)
+            dy = self._buffer(("dy", sigma), blur.shape, np.int16)
+            cv2.Sobel(
+                blur, cv2.CV_16S, 1, 0, dst=dx, ksize=3, borderType=cv2.BORDER_REPLICATE
+            )
+            cv2.Sobel(
+                blur, cv2.CV_16S, 0, 1, dst=dy, ksize=3, borderType=cv2.BORDER_REPLICATE
+            )
+            grads = self._grads[sigma] = (dx, dy)
+        return grads
+
+
+def _copy_to(src: np.ndarray, dst: Union[np.ndarray, None]) -> np.ndarray:
+    """dst が指定されている場合のみ src を書き込む関数"""
+    if dst is None:
+        return src
+    np.copyto(dst, src)
+    return dst
+
+
+def ApplyFilters(
+    src: np.ndarray,
+    specs: Sequence[str],
+    out: Union[Dict[str, np.ndarray], None] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    複数のフィルタを1度だけ適用する関数。連続したフレームを処理する場合は `FilterBank` を使い回すこと。
+
+    Parameters
+    ----------
+    src (ndarray):
+        入力画像
+    specs (Sequence[str]):
+        計算するフィルタの指定 (e.g. ["gaussian 1.3", "sobel xy", "canny 100/200"])
+    out (Dict[str, ndarray]):
+        フィルタの指定をキーとする出力先の配列
+        default None
+
+    Returns
+    -------
+    dsts (Dict[str, ndarray]):
+        フィルタの指定をキーとする出力画像
+    """
+    return FilterBank(specs)(src, out)
@@ -0,0 +1,250 @@
+import sys
+from typing import Dict, Hashable, Tuple, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import cv2
+import numpy as np
+
+from lib.utils.ImageProcessing.pyramid import ImagePyramid
+
+
+class FrameCache(object):
+    """
+    1フレーム分の積分画像・二乗積分画像・箱フィルタの平均・画像ピラミッドを保持するクラス．
+    各値は最初に参照されたときに計算し，`update` で新しいフレームが渡されると破棄する．
+    積分画像などは入力配列ごと，または key ごとに保持する．
+    `ProcessingPipeline.run` のように処理のたびに新しい配列を作る場合は，同じ内容の画像に同じ key を付けることで，
+    同じフレームに対する別の処理(パラメタの異なる二値化処理など)とも計算結果を共有できる．
+    """
+
+    def __init__(
+        self,
+        src: Union[np.ndarray, None] = None,
+        gray_code: int = cv2.COLOR_RGB2GRAY,
+        max_level: int = 4,
+    ) -> None:
+        """
+        Args:
+            src (Union[np.ndarray, None], optional): 最初のフレーム．Defaults to None.
+            gray_code (int, optional):
+                カラー画像をグレースケール化する変換コード．Defaults to cv2.COLOR_RGB2GRAY.
+            max_level (int, optional): 画像ピラミッドの最大レベル．Defaults to 4.
+        """
+        self.gray_code = gray_code
+        self.max_level = max_level
+        self.update(src)
+
+    def update(self, src: Union[np.ndarray, None]) -> None:
+        """
+        新しいフレームに切り替え，前のフレームから計算した値を破棄する関数．
+
+        Args:
+            src (Union[np.ndarray, None]): 新しいフレーム
+        """
+        self.frame = src
+        self._gray = None
+        self._pyramid = None
+        # id(配列) または key -> {"img": 配列, "sum": 積分画像, "sqsum": 二乗積分画像, "box": {ksize: 平均}}
+        self._integrals: Dict[Hashable, Dict[str, np.ndarray]] = {}
+
+    @property
+    def gray(self) -> np.ndarray:
+        """フレームのグレースケール画像"""
+        if self._gray is None:
+            if self.frame is None:
+                raise ValueError("フレームが設定されていません。")
+            if len(self.frame.shape) == 2:
+                self._gray = self.frame
+            else:
+                self._gray = cv2.cvtColor(self.frame, self.gray_code)
+        return self._gray
+
+    @property
+    def pyramid(self) -> ImagePyramid:
+        """フレームの画像ピラミッド"""
+        if self._pyramid is None:
+            if self.frame is None:
+                raise ValueError("フレームが設定されていません。")
+            self._pyramid = ImagePyramid(self.frame, self.max_level)
+        return self._pyramid
+
+    def _entry(
+        self, img: Union[np.ndarray, None], key: Union[Hashable, None] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        積分画像を保持する辞書を返す関数．img が None の場合はフレームのグレースケール画像を対象とする．
+        key を指定した場合は，同じ key の画像は同じ内容として計算結果を使い回す．
+        """
+        if img is None:
+            img = self.gray
+        elif len(img.shape) != 2:
+            raise ValueError("入力はグレースケール画像でなければなりません。")
+        if key is not None:
+            entry = self._integrals.get(("key", key))
+            if entry is None or entry["img"].shape != img.shape:
+                entry = {"img": img, "sum": None, "sqsum": None, "box": {}}
+                self._integrals[("key", key)] = entry
+            # 以前の配列は呼び出し側で書き換えられている場合があるため，未計算の値は今回の配列から求める
+            entry["img"] = img
+            return entry
+        entry = self._integrals.get(id(img))
+        # id は配列が破棄されると再利用されるため，同じ配列か確認する
+        if entry is None or entry["img"] is not img:
+            entry = {"img": img, "sum": None, "sqsum": None, "box": {}}
+            self._integrals[id(img)] = entry
+        return entry
+
+    def Integral(
+        self, img: Union[np.ndarray, None] = None, key: Union[Hashable, None] = None
+    ) -> np.ndarray:
+        """
+        積分画像を返す関数．
+
+        Args:
+            img (Union[np.ndarray, None], optional):
+                対象の画像．None の場合はフレームのグレースケール画像．Defaults to None.
+            key (Union[Hashable, None], optional):
+                画像の内容を表すキー．同じフレームで同じ key の画像は同じ内容とみなす．Defaults to None.
+
+        Return:
+            sum (np.ndarray): (h+1, w+1) の積分画像 (`cv2.integral` と同じ)
+        """
+        entry = self._entry(img, key)
+        if entry["sum"] is None:
+            entry["sum"] = cv2.integral(entry["img"])
+        return entry["sum"]
+
+    def SqIntegral(
+        self, img: Union[np.ndarray, None] = None, key: Union[Hashable, None] = None
+    ) -> np.ndarray:
+        """
+        二乗積分画像を返す関数．積分画像が未計算の場合は同時に計算する．
+
+        Args:
+            img (Union[np.ndarray, None], optional):
+                対象の画像．None の場合はフレームのグレースケール画像．Defaults to None.
+            key (Union[Hashable, None], optional): 画像の内容を表すキー (`Integral` を参照)．Defaults to None.
+
+        Return:
+            sqsum (np.ndarray): (h+1, w+1) の二乗積分画像 (float64)
+        """
+        entry = self._entry(img, key)
+        if entry["sqsum"] is None:
+            entry["sum"], entry["sqsum"] = cv2.integral2(
+                entry["img"], sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F
+            )
+        return entry["sqsum"]
+
+    def BoxMean(
+        self,
+        ksize: int,
+        img: Union[np.ndarray, None] = None,
+        key: Union[Hashable, None] = None,
+    ) -> np.ndarray:
+        """
+        ksize×ksize の近傍の平均(箱フィルタ)を返す関数．カーネルサイズごとに1度だけ計算する．
+        境界は `cv2.adaptiveThreshold` と同じく BORDER_REPLICATE で，結果も同じ型に丸める．
+
+        Args:
+            ksize (int): 近傍領域のサイズ
+            img (Union[np.ndarray, None], optional):
+                対象の画像．None の場合はフレームのグレースケール画像．Defaults to None.
+            key (Union[Hashable, None], optional): 画像の内容を表すキー (`Integral` を参照)．Defaults to None.
+
+        Return:
+            mean (np.ndarray): img と同じ形状・型の平均画像
+        """
+        entry = self._entry(img, key)
+        mean = entry["box"].get(ksize)
+        if mean is None:
+            mean = cv2.boxFilter(
+                entry["img"],
+                -1,
+                (ksize, ksize),
+                normalize=True,
+                borderType=cv2.BORDER_REPLICATE | cv2.BORDER_ISOLATED,
+            )
+            entry["box"][ksize] = mean
+        return mean
+
+    def RectSum(
+        self,
+        rect: Tuple[int, int, int, int],
+        img: Union[np.ndarray, None] = None,
+        key: Union[Hashable, None] = None,
+    ) -> float:
+        """
+        矩形領域の画素値の和を O(1) で返す関数．
+
+        Args:
+            rect (Tuple[int, int, int, int]): 矩形 (x0, y0, x1, y1)．x1, y1 は含まない．
+            img (Union[np.ndarray, None], optional): 対象の画像．Defaults to None.
+            key (Union[Hashable, None], optional): 画像の内容を表すキー (`Integral` を参照)．Defaults to None.
+
+        Return:
+            sum (float): 画素値の和
+        """
+        return float(_RectSum(self.Integral(img, key), rect))
+
+    def RectMean(
+        self,
+        rect: Tuple[int, int, int, int],
+        img: Union[np.ndarray, None] = None,
+        key: Union[Hashable, None] = None,
+    ) -> float:
+        """
+        矩形領域の画素値の平均を O(1) で返す関数．
+
+        Args:
+            rect (Tuple[int, int, int, int]): 矩形 (x0, y0, x1, y1)．x1, y1 は含まない．
+            img (Union[np.ndarray, None], optional): 対象の画像．Defaults to None.
+            key (Union[Hashable, None], optional): 画像の内容を表すキー (`Integral` を参照)．Defaults to None.
+
+        Return:
+            mean (float): 画素値の平均
+        """
+        area = _RectArea(rect)
+        return self.RectSum(rect, img, key) / area
+
+    def RectVar(
+        self,
+        rect: Tuple[int, int, int, int],
+        img: Union[np.ndarray, None] = None,
+        key: Union[Hashable, None] = None,
+    ) -> float:
+        """
+        矩形領域の画素値の分散を O(1) で返す関数．
+
+        Args:
+            rect (Tuple[int, int, int, int]): 矩形 (x0, y0, x1, y1)．x1, y1 は含まない．
+            img (Union[np.ndarray, None], optional): 対象の画像．Defaults to None.
+            key (Union[Hashable, None], optional): 画像の内容を表すキー (`Integral` を参照)．Defaults to None.
+
+        Return:
+            var (float): 画素値の分散
+        """
+        area = _RectArea(rect)
+        # 二乗積分画像を先に求めると積分画像も同時に計算される
+        sqmean = float(_RectSum(self.SqIntegral(img, key), rect)) / area
+        mean = self.RectMean(rect, img, key)
+        return max(sqmean - mean * mean, 0.0)
+
+
+def _RectArea(rect: Tuple[int, int, int, int]) -> int:
+    """矩形の面積を返す関数．面積が 0 の場合は例外を送出する．"""
+    x0, y0, x1, y1 = rect
+    area = (x1 - x0) * (y1 - y0)
+    if area <= 0:
+        raise ValueError("矩形の面積が 0 です。")
+    return area
+
+
+def _RectSum(int_img: np.ndarray, rect: Tuple[int, int, int, int]):
+    """積分画像から矩形領域の和を求める関数"""
+    x0, y0, x1, y1 = rect
+    a, b = int_img[y1, x1].item(), int_img[y0, x1].item()
+    c, d = int_img[y1, x0].item(), int_img[y0, x0].item()
+    return a - b - c + d
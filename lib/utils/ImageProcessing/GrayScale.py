@@ -1,4 +1,6 @@
 import sys, os
+from functools import lru_cache
+from typing import Iterable, List, Literal, Tuple, Union
 
 sys.path.append(".")
 sys.path.append("..")
@@ -30,15 +32,7 @@ def rgb_to_srgb(img: np.ndarray, max_value: int = 255):
     if img.shape[2] != 3:
         raise ValueError("Channel Error: {}".format(img.shape[2]))
 
-    dst = img.copy()
-    w, h, ch = dst.shape
-
-    for i in range(0, w):
-        for j in range(0, h):
-            for k in range(0, 3):
-                dst[i][j][k] = _rgb_to_srgb(dst[i][j][k], quantum_max=max_value)
-
-    return dst
+    return _Convert(img, "rgb_to_srgb", max_value)
 
 
 def _rgb_to_srgb(value, quantum_max=1):
@@ -51,6 +45,7 @@ def _rgb_to_srgb(value, quantum_max=1):
 
 def srgb_to_rgb(img: np.ndarray, max_value: int = 255):
     """sRGB画像->RGB画像に変換する関数
+    アルファチャンネルを含む画像の場合，アルファチャンネルは変換しない．
 
     Args:
         img (np.ndarray):
@@ -64,18 +59,10 @@ def srgb_to_rgb(img: np.ndarray, max_value: int = 255):
     """
 
     # 入力画像がRGB画像でない場合
-    if img.shape[2] != 4:
+    if img.shape[2] not in (3, 4):
         raise ValueError("Channel Error: {}".format(img.shape[2]))
 
-    dst = img.copy()
-    w, h, ch = dst.shape
-
-    for i in range(0, w):
-        for j in range(0, h):
-            for k in range(0, 3):
-                dst[i][j][k] = _srgb_to_rgb(dst[i][j][k], quantum_max=max_value)
-
-    return dst
+    return _Convert(img, "srgb_to_rgb", max_value)
 
 
 def _srgb_to_rgb(value, quantum_max=1.0):
@@ -86,34 +73,211 @@ def _srgb_to_rgb(value, quantum_max=1.0):
     return value * quantum_max
 
 
-def AutoGrayScale(img, clearly: bool = False, calc: str = "cv2") -> np.ndarray:
+@lru_cache(maxsize=None)
+def _ConvertLUT(direction: str, max_value: int, dtype: str) -> np.ndarray:
+    """
+    画素値 0 ~ max_value の変換結果を並べた Look Up Table を作成する関数．
+    `max_value` と画像の型ごとに1度だけ作成し，以降はキャッシュを返す．
+
+    Args:
+        direction (str): 変換の種類．"rgb_to_srgb" or "srgb_to_rgb"
+        max_value (int): 画素値の最大値(8bit: 255, 16bit: 65535)
+        dtype (str): 変換する画像の型(`np.dtype.str`)
+
+    Return:
+        lut (np.ndarray): 画素値を添字とする変換表
+    """
+    if direction == "rgb_to_srgb":
+        func = _rgb_to_srgb
+    elif direction == "srgb_to_rgb":
+        func = _srgb_to_rgb
+    else:
+        raise ValueError("選択された変換は存在しません。")
+
+    # 1画素ずつ変換していた場合と同じ値になるように，同じ関数で表を作成する
+    lut = np.array([func(v, quantum_max=max_value) for v in range(max_value + 1)])
+    lut = lut.astype(np.dtype(dtype))
+    lut.setflags(write=False)
+    return lut
+
+
+def _Convert(img: np.ndarray, direction: str, max_value: int) -> np.ndarray:
+    """
+    RGB の3チャンネルを変換する関数．4チャンネル目(アルファ)はそのまま残す．
+    整数型の画像は `_ConvertLUT` の変換表を引き，浮動小数点型の画像は1画素ずつ変換する場合と同じ式で計算する．
+
+    Args:
+        img (np.ndarray): 変換前の画像 [..., C]
+        direction (str): 変換の種類．"rgb_to_srgb" or "srgb_to_rgb"
+        max_value (int): 画素値の最大値
+
+    Return:
+        dst (np.ndarray): 変換後の画像
+    """
+    if img.dtype.kind in "ui":
+        dst = _ApplyLUT(img, _ConvertLUT(direction, max_value, img.dtype.str))
+    else:
+        dst = _ConvertFormula(img, direction, max_value)
+    if img.shape[-1] == 4:
+        dst[..., 3] = img[..., 3]
+    return dst
+
+
+def _ConvertFormula(img: np.ndarray, direction: str, max_value: float) -> np.ndarray:
+    """`_rgb_to_srgb`, `_srgb_to_rgb` を配列全体に適用する関数 (浮動小数点型の画像用)"""
+    value = img.astype(np.float64)
+    with np.errstate(invalid="ignore"):
+        if direction == "rgb_to_srgb":
+            dst = np.where(
+                value <= 0.0031308,
+                value * 12.92,
+                ((value / max_value) ** (1.0 / 2.4) * 1.055 - 0.055) * max_value,
+            )
+        elif direction == "srgb_to_rgb":
+            value = value / max_value
+            dst = np.where(
+                value <= 0.04045,
+                value / 12.92,
+                ((value + 0.055) / 1.055) ** 2.4 * max_value,
+            )
+        else:
+            raise ValueError("選択された変換は存在しません。")
+    return dst.astype(img.dtype)
+
+
+def _ApplyLUT(img: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    整数型の画像に Look Up Table を適用する関数．
+
+    Args:
+        img (np.ndarray): 変換前の画像 [..., C]
+        lut (np.ndarray): `_ConvertLUT` で作成した変換表
+
+    Return:
+        dst (np.ndarray): 変換後の画像
+    """
+    if img.dtype == np.uint8 and len(lut) == 256 and img.ndim <= 3:
+        return cv2.LUT(img, lut)
+    if img.size and (img.min() < 0 or img.max() >= len(lut)):
+        raise ValueError(
+            "画素値が 0 ~ max_value({}) の範囲外です。".format(len(lut) - 1)
+        )
+    return lut[img]
+
+
+def srgb_to_rgb_batch(
+    imgs: Union[np.ndarray, Iterable[np.ndarray]], max_value: int = 255
+) -> Union[np.ndarray, List[np.ndarray]]:
+    """複数のsRGB画像をまとめてRGB画像に変換する関数
+    変換表は全ての画像で共有する．
+
+    Args:
+        imgs (Union[np.ndarray, Iterable[np.ndarray]]):
+            [N, H, W, C] の画像配列，または画像のリスト
+        max_value (int optional):
+            画素値の最大値
+
+    Return:
+        dst (Union[np.ndarray, List[np.ndarray]]):
+            入力と同じ形式の変換後の画像
+    """
+    if type(imgs) is np.ndarray:
+        if imgs.ndim != 4 or imgs.shape[3] not in (3, 4):
+            raise ValueError("Shape Error: {}".format(imgs.shape))
+        return _Convert(imgs, "srgb_to_rgb", max_value)
+    else:
+        return [srgb_to_rgb(img, max_value=max_value) for img in imgs]
+
+
+def srgb_to_rgb_dir(
+    src_dir: str, dst_dir: str, max_value: int = 255, ext: Tuple[str, ...] = (".png", ".jpg", ".bmp")
+) -> List[str]:
+    """ディレクトリ内の画像をまとめてRGB画像(リニア)に変換して保存する関数
+    閾値のキャリブレーション前に，撮影した画像を線形化するために使用する．
+
+    Args:
+        src_dir (str):
+            変換前の画像が保存されたディレクトリ
+        dst_dir (str):
+            変換後の画像を保存するディレクトリ．ファイル名は変換前と同じ．
+        max_value (int optional):
+            画素値の最大値
+        ext (Tuple[str, ...] optional):
+            変換対象とする拡張子
+
+    Return:
+        paths (List[str]):
+            保存した画像のパス
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    paths = []
+    for name in sorted(os.listdir(src_dir)):
+        if not name.lower().endswith(ext):
+            continue
+        img = np.array(Image.open(os.path.join(src_dir, name)))
+        dst = srgb_to_rgb(img, max_value=max_value)
+        path = os.path.join(dst_dir, name)
+        Image.fromarray(dst).save(path)
+        paths.append(path)
+    return paths
+
+
+def AutoGrayScale(
+    img,
+    clearly: bool = False,
+    calc: str = "cv2",
+    blur: Literal["gaussian", "box", "stack"] = "gaussian",
+    rgb_domain: bool = False,
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
     """入力画像を自動的にグレースケール画像に変換する関数
 
+    ノイズ除去を行う場合は，先にグレースケール化してから1チャンネルの画像を平滑化する．
+    入力画像のコピーは作成せず，平滑化は出力先の配列上で行う．
+
     Args:
         img (np.ndarray):
             変換前の画像
         clearly (bool optional):
-            ガウシアンフィルタを用いて入力画像のノイズを除去する．
+            5x5 のフィルタを用いて入力画像のノイズを除去する．
             * True: 適用する
             * False: 適用しない: default
         calc (str, optional):
             グレースケール変換を行うための関数を指定.
             Defaults to "cv2".
+        blur (Literal["gaussian", "box", "stack"], optional):
+            ノイズ除去に使用するフィルタ．Defaults to "gaussian".
+            * "gaussian": ガウシアンフィルタ
+            * "box": 平均値フィルタ(最も高速)
+            * "stack": Stack Blur (ガウシアンフィルタの近似，`cv2.stackBlur` がない場合は "box")
+        rgb_domain (bool, optional):
+            True の場合は従来通り RGB の各チャンネルを平滑化してからグレースケール化する．
+            Defaults to False.
+        dst (Union[np.ndarray, None], optional):
+            出力先の (H, W) の uint8 配列．フレーム間で使い回す場合に指定する．Defaults to None.
 
     Returns:
         dst (np.ndarray):
             変換後の画像データ(Errorが発生した場合: None)
 
     """
-
-    dst = img.copy()
     try:
-        # ガウスフィルタをかけてノイズを除去する
-        if clearly:
-            dst = cv2.GaussianBlur(dst, (5, 5), 0)
         # 入力画像がRGBの時
-        if len(dst.shape) > 2:
-            dst = _GrayScale(dst, calc)
+        if len(img.shape) > 2:
+            if clearly and rgb_domain:
+                # RGB の各チャンネルを平滑化してからグレースケール化する
+                dst = _GrayScale(_Blur(img, blur), calc, dst)
+            else:
+                dst = _GrayScale(img, calc, dst)
+                # グレースケール画像を出力先の配列上で平滑化する
+                if clearly:
+                    dst = _Blur(dst, blur, dst)
+        elif clearly:
+            dst = _Blur(img, blur, dst)
+        elif dst is None:
+            dst = img.copy()
+        else:
+            np.copyto(dst, img)
     except Exception as e:
         print("GrayScaleError:", e)
         return None
@@ -121,7 +285,9 @@ def AutoGrayScale(img, clearly: bool = False, calc: str = "cv2") -> np.ndarray:
         return dst
 
 
-def _GrayScale(img: np.ndarray, calc: str = "cv2") -> np.ndarray:
+def _GrayScale(
+    img: np.ndarray, calc: str = "cv2", dst: Union[np.ndarray, None] = None
+) -> np.ndarray:
     """入力画像をグレースケール画像に変換する関数
 
     Args:
@@ -130,18 +296,49 @@ def _GrayScale(img: np.ndarray, calc: str = "cv2") -> np.ndarray:
         calc (str, optional):
             グレースケールを行うための関数を指定
             "cv2": cv2.cvtColor で変換
+        dst (Union[np.ndarray, None], optional):
+            出力先の配列
 
     Return:
         dst (np.ndarray):
             グレースケール化後の画像(Errorが発生した場合: None)
     """
     if calc == "cv2":
-        dst = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        dst = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY, dst=dst)
         return dst
     else:
         return None
 
 
+def _Blur(
+    img: np.ndarray,
+    blur: Literal["gaussian", "box", "stack"] = "gaussian",
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """5x5 のフィルタで平滑化する関数(dst に img を指定した場合はその場で平滑化する)
+
+    Args:
+        img (np.ndarray):
+            入力画像
+        blur (Literal["gaussian", "box", "stack"], optional):
+            使用するフィルタ
+        dst (Union[np.ndarray, None], optional):
+            出力先の配列
+
+    Return:
+        dst (np.ndarray):
+            平滑化後の画像
+    """
+    if blur == "gaussian":
+        return cv2.GaussianBlur(img, (5, 5), 0, dst=dst)
+    elif blur == "stack" and hasattr(cv2, "stackBlur"):
+        return cv2.stackBlur(img, (5, 5), dst=dst)
+    elif blur in ("box", "stack"):
+        return cv2.blur(img, (5, 5), dst=dst)
+    else:
+        raise ValueError("The `blur` is invalid.")
+
+
 if __name__ == "__main__":
     # from DobotFunction.Camera import WebCam_OnOff, Snapshot, Preview
     # _, cam = WebCam_OnOff(0)
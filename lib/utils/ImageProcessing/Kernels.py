@@ -30,8 +30,7 @@ def gaussian(src: np.ndarray, kernel: tuple = (3, 3), sigma: tuple = (0, 0)):
     dst (ndarray):
         出力画像
     """
-    new_img = src.copy()
-    dst = cv2.GaussianBlur(new_img, kernel, sigmaX=sigma[0], sigmaY=sigma[1])
+    dst = cv2.GaussianBlur(src, kernel, sigmaX=sigma[0], sigmaY=sigma[1])
 
     return dst
 
@@ -54,8 +53,7 @@ def laplacian(src: np.ndarray, bit=cv2.CV_64F, ksize=3):
     dst : OpenCV型
         出力画像
     """
-    new_img = src.copy()
-    dst = cv2.Laplacian(new_img, bit, ksize)
+    dst = cv2.Laplacian(src, bit, ksize=ksize)
 
     return dst
 
@@ -86,18 +84,16 @@ def prewitt(src, dx=1, dy=1):
     dst : OpenCV型
         出力画像
     """
-    new_img = src.copy()
-
     kernelx = np.array([[1, 1, 1], [0, 0, 0], [-1, -1, -1]])
     kernely = np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]])
 
     if dx == 1 and dy == 0:
-        dst = cv2.filter2D(new_img, -1, kernelx)
+        dst = cv2.filter2D(src, -1, kernelx)
     elif dx == 0 and dy == 1:
-        dst = cv2.filter2D(new_img, -1, kernely)
+        dst = cv2.filter2D(src, -1, kernely)
     elif dx == 1 and dy == 1:
-        dst_x = cv2.filter2D(new_img, -1, kernelx)
-        dst_y = cv2.filter2D(new_img, -1, kernely)
+        dst_x = cv2.filter2D(src, -1, kernelx)
+        dst_y = cv2.filter2D(src, -1, kernely)
         dst = dst_x + dst_y
     else:
         print("dx, dy は 0 もしくは 1 を指定してください。")
@@ -139,8 +135,7 @@ def sobel(src, bit=cv2.CV_64F, dx: int = 1, dy: int = 1, ksize=3):
             "The differential direction dx={}, dy={} is incorrect!".format(dx, dy)
         )
 
-    new_img = src.copy()
-    dst = cv2.Sobel(new_img, bit, dx, dy, ksize)
+    dst = cv2.Sobel(src, bit, dx, dy, ksize=ksize)
 
     return dst
 
@@ -0,0 +1,200 @@
+import sys
+from functools import lru_cache
+from typing import Literal, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import cv2
+import numpy as np
+
+# 構造要素の形状
+KernelShape = {
+    "RECT": cv2.MORPH_RECT,
+    "ELLIPSE": cv2.MORPH_ELLIPSE,
+    "CROSS": cv2.MORPH_CROSS,
+}
+
+
+@lru_cache(maxsize=32)
+def StructuringElement(
+    ksize: int, shape: Literal["RECT", "ELLIPSE", "CROSS"] = "ELLIPSE"
+) -> np.ndarray:
+    """
+    構造要素を作成する関数．形状とサイズの組ごとに1度だけ作成し，以降はキャッシュを返す．
+
+    Args:
+        ksize (int): 構造要素のサイズ
+        shape (Literal["RECT", "ELLIPSE", "CROSS"], optional): 構造要素の形状．Defaults to "ELLIPSE".
+
+    Return:
+        kernel (np.ndarray): 構造要素(書き込み不可)
+    """
+    if shape not in KernelShape:
+        raise ValueError("The `shape` is invalid.")
+    if ksize < 1:
+        raise ValueError("`ksize` は 1 以上を指定してください。")
+    kernel = cv2.getStructuringElement(KernelShape[shape], (ksize, ksize))
+    kernel.setflags(write=False)
+    return kernel
+
+
+def Opening(
+    bin_img: np.ndarray,
+    ksize: int = 3,
+    shape: Literal["RECT", "ELLIPSE", "CROSS"] = "ELLIPSE",
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    オープニング処理(収縮 -> 膨張)で，構造要素より小さい白い点を除去する関数．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        ksize (int, optional): 構造要素のサイズ．Defaults to 3.
+        shape (Literal["RECT", "ELLIPSE", "CROSS"], optional): 構造要素の形状．Defaults to "ELLIPSE".
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    return cv2.morphologyEx(
+        bin_img, cv2.MORPH_OPEN, StructuringElement(ksize, shape), dst=dst
+    )
+
+
+def Closing(
+    bin_img: np.ndarray,
+    ksize: int = 3,
+    shape: Literal["RECT", "ELLIPSE", "CROSS"] = "ELLIPSE",
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    クロージング処理(膨張 -> 収縮)で，構造要素より小さい黒い穴や切れ目を埋める関数．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        ksize (int, optional): 構造要素のサイズ．Defaults to 3.
+        shape (Literal["RECT", "ELLIPSE", "CROSS"], optional): 構造要素の形状．Defaults to "ELLIPSE".
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    return cv2.morphologyEx(
+        bin_img, cv2.MORPH_CLOSE, StructuringElement(ksize, shape), dst=dst
+    )
+
+
+def OpenClose(
+    bin_img: np.ndarray,
+    ksize: int = 3,
+    shape: Literal["RECT", "ELLIPSE", "CROSS"] = "ELLIPSE",
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    オープニングとクロージングを続けて行う関数．
+    2つの処理は同じ出力先の配列で行うため，中間画像の配列は作成しない．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        ksize (int, optional): 構造要素のサイズ．Defaults to 3.
+        shape (Literal["RECT", "ELLIPSE", "CROSS"], optional): 構造要素の形状．Defaults to "ELLIPSE".
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    kernel = StructuringElement(ksize, shape)
+    dst = cv2.morphologyEx(bin_img, cv2.MORPH_OPEN, kernel, dst=dst)
+    return cv2.morphologyEx(dst, cv2.MORPH_CLOSE, kernel, dst=dst)
+
+
+def AreaOpening(
+    bin_img: np.ndarray,
+    min_area: int = 100,
+    connectivity: Literal[4, 8] = 8,
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    面積が min_area 未満の連結成分を除去する関数．
+    連結成分のラベリングを1回行い，残す成分の表をラベル画像に適用するため，成分の数によらず計算量は一定．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        min_area (int, optional): 残す連結成分の最小の面積[px]．Defaults to 100.
+        connectivity (Literal[4, 8], optional): 連結の定義．Defaults to 8.
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(
+        bin_img, connectivity=connectivity, ltype=cv2.CV_32S
+    )
+    keep = np.where(stats[:, cv2.CC_STAT_AREA] >= min_area, 255, 0).astype(np.uint8)
+    keep[0] = 0  # 背景
+    if dst is None:
+        dst = np.empty(bin_img.shape, dtype=np.uint8)
+    np.take(keep, labels, out=dst)
+    return dst
+
+
+def FillHoles(
+    bin_img: np.ndarray, dst: Union[np.ndarray, None] = None
+) -> np.ndarray:
+    """
+    白い領域に囲まれた黒い穴を埋める関数．
+    画像の外周から背景を塗りつぶし，塗りつぶされなかった黒い画素を穴とする．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    # 外周に1画素の背景を追加して，画像の端に接する背景も1回の塗りつぶしで繋げる
+    flood = cv2.copyMakeBorder(bin_img, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(flood, None, (0, 0), 255)
+    holes = cv2.bitwise_not(flood[1:-1, 1:-1])
+    return cv2.bitwise_or(bin_img, holes, dst=dst)
+
+
+def CleanMask(
+    bin_img: np.ndarray,
+    ksize: int = 0,
+    min_area: int = 0,
+    fill_holes: bool = False,
+    shape: Literal["RECT", "ELLIPSE", "CROSS"] = "ELLIPSE",
+    dst: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    二値化処理後のマスクから細かい雑音を除去する関数．
+    オープニング・クロージング -> 面積による除去 -> 穴埋め の順に，指定された処理のみを行う．
+
+    Args:
+        bin_img (np.ndarray): 二値画像
+        ksize (int, optional): オープニング・クロージングの構造要素のサイズ．0 の場合は行わない．Defaults to 0.
+        min_area (int, optional): 残す連結成分の最小の面積[px]．0 の場合は行わない．Defaults to 0.
+        fill_holes (bool, optional): 穴埋めを行う．Defaults to False.
+        shape (Literal["RECT", "ELLIPSE", "CROSS"], optional): 構造要素の形状．Defaults to "ELLIPSE".
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 処理後の二値画像
+    """
+    if type(bin_img) is not np.ndarray or len(bin_img.shape) != 2:
+        raise ValueError("入力は二値画像でなければなりません。")
+
+    src = bin_img
+    if ksize > 0:
+        src = OpenClose(src, ksize, shape, dst=dst)
+    if min_area > 0:
+        src = AreaOpening(src, min_area, dst=dst)
+    if fill_holes:
+        src = FillHoles(src, dst=dst)
+    if src is bin_img and dst is not None:
+        np.copyto(dst, bin_img)
+        src = dst
+    return src
@@ -0,0 +1,208 @@
+import sys
+from typing import Literal, Tuple, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import numpy as np
+
+from lib.utils.ImageProcessing.CenterOfGravity import ObjectDtype
+
+# `CentroidTracker` が保持する各トラックの情報．
+# 検出結果(`ObjectDtype`)の項目に，トラックの識別番号・速度・経過フレーム数を加えたもの．
+# * track_id: フレーム間で変わらない識別番号
+# * vx, vy: 重心の速度 [px/フレーム] (時刻を指定した場合は [px/s])
+# * age: 追跡を始めてから対応付けられたフレーム数
+# * missed: 連続して対応付けられなかったフレーム数 (0 の場合は最新のフレームで検出されている)
+TrackDtype = np.dtype(
+    [("track_id", np.int64)]
+    + ObjectDtype.descr
+    + [
+        ("vx", np.float64),
+        ("vy", np.float64),
+        ("age", np.int32),
+        ("missed", np.int32),
+    ]
+)
+
+
+class CentroidTracker(object):
+    """
+    `DetectObjects` の検出結果をフレーム間で重心の位置によって対応付け，オブジェクトに一定の識別番号を割り当てるクラス．
+    各トラックの位置は速度で予測してから対応付けるため，コンベアなどで移動し続けるオブジェクトも追跡できる．
+    """
+
+    def __init__(
+        self,
+        max_distance: float = 50.0,
+        max_missed: int = 5,
+        method: Literal["nearest", "hungarian"] = "nearest",
+        smoothing: float = 0.5,
+    ) -> None:
+        """
+        Args:
+            max_distance (float, optional):
+                予測位置と検出位置を対応付ける最大の距離[px]．Defaults to 50.0.
+            max_missed (int, optional):
+                対応付けられないフレームがこの数を超えたトラックを破棄する．Defaults to 5.
+            method (Literal["nearest", "hungarian"], optional): 対応付けの方法．Defaults to "nearest".
+                * "nearest": 距離の近い組から順に対応付ける．オブジェクトの数が少ない場合はこれで十分．
+                * "hungarian": 距離の総和が最小になるように対応付ける(scipy を使用)．
+            smoothing (float, optional):
+                速度の更新に使用する最新の移動量の割合 (0 < smoothing <= 1)．Defaults to 0.5.
+        """
+        if method not in ("nearest", "hungarian"):
+            raise ValueError("The `method` is invalid.")
+        if not 0 < smoothing <= 1:
+            raise ValueError("`smoothing` は 0 より大きく 1 以下を指定してください。")
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.method = method
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self) -> None:
+        """全てのトラックを破棄する"""
+        self.tracks = np.empty(0, dtype=TrackDtype)
+        self._next_id = 0
+        self._timestamp = None
+
+    def update(
+        self, objects: np.ndarray, timestamp: Union[float, None] = None
+    ) -> np.ndarray:
+        """
+        新しいフレームの検出結果でトラックを更新する関数．
+
+        Args:
+            objects (np.ndarray): `DetectObjects` の返り値 (`ObjectDtype` の構造化配列)
+            timestamp (Union[float, None], optional):
+                フレームの撮影時刻[s]．指定した場合は速度を [px/s] で求める．Defaults to None.
+
+        Return:
+            tracks (np.ndarray):
+                このフレームで検出された各オブジェクトのトラック (`TrackDtype`)．objects と同じ順に並ぶ．
+        """
+        dt = 1.0
+        if timestamp is not None:
+            if self._timestamp is not None and timestamp > self._timestamp:
+                dt = timestamp - self._timestamp
+            self._timestamp = timestamp
+
+        tracks = self.tracks
+        # 前のフレームの速度で現在の位置を予測する
+        px = tracks["cx"] + tracks["vx"] * dt
+        py = tracks["cy"] + tracks["vy"] * dt
+        rows, cols = self._associate(px, py, objects["cx"], objects["cy"])
+
+        # 対応付けられたトラックは検出結果で位置を更新し，速度を平滑化する
+        matched = tracks[rows]
+        vx = (objects["cx"][cols] - matched["cx"]) / dt
+        vy = (objects["cy"][cols] - matched["cy"]) / dt
+        a = self.smoothing
+        for name in ObjectDtype.names:
+            matched[name] = objects[name][cols]
+        first = matched["age"] == 1  # 2回目の検出では速度を初期化する
+        matched["vx"] = np.where(first, vx, (1 - a) * matched["vx"] + a * vx)
+        matched["vy"] = np.where(first, vy, (1 - a) * matched["vy"] + a * vy)
+        matched["age"] += 1
+        matched["missed"] = 0
+
+        # 対応付けられなかったトラックは予測位置に進め，見失ったフレーム数を数える
+        lost = np.ones(len(tracks), dtype=bool)
+        lost[rows] = False
+        coasting = tracks[lost]
+        coasting["cx"] = px[lost]
+        coasting["cy"] = py[lost]
+        coasting["missed"] += 1
+        coasting = coasting[coasting["missed"] <= self.max_missed]
+
+        # 対応付けられなかった検出結果は新しいトラックにする
+        new = np.ones(len(objects), dtype=bool)
+        new[cols] = False
+        born = np.zeros(int(new.sum()), dtype=TrackDtype)
+        for name in ObjectDtype.names:
+            born[name] = objects[name][new]
+        born["track_id"] = np.arange(self._next_id, self._next_id + len(born))
+        born["age"] = 1
+        self._next_id += len(born)
+
+        self.tracks = np.concatenate([matched, born, coasting])
+
+        # 検出結果と同じ順に並べたこのフレームのトラック
+        visible = np.empty(len(objects), dtype=TrackDtype)
+        visible[cols] = matched
+        visible[np.flatnonzero(new)] = born
+        return visible
+
+    def get(self, track_id: int) -> Union[np.void, None]:
+        """
+        識別番号のトラックを返す関数．
+
+        Args:
+            track_id (int): トラックの識別番号
+
+        Return:
+            track (Union[np.void, None]): トラック (`TrackDtype`)．破棄された場合は None．
+        """
+        idx = np.flatnonzero(self.tracks["track_id"] == track_id)
+        return self.tracks[idx[0]] if len(idx) else None
+
+    def predict(self, track_id: int, dt: float = 1.0) -> Union[Tuple[float, float], None]:
+        """
+        トラックの dt 後の重心位置を等速運動として予測する関数．
+
+        Args:
+            track_id (int): トラックの識別番号
+            dt (float, optional):
+                予測する時間．`update` に時刻を指定した場合は [s]，そうでなければ [フレーム]．Defaults to 1.0.
+
+        Return:
+            COG (Union[Tuple[float, float], None]): 予測した重心位置 (x, y)．トラックが存在しない場合は None．
+        """
+        track = self.get(track_id)
+        if track is None:
+            return None
+        return (
+            float(track["cx"] + track["vx"] * dt),
+            float(track["cy"] + track["vy"] * dt),
+        )
+
+    def _associate(
+        self, px: np.ndarray, py: np.ndarray, cx: np.ndarray, cy: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        予測位置 (px, py) と検出位置 (cx, cy) を対応付ける関数．
+
+        Returns:
+            rows (np.ndarray): 対応付けられたトラックの番号
+            cols (np.ndarray): 対応付けられた検出結果の番号
+        """
+        if len(px) == 0 or len(cx) == 0:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+
+        dist = np.hypot(px[:, None] - cx[None, :], py[:, None] - cy[None, :])
+        if self.method == "hungarian":
+            # scipy は対応付けの方法に "hungarian" を指定した場合のみ読み込む
+            from scipy.optimize import linear_sum_assignment
+
+            # 距離の上限を超える組は選ばれないように大きなコストにする
+            cost = np.where(dist <= self.max_distance, dist, self.max_distance * 1e3 + 1)
+            rows, cols = linear_sum_assignment(cost)
+        else:
+            # 距離の近い組から順に，まだ対応付けられていないトラックと検出結果を対応付ける
+            order = np.argsort(dist, axis=None, kind="stable")
+            rows, cols = np.unravel_index(order, dist.shape)
+            used_r = np.zeros(dist.shape[0], dtype=bool)
+            used_c = np.zeros(dist.shape[1], dtype=bool)
+            keep = np.zeros(len(order), dtype=bool)
+            for i, (r, c) in enumerate(zip(rows, cols)):
+                if dist[r, c] > self.max_distance:
+                    break
+                if not (used_r[r] or used_c[c]):
+                    used_r[r] = used_c[c] = keep[i] = True
+            rows, cols = rows[keep], cols[keep]
+
+        ok = dist[rows, cols] <= self.max_distance
+        return rows[ok].astype(np.intp), cols[ok].astype(np.intp)
@@ -0,0 +1,103 @@
+import sys
+from functools import lru_cache
+from typing import Literal, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import cv2
+import numpy as np
+
+from lib.utils.ImageProcessing.Contrast import ContrastLUT
+from lib.utils.ImageProcessing.Binarization import PickupColorBand
+
+
+def IsPointOperation(Color_Density: str) -> bool:
+    """
+    濃度変換が画素値だけで決まる点演算(LUT で表せる変換)か判定する関数．
+
+    Args:
+        Color_Density (str): 画像の濃度変換．
+
+    Return:
+        (bool): 点演算であれば True
+    """
+    return ContrastLUT(Color_Density) is not None
+
+
+@lru_cache(maxsize=64)
+def CompilePointLUT(
+    Color_Density: Literal["None", "Linear", "Non-Linear"] = "None",
+    Binarization: Literal["None", "Global", "Two"] = "None",
+    LowerThreshold: int = 10,
+    UpperThreshold: int = 150,
+    PickupColor: int = 4,
+    invert: bool = False,
+) -> np.ndarray:
+    """
+    濃度変換と閾値処理を1つの Look Up Table に合成する関数．
+    パラメタの組ごとに1度だけ作成し，以降はキャッシュを返す．
+
+    Args:
+        Color_Density (Literal["None", "Linear", "Non-Linear"], optional):
+            画像の濃度変換．Defaults to "None".
+        Binarization (Literal["None", "Global", "Two"], optional):
+            濃度変換の後に行う閾値処理．Defaults to "None".
+            * "None": 閾値処理を行わない
+            * "Global": `GlobalThreshold` と同じく，LowerThreshold より大きい画素を 255 とする
+            * "Two": `TwoThreshold` の白(3)・黒(4)と同じく，UpperThreshold より大きい画素，
+                     または LowerThreshold 以下の画素を 255 とする
+        LowerThreshold (int, optional): 下側の閾値．Defaults to 10.
+        UpperThreshold (int, optional): 上側の閾値．Defaults to 150.
+        PickupColor (int, optional): "Two" の場合に抽出する色(3: 白, 4: 黒)．Defaults to 4.
+        invert (bool, optional): 閾値処理の結果を反転する(背景が黒の場合の `cv2.bitwise_not` に相当)．
+            Defaults to False.
+
+    Return:
+        LUT (np.ndarray): 256行の変換表
+    """
+    lut = ContrastLUT(Color_Density)
+    if lut is None:
+        raise ValueError("選択した濃度変換は LUT に変換できません。")
+    lut = lut.ravel()
+
+    if Binarization == "None":
+        mask = None
+    elif Binarization == "Global":
+        mask = lut > LowerThreshold
+    elif Binarization == "Two":
+        if PickupColor not in (3, 4):
+            raise ValueError("単一チャンネルの画像から抽出できる色は白・黒のみです。")
+        if PickupColorBand[PickupColor][0] == "upper":
+            mask = lut > UpperThreshold
+        else:
+            mask = lut <= LowerThreshold
+    else:
+        raise ValueError("選択した二値化処理は LUT に変換できません。")
+
+    if mask is not None:
+        if invert:
+            mask = ~mask
+        lut = np.where(mask, 255, 0)
+
+    lut = lut.astype(np.uint8).reshape(-1, 1)
+    lut.setflags(write=False)
+    return lut
+
+
+def ApplyPointLUT(
+    src: np.ndarray, lut: np.ndarray, dst: Union[np.ndarray, None] = None
+) -> np.ndarray:
+    """
+    `CompilePointLUT` で合成した変換表を1回の `cv2.LUT` で適用する関数．
+
+    Args:
+        src (np.ndarray): 変換前の uint8 画像
+        lut (np.ndarray): 変換表
+        dst (Union[np.ndarray, None], optional): 出力先の配列．Defaults to None.
+
+    Return:
+        dst (np.ndarray): 変換後の画像
+    """
+    return cv2.LUT(src, lut, dst=dst)
@@ -1,17 +1,68 @@
 import os
 import sys
+from typing import List, Tuple
 
 sys.path.append('.')
 sys.path.append('..')
+sys.path.append('../../')
 
 import cv2
 import numpy as np
 
-from kernels import gaussian
+from lib.utils.ImageProcessing.Kernels import gaussian
 
-def gausian_pyr(src: np.ndarray, kernel: tuple=(3, 3), sigma: tuple=(1, 1), level: int=1):
-    """ガウシアンフィルタを用いて画像ピラミッドを作成する関数。
+
+class ImagePyramid(object):
+    """`cv2.pyrDown` によるガウシアンピラミッドを1フレーム分保持するクラス。
+    各レベルは最初に参照されたときに1つ上のレベルから作成し、以降は同じ配列を返す。
+
+    Parameters
+    ----------
+    src (ndarray):
+        レベル 0 の入力画像
+    max_level (int):
+        作成できる最大のレベル
+        default 4
+    """
+
+    def __init__(self, src: np.ndarray, max_level: int = 4):
+        if type(src) != np.ndarray:
+            raise TypeError('An undefined value was assigned to `src`.')
+        if max_level < 0:
+            raise ValueError('Invaild Parameter')
+        self.max_level = int(max_level)
+        self._levels = [src]
+
+    def __len__(self) -> int:
+        return self.max_level + 1
+
+    def __getitem__(self, level: int) -> np.ndarray:
+        """レベル `level` の画像を返す (サイズは約 1/2**level)"""
+        if not 0 <= level <= self.max_level:
+            raise IndexError('The pyramid level is out of range.')
+        while len(self._levels) <= level:
+            prev = self._levels[-1]
+            if min(prev.shape[:2]) < 2:
+                raise IndexError('The image is too small for the pyramid level.')
+            self._levels.append(cv2.pyrDown(prev))
+        return self._levels[level]
+
+    @property
+    def base(self) -> np.ndarray:
+        """レベル 0 の画像"""
+        return self._levels[0]
+
+    def scale(self, level: int) -> Tuple[float, float]:
+        """レベル `level` の座標をレベル 0 の座標に戻すための倍率 (x, y)"""
+        h, w = self.base.shape[:2]
+        lh, lw = self[level].shape[:2]
+        return w / lw, h / lh
+
+
+def gausian_pyr(src: np.ndarray, kernel: tuple=(3, 3), sigma: tuple=(1, 1), level: int=1) -> List[np.ndarray]:
+    """ガウシアンフィルタを繰り返し適用した画像の一覧を作成する関数。
     level は、ピラミッドの高さを表す。すなわち、画像に対してガウシアンフィルタを適用する回数を表す。
+    画像の縮小を伴うピラミッドが必要な場合は `ImagePyramid` を使用する。
 
     Parameters
     ----------
@@ -31,26 +82,20 @@ def gausian_pyr(src: np.ndarray, kernel: tuple=(3, 3), sigma: tuple=(1, 1), leve
 
     Return
     ------
-    dst (ndarray)
-        出力画像
+    dsts (List[ndarray])
+        各レベルの出力画像
     """
-    new_img = src.copy()
-
-    if (sigma[0] == 0) or (sigma[1] == 0):
+    if (sigma[0] == 0) or (sigma[1] == 0) or (level < 1):
         raise ValueError('Invaild Parameter')
-    else:
-        sigma = np.array(sigma)
+    sigma = np.array(sigma, dtype=np.float64)
 
+    dsts = []
+    dst = src
     for lvl in range(level):
-        if lvl == 0:
-            dst = gaussian(new_img, kernel, sigma)
-            dsts = dst
-        elif lvl > 0:
+        if lvl > 0:
             sigma = sigma*(lvl+1)
-            dst = gaussian(dst, kernel, sigma)
-            dsts = np.stack([dsts, dst])
-        else:
-            raise ValueError('Invaild Parameter')
+        dst = gaussian(dst, kernel, tuple(sigma))
+        dsts.append(dst)
 
     return dsts
 
@@ -64,39 +109,17 @@ if __name__ == "__main__":
     idx = 8  # load image number
     pyramid_level=2 # 画像ピラミッドの高さ
 
-    # ディレクトリ設定
-    # linemod
-    #base_dir = os.path.join(cfg.LINEMOD_DIR, object_name, 'data')
-    #object_name = "ape"
-    #img_path = os.path.join(base_dir, 'color{}.jpg'.format(idx))
-
     # Test_img
     img_path = os.path.join(cfg.TEST_IMAGE_DIR, 'image{}.jpg'.format(idx))
 
     # image read
-    img = Image.open(img_path)
-    # img = img.convert('L')  # gray scale
-    img = np.array(img)
-    x, y = img.shape[0], img.shape[1]
-
-    # gaussian pyramid test
-    #g_p = gausian_pyr(img, level=pyramid_level)
-    g_p = gausian_pyr(img, sigma=(10, 10), level=pyramid_level)
-
-
-        # オリジナル画像
-    plt.subplot(1, 3, 1), plt.imshow(img)
-    plt.title('Original x:{}, y:{}'.format(x, y))
-    plt.xticks([]), plt.yticks([])
-    # Gaussian filtering を使用した画像を表示
-    plt.subplot(1, 3, 2), plt.imshow(g_p[0])
-    plt.title('x:{}, y:{}, sigma'.format(g_p[0].shape[0], g_p[0].shape[1]))
-    plt.xticks([]), plt.yticks([])
-
-    if pyramid_level == 2:
-        plt.subplot(1, 3, 3), plt.imshow(g_p[1])
-    plt.title('x:{}, y:{}, sigma'.format(g_p[1].shape[0], g_p[1].shape[1]))
-    plt.xticks([]), plt.yticks([])
+    img = np.array(Image.open(img_path))
+    pyr = ImagePyramid(img, max_level=pyramid_level)
+
+    for lvl in range(len(pyr)):
+        plt.subplot(1, len(pyr), lvl + 1), plt.imshow(pyr[lvl])
+        plt.title('level:{} x:{}, y:{}'.format(lvl, pyr[lvl].shape[1], pyr[lvl].shape[0]))
+        plt.xticks([]), plt.yticks([])
 
     # 表示
-    plt.show()
\ No newline at end of file
+    plt.show()
@@ -0,0 +1,321 @@
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Literal, Sequence, Tuple, Union
+
+sys.path.append(".")
+sys.path.append("..")
+sys.path.append("../../")
+
+import cv2
+import numpy as np
+
+from lib.DobotFunction.Camera import ProcessingPipeline
+from lib.utils.ImageProcessing.CenterOfGravity import CenterOfGravity
+from lib.utils.ImageProcessing.FrameCache import FrameCache
+
+# ワーカープロセスが参照する共有メモリ上の画像と，画像ごとの積分画像などのキャッシュ
+_shared = {
+    "shm": None,
+    "images": [],
+    "masks": [],
+    "caches": [],
+}
+
+
+def AnnotationMask(ann_pth: str, shape: Union[Tuple[int, int], None] = None) -> np.ndarray:
+    """
+    VoTT でアノテーションした asset の JSON から，正解領域を 255 とするマスク画像を作成する関数．
+
+    Args:
+        ann_pth (str): `assets/anns/*-asset.json` へのパス
+        shape (Union[Tuple[int, int], None], optional):
+            マスク画像のサイズ (H, W)．None の場合は JSON に記録された画像サイズを使用する．Defaults to None.
+
+    Return:
+        mask (np.ndarray): uint8 のマスク画像
+    """
+    with open(ann_pth, "r", encoding="utf-8") as f:
+        ann = json.load(f)
+
+    size = ann["asset"]["size"]
+    if shape is None:
+        shape = (size["height"], size["width"])
+    sy, sx = shape[0] / size["height"], shape[1] / size["width"]
+
+    mask = np.zeros(shape, dtype=np.uint8)
+    for region in ann["regions"]:
+        pts = np.array(
+            [[p["x"] * sx, p["y"] * sy] for p in region["points"]], dtype=np.float64
+        )
+        cv2.fillPoly(mask, [np.round(pts).astype(np.int32)], 255)
+    return mask
+
+
+def ParameterGrid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    パラメタの候補の直積から，設定の一覧を作成する関数．
+    設定の順序はキーの挿入順・候補の順で決まり，実行ごとに変わらない．
+
+    Args:
+        grid (Dict[str, Sequence[Any]]): `ImageCvt` の引数名と候補の値
+
+    Return:
+        params (List[Dict[str, Any]]): 設定の一覧
+    """
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def _pack(arrays: Sequence[np.ndarray]) -> Tuple[int, List[Tuple[int, Tuple[int, ...]]]]:
+    """共有メモリに並べて配置するための各配列の開始位置と形状を求める関数"""
+    layout, offset = [], 0
+    for a in arrays:
+        layout.append((offset, a.shape))
+        offset += a.size
+    return offset, layout
+
+
+def _init_worker(name: str, img_layout: list, mask_layout: list) -> None:
+    """
+    ワーカープロセスの初期化関数．共有メモリを開き，画像とマスクのビューを作成する．
+    適応的二値化処理の近傍の平均や積分画像は画像ごとのキャッシュに保持し，同じワーカーの設定の間で共有する．
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    buf = np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)
+    _shared["shm"] = shm
+    _shared["images"] = [
+        buf[ofs : ofs + int(np.prod(shape))].reshape(shape) for ofs, shape in img_layout
+    ]
+    _shared["masks"] = [
+        buf[ofs : ofs + int(np.prod(shape))].reshape(shape) > 0
+        for ofs, shape in mask_layout
+    ]
+    _shared["caches"] = [FrameCache(img) for img in _shared["images"]]
+
+
+def _evaluate(
+    task: Tuple[int, Dict[str, Any]],
+    CalcCOG: Literal["image", "outline", "components"],
+    fg_range: Tuple[float, float] = (0.001, 0.5),
+) -> Dict[str, Any]:
+    """
+    1つの設定で全画像を処理し，評価値を計算する関数．
+
+    Args:
+        task (Tuple[int, Dict[str, Any]]): 設定の番号と `ImageCvt` の引数
+        CalcCOG (Literal["image", "outline", "components"]): 重心位置の計算対象
+        fg_range (Tuple[float, float], optional):
+            有効なマスクとみなす前景の割合の範囲 (下限, 上限)．Defaults to (0.001, 0.5).
+
+    Return:
+        result (Dict[str, Any]): 評価結果
+    """
+    index, params = task
+    result = {
+        "index": index,
+        "cog_std": np.nan,
+        "iou": np.nan,
+        "fg_ratio": np.nan,
+        "found": 0,
+        "error": "",
+    }
+    try:
+        pipeline = ProcessingPipeline(**params)
+        cogs, ious, fgs = [], [], []
+        for i, src in enumerate(_shared["images"]):
+            _, img, _, _ = pipeline.run(src, cache=_shared["caches"][i])
+            bin_img = img["bin"]
+            if bin_img is None:
+                raise ValueError("二値化処理が行われない設定です。")
+
+            if _shared["masks"]:
+                pred = bin_img > 0
+                gt = _shared["masks"][i]
+                union = np.count_nonzero(pred | gt)
+                ious.append(np.count_nonzero(pred & gt) / union if union else 1.0)
+
+            # 前景がほとんどない・背景まで前景になったマスクは重心のばらつきの評価に含めない
+            fg = cv2.countNonZero(bin_img) / bin_img.size
+            fgs.append(fg)
+            if fg > 0 and fg_range[0] <= fg <= fg_range[1]:
+                try:
+                    COG, _ = CenterOfGravity(None, bin_img, cal_Method=CalcCOG)
+                except IndexError:
+                    COG = None
+                if COG is not None:
+                    cogs.append(COG[:2])
+
+        result["found"] = len(cogs)
+        if len(cogs) > 1:
+            cogs = np.asarray(cogs, dtype=np.float64)
+            result["cog_std"] = float(np.sqrt(cogs.var(axis=0).sum()))
+        elif len(cogs) == 1:
+            result["cog_std"] = 0.0
+        if ious:
+            result["iou"] = float(np.mean(ious))
+        if fgs:
+            result["fg_ratio"] = float(np.mean(fgs))
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _rank_key(res: Dict[str, Any], objective: str, n_images: int) -> Tuple:
+    """目的関数の並び替えキー．同じ評価値の場合は設定の番号が小さい方を優先する．"""
+    failed = res["error"] != ""
+    if objective == "iou":
+        score = -res["iou"] if not np.isnan(res["iou"]) else np.inf
+        return (failed, score, res["index"])
+    # 有効なマスクで重心が求まらなかった画像の数 -> 重心のばらつき の順で評価する
+    std = res["cog_std"] if not np.isnan(res["cog_std"]) else np.inf
+    return (failed, n_images - res["found"], std, res["index"])
+
+
+def RunSweep(
+    images: Sequence[np.ndarray],
+    grid: Dict[str, Sequence[Any]],
+    masks: Union[Sequence[np.ndarray], None] = None,
+    objective: Literal["cog_std", "iou"] = "cog_std",
+    CalcCOG: Literal["image", "outline", "components"] = "image",
+    fg_range: Tuple[float, float] = (0.001, 0.5),
+    max_workers: Union[int, None] = None,
+    out_csv: Union[str, None] = None,
+) -> List[Dict[str, Any]]:
+    """
+    `ImageCvt` の引数のグリッドをプロセスプールで評価し，目的関数の順に並べる関数．
+    画像とマスクは共有メモリに1度だけ配置し，各タスクには設定のみを渡す．
+
+    Args:
+        images (Sequence[np.ndarray]): 評価に使用する uint8 の RGB 画像
+        grid (Dict[str, Sequence[Any]]):
+            `ImageCvt` の引数名と候補の値．
+            e.g. {"Binarization": ["Adaptive"], "AdaptiveThreshold_BlockSize": [5, 15, 25]}
+        masks (Union[Sequence[np.ndarray], None], optional):
+            画像ごとの正解マスク(`AnnotationMask`)．objective="iou" の場合は必須．Defaults to None.
+        objective (Literal["cog_std", "iou"], optional): 設定を選ぶ目的関数．Defaults to "cog_std".
+            * "cog_std": 重心が求まった画像数が多く，重心位置のばらつき[px]が小さい設定を優先．
+                         前景の割合が fg_range の範囲外の画像は，重心が求まらなかったものとして扱う．
+            * "iou": 二値画像と正解マスクの IoU の平均が大きい設定を優先
+        CalcCOG (Literal["image", "outline", "components"], optional): 重心位置の計算対象．Defaults to "image".
+        fg_range (Tuple[float, float], optional):
+            二値画像の前景(白)の割合がこの範囲 (下限, 上限) の画像のみ重心を評価する．
+            反転したマスクや，背景全体が最大の領域になるマスクを除くため．Defaults to (0.001, 0.5).
+        max_workers (Union[int, None], optional): プロセス数．None の場合は CPU 数．Defaults to None.
+        out_csv (Union[str, None], optional): 順位付けした結果を書き出す CSV のパス．Defaults to None.
+
+    Return:
+        ranking (List[Dict[str, Any]]): 順位順に並べた設定と評価結果
+    """
+    if objective not in ("cog_std", "iou"):
+        raise ValueError("The `objective` is invalid.")
+    if objective == "iou" and masks is None:
+        raise ValueError("objective='iou' の場合は `masks` を指定してください。")
+    if not 0 <= fg_range[0] < fg_range[1] <= 1:
+        raise ValueError("`fg_range` は 0 <= 下限 < 上限 <= 1 で指定してください。")
+    if masks is not None and len(masks) != len(images):
+        raise ValueError("`images` と `masks` の数が一致しません。")
+
+    images = [np.ascontiguousarray(img, dtype=np.uint8) for img in images]
+    masks = [] if masks is None else [np.ascontiguousarray(m, dtype=np.uint8) for m in masks]
+    params = ParameterGrid(grid)
+
+    img_size, img_layout = _pack(images)
+    mask_size, mask_layout = _pack(masks)
+    mask_layout = [(img_size + ofs, shape) for ofs, shape in mask_layout]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(img_size + mask_size, 1))
+    try:
+        buf = np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)
+        for a, (ofs, _) in zip(images + masks, img_layout + mask_layout):
+            buf[ofs : ofs + a.size] = a.ravel()
+        del buf
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        tasks = list(enumerate(params))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(shm.name, img_layout, mask_layout),
+        ) as executor:
+            chunksize = max(1, len(tasks) // (max_workers * 4))
+            results = list(
+                executor.map(
+                    _evaluate,
+                    tasks,
+                    itertools.repeat(CalcCOG),
+                    itertools.repeat(tuple(fg_range)),
+                    chunksize=chunksize,
+                )
+            )
+    finally:
+        shm.close()
+        shm.unlink()
+
+    for res in results:
+        res["params"] = params[res["index"]]
+    ranking = sorted(results, key=lambda r: _rank_key(r, objective, len(images)))
+    for rank, res in enumerate(ranking, start=1):
+        res["rank"] = rank
+
+    if out_csv is not None:
+        WriteSweepResult(out_csv, ranking, list(grid.keys()))
+    return ranking
+
+
+def WriteSweepResult(out_csv: str, ranking: List[Dict[str, Any]], keys: List[str]) -> None:
+    """
+    順位付けしたスイープ結果を CSV に書き出す関数．
+
+    Args:
+        out_csv (str): 書き出す CSV のパス
+        ranking (List[Dict[str, Any]]): `RunSweep` の返り値
+        keys (List[str]): 列として書き出すパラメタ名
+    """
+    header = ["rank", "index"] + keys + ["found", "cog_std", "iou", "fg_ratio", "error"]
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for res in ranking:
+            writer.writerow(
+                [res["rank"], res["index"]]
+                + [res["params"][k] for k in keys]
+                + [res["found"], res["cog_std"], res["iou"], res["fg_ratio"], res["error"]]
+            )
+
+
+if __name__ == "__main__":
+    import glob
+
+    from PIL import Image
+
+    ann_dir = os.path.join("assets", "anns")
+    images, masks = [], []
+    for ann_pth in sorted(glob.glob(os.path.join(ann_dir, "*-asset.json"))):
+        with open(ann_pth, "r", encoding="utf-8") as f:
+            name = json.load(f)["asset"]["name"]
+        img = np.array(Image.open(os.path.join(ann_dir, name)).convert("RGB"))
+        images.append(img)
+        masks.append(AnnotationMask(ann_pth, img.shape[:2]))
+
+    ranking = RunSweep(
+        images,
+        {
+            "Color_Space": ["Gray"],
+            "Binarization": ["Adaptive"],
+            "AdaptiveThreshold_type": ["Mean", "Gaussian", "Bradley"],
+            "AdaptiveThreshold_BlockSize": [5, 15, 25],
+            "AdaptiveThreshold_Constant": [1, 2, 3, 4, 5],
+            "background_color": [0, 1],
+        },
+        masks=masks,
+        objective="iou",
+        out_csv="sweep_result.csv",
+    )
+    for res in ranking[:5]:
+        print(res["rank"], res["iou"], res["params"])
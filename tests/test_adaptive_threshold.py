@@ -0,0 +1,158 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.Adaptive_threshold.bradley import (
+    Bradley_threshold,
+    get_int_img,
+)
+from lib.utils.ImageProcessing.Adaptive_threshold.wellner import Wellner_threshold
+from lib.utils.ImageProcessing.Binarization import AdaptiveThreshold
+from lib.utils.ImageProcessing.FrameCache import FrameCache
+
+
+def _bradley_loop(src, kernel_size=5, T=0.30):
+    """ベクトル化前の Bradley_threshold (画素ごとのループ実装)"""
+    k = int(kernel_size) / 2
+    new_img = src.copy()
+    res = np.zeros_like(new_img)
+    int_img = cv2.integral(new_img)
+    (h, w) = new_img.shape
+    for col in range(w):
+        for row in range(h):
+            y0 = int(max(row - k, 0))
+            y1 = int(min(row + k, h - 1))
+            x0 = int(max(col - k, 0))
+            x1 = int(min(col + k, w - 1))
+            count = (y1 - y0) * (x1 - x0)
+            sum_ = -1
+            if count == 0:
+                if x0 == x1 and y0 == y1:
+                    sum_ = int_img[y0, x0]
+                if x1 == x0 and y0 != y1:
+                    sum_ = int_img[y1, x1] - int_img[y0, x1]
+                if y1 == y0 and x1 != x0:
+                    sum_ = int_img[y1, x1] - int_img[y1, x0]
+            else:
+                sum_ = (
+                    int(int_img[y1, x1])
+                    - int(int_img[y0, x1])
+                    - int(int_img[y1, x0])
+                    + int(int_img[y0, x0])
+                )
+                if sum_ < 0:
+                    sum_ = -1 * sum_
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.float64(sum_) / count
+            if new_img[row, col] < mean * (100 - T) / 100:
+                res[row, col] = 0
+            else:
+                res[row, col] = 255
+    return res
+
+
+@pytest.fixture
+def noisy():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (37, 53), dtype=np.uint8)
+    img[10:25, 15:40] //= 3
+    return img
+
+
+@pytest.mark.parametrize("kernel_size", [1, 2, 5, 8, 15])
+def test_bradley_matches_loop(noisy, kernel_size):
+    expected = _bradley_loop(noisy, kernel_size)
+    np.testing.assert_array_equal(Bradley_threshold(noisy, kernel_size), expected)
+
+
+def test_bradley_accepts_precomputed_integral(noisy):
+    int_img = cv2.integral(noisy)
+    np.testing.assert_array_equal(
+        Bradley_threshold(noisy, 7, int_img=int_img), Bradley_threshold(noisy, 7)
+    )
+    with pytest.raises(ValueError):
+        Bradley_threshold(noisy, 7, int_img=int_img[1:])
+
+
+def test_bradley_thin_image():
+    img = np.arange(20, dtype=np.uint8).reshape(1, 20) * 10
+    np.testing.assert_array_equal(Bradley_threshold(img, 5), _bradley_loop(img, 5))
+
+
+def test_get_int_img(noisy):
+    expected = noisy.astype(np.int64).cumsum(axis=0).cumsum(axis=1)
+    np.testing.assert_array_equal(get_int_img(noisy), expected)
+
+
+def _wellner_loop(src):
+    """累積和に置き換える前の Wellner_threshold (画素ごとのループ実装)"""
+    (h, w) = src.shape
+    new_img = src.reshape((-1, 1))
+    s = int(w / 8)
+    t = 15
+    output = np.empty(0)
+    MA_list = np.zeros((s))
+    for v in new_img:
+        MA = MA_list.sum() / s
+        MA_list = np.insert(MA_list[:-1].copy(), 0, v)
+        v = 255 if v < MA * ((100 - t) / 100) else 0
+        output = np.r_[output, np.array(v)]
+    return output.reshape((h, w)).astype(np.uint8)
+
+
+def test_wellner_matches_loop(noisy):
+    img = np.ascontiguousarray(noisy[:, :48])
+    np.testing.assert_array_equal(Wellner_threshold(img), _wellner_loop(img))
+
+
+def test_wellner_serpentine_reverses_odd_rows(noisy):
+    img = np.ascontiguousarray(noisy[:, :48])
+    flipped = img.copy()
+    flipped[1::2] = flipped[1::2, ::-1]
+    expected = Wellner_threshold(flipped)
+    expected[1::2] = expected[1::2, ::-1]
+    np.testing.assert_array_equal(Wellner_threshold(img, serpentine=True), expected)
+
+
+def test_wellner_rejects_non_array():
+    with pytest.raises(TypeError):
+        Wellner_threshold([[0, 1], [2, 3]])
+
+
+@pytest.mark.parametrize("block_size", [3, 11, 31])
+@pytest.mark.parametrize("C", [-3, 0, 2, 4.5])
+def test_cached_mean_matches_opencv(noisy, block_size, C):
+    expected = AdaptiveThreshold(noisy, "Mean", block_size, C)
+    cache = FrameCache(noisy)
+    np.testing.assert_array_equal(
+        AdaptiveThreshold(noisy, "Mean", block_size, C, cache=cache), expected
+    )
+
+
+def test_cached_bradley_matches_uncached(noisy):
+    cache = FrameCache(noisy)
+    np.testing.assert_array_equal(
+        AdaptiveThreshold(noisy, "Bradley", 7, 15, cache=cache),
+        AdaptiveThreshold(noisy, "Bradley", 7, 15),
+    )
+    assert cache.Integral(noisy) is cache.Integral(noisy)
+
+
+def test_cache_key_shares_results_between_arrays(noisy):
+    cache = FrameCache(noisy)
+    buf = noisy.copy()
+    mean = cache.BoxMean(11, buf, key="gray")
+    integral = cache.Integral(buf, key="gray")
+    # 同じ key の別の配列でも計算結果を使い回す
+    assert cache.BoxMean(11, noisy.copy(), key="gray") is mean
+    assert cache.Integral(noisy.copy(), key="gray") is integral
+
+    # 以前の配列が書き換えられても，未計算の値は新しい配列から求める
+    buf[:] = 0
+    np.testing.assert_array_equal(
+        cache.BoxMean(5, noisy.copy(), key="gray"),
+        cv2.blur(noisy, (5, 5), borderType=cv2.BORDER_REPLICATE),
+    )
+
+    cache.update(noisy)
+    assert cache.BoxMean(11, noisy, key="gray") is not mean
@@ -0,0 +1,150 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.Binarization import (
+    GlobalThreshold,
+    HSVBounds,
+    HSVThreshold,
+    MultiOtsuThreshold,
+    PickupColorHSV,
+    _OtsuThreshold,
+)
+
+
+def _otsu_loop(img, min_value=0, max_value=255):
+    """ベクトル化前の _OtsuThreshold (閾値ごとのループ実装)"""
+    img = img.copy()
+    hist = [np.sum(img == i) for i in range(256)]
+    s_max = (0, -10)
+    for th in range(256):
+        n1 = float(sum(hist[:th]))
+        n2 = float(sum(hist[th:]))
+        mu1 = 0 if n1 == 0 else sum([i * hist[i] for i in range(0, th)]) / n1
+        mu2 = 0 if n2 == 0 else sum([i * hist[i] for i in range(th, 256)]) / n2
+        s = n1 * n2 * (float(mu1) - float(mu2)) ** 2
+        if s > s_max[1]:
+            s_max = (th, s)
+    t = s_max[0]
+    img[img < t] = min_value
+    img[img >= t] = max_value
+    return t, img
+
+
+def _between_class(hist, thresholds):
+    """閾値で分けた各クラスの (画素値の総和)^2 / 画素数 の和"""
+    bounds = (0,) + tuple(thresholds) + (256,)
+    levels = np.arange(256)
+    total = 0.0
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        n = hist[a:b].sum()
+        if n:
+            total += float((levels[a:b] * hist[a:b]).sum()) ** 2 / n
+    return total
+
+
+@pytest.fixture
+def bimodal():
+    rng = np.random.default_rng(1)
+    img = np.clip(rng.normal(70, 15, (60, 80)), 0, 255)
+    img[20:45, 30:70] = np.clip(rng.normal(180, 20, (25, 40)), 0, 255)
+    return img.astype(np.uint8)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_otsu_matches_loop(bimodal, seed):
+    img = np.roll(bimodal, seed * 7) // (seed + 1)
+    src = img.copy()
+    t, dst = _OtsuThreshold(img)
+    t_ref, dst_ref = _otsu_loop(img)
+    assert t == t_ref
+    np.testing.assert_array_equal(dst, dst_ref)
+    # 入力画像は書き換えない
+    np.testing.assert_array_equal(img, src)
+
+
+def test_global_threshold_otsu(bimodal):
+    t, dst = GlobalThreshold(bimodal, Type="Otsu")
+    assert t == _otsu_loop(bimodal)[0]
+    assert set(np.unique(dst)) <= {0, 255}
+
+
+def test_multi_otsu_single_threshold_is_otsu(bimodal):
+    assert MultiOtsuThreshold(bimodal, n_thresholds=1) == (_otsu_loop(bimodal)[0],)
+
+
+def test_multi_otsu_matches_exhaustive_search():
+    rng = np.random.default_rng(2)
+    img = rng.choice([20, 21, 90, 95, 200, 210], size=(30, 30)).astype(np.uint8)
+    hist = np.bincount(img.ravel(), minlength=256)
+    best = max(
+        _between_class(hist, ts) for ts in itertools.combinations(range(1, 256), 2)
+    )
+    ts = MultiOtsuThreshold(img, n_thresholds=2)
+    assert ts[0] < ts[1]
+    assert _between_class(hist, ts) == pytest.approx(best)
+
+
+def test_multi_otsu_validates_input(bimodal):
+    with pytest.raises(ValueError):
+        MultiOtsuThreshold(bimodal, n_thresholds=4)
+    with pytest.raises(ValueError):
+        MultiOtsuThreshold(np.dstack([bimodal] * 3))
+
+
+def _hsv_reference(hsv, lowerb, upperb):
+    """H が 0 を跨ぐ範囲を [下限, 179] と [0, 上限] に分けて抽出したマスク"""
+    if lowerb[0] <= upperb[0]:
+        return cv2.inRange(hsv, lowerb, upperb)
+    high = cv2.inRange(hsv, lowerb, (179, upperb[1], upperb[2]))
+    low = cv2.inRange(hsv, (0, lowerb[1], lowerb[2]), upperb)
+    return cv2.bitwise_or(high, low)
+
+
+@pytest.fixture
+def rgb():
+    rng = np.random.default_rng(8)
+    img = rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)
+    # 無彩色の画素 (S=0) も含める
+    img[:32] = img[:32, :, :1]
+    return img
+
+
+@pytest.mark.parametrize(
+    "hsv_range",
+    [
+        PickupColorHSV[0],
+        PickupColorHSV[1],
+        ((160, 0, 0), (20, 255, 255)),  # 無彩色の画素も含む 0 を跨ぐ範囲
+        ((175, 30, 30), (0, 200, 255)),
+    ],
+)
+def test_hsv_rgb_input_matches_two_range_reference(rgb, hsv_range):
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    expected = _hsv_reference(hsv, *hsv_range)
+    np.testing.assert_array_equal(HSVThreshold(rgb, hsv_range=hsv_range), expected)
+    np.testing.assert_array_equal(
+        HSVThreshold(hsv, hsv_range=hsv_range, is_hsv=True), expected
+    )
+
+
+def test_hsv_threshold_writes_to_buffers(rgb):
+    hsv = np.empty_like(rgb)
+    dst = np.empty(rgb.shape[:2], dtype=np.uint8)
+    out = HSVThreshold(rgb, PickupColor=0, hsv=hsv, dst=dst)
+    assert out is dst
+    np.testing.assert_array_equal(hsv, cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV))
+
+
+def test_hsv_bounds_split_wrapping_ranges():
+    assert HSVBounds(1) == [PickupColorHSV[1]]
+    assert HSVBounds(0) == [
+        ((170, 80, 50), (179, 255, 255)),
+        ((0, 80, 50), (10, 255, 255)),
+    ]
+    with pytest.raises(ValueError):
+        HSVBounds(hsv_range=((180, 0, 0), (10, 255, 255)))
+    with pytest.raises(ValueError):
+        HSVBounds(PickupColor=5)
@@ -0,0 +1,174 @@
+import cv2
+import numpy as np
+import pytest
+
+# Camera.py は GUI の PySimpleGUI を読み込む
+pytest.importorskip("PySimpleGUI")
+
+from lib.DobotFunction.Camera import (
+    BatchImageCvt,
+    CoarseToFineCOG,
+    Contours,
+    ImageCvt,
+    ProcessingPipeline,
+    ROITracker,
+)
+from lib.utils.ImageProcessing.FrameCache import FrameCache
+
+
+def _square_frame(x, y, size=40, shape=(240, 320)):
+    """黒い背景に白い正方形を1つ描いた RGB 画像 (x, y は左上の座標)"""
+    frame = np.zeros(shape + (3,), dtype=np.uint8)
+    frame[y : y + size, x : x + size] = 200
+    return frame
+
+
+def _centered_square(cx, cy, size, shape=(720, 1280)):
+    """重心が (cx, cy) の正方形を描いた画像"""
+    return _square_frame(cx - size // 2, cy - size // 2, size, shape)
+
+
+GLOBAL_SETTINGS = {"Color_Space": "Gray", "Binarization": "Global", "background_color": 1}
+
+
+def test_batch_matches_single_frame():
+    stack = np.stack([_square_frame(20 + 30 * i, 50 + 10 * i) for i in range(4)])
+    result = BatchImageCvt(stack, **GLOBAL_SETTINGS)
+
+    for i, frame in enumerate(stack):
+        _, img, l_th, _ = ImageCvt({"rgb": frame}, **GLOBAL_SETTINGS)
+        COG, _ = Contours(None, img["bin"], drawing_figure=False)
+        assert result["found"][i]
+        assert result["l_th"][i] == l_th
+        assert (result["cx"][i], result["cy"][i]) == (COG[0], COG[1])
+
+
+def test_batch_accepts_iterators():
+    frames = [_square_frame(30, 40), np.zeros((240, 320, 3), dtype=np.uint8)]
+    result = BatchImageCvt(
+        iter(frames), pipeline=ProcessingPipeline(**GLOBAL_SETTINGS)
+    )
+    assert list(result["found"]) == [True, False]
+    assert np.isnan(result["cx"][1])
+
+
+def test_image_cvt_rejects_stacks():
+    stack = np.stack([_square_frame(20, 20)] * 2)
+    with pytest.raises(ValueError):
+        ImageCvt({"rgb": stack}, **GLOBAL_SETTINGS)
+
+
+@pytest.fixture
+def pipeline():
+    return ProcessingPipeline(**GLOBAL_SETTINGS)
+
+
+def test_roi_tracker_follows_large_object(pipeline):
+    # 窓(重心 ± 96px)より大きい物体も，窓で切り取られずに追跡できる
+    tracker = ROITracker()
+    for cx in (400, 440, 480, 520):
+        COG, _ = tracker.locate(_centered_square(cx, 360, 300), pipeline)
+        assert COG[0] == pytest.approx(cx, abs=1)
+        assert COG[1] == pytest.approx(360, abs=1)
+    # 前回の物体の周辺だけを処理している
+    x0, y0, x1, y1 = tracker.roi
+    assert (x1 - x0) < 1280 and (y1 - y0) < 720
+
+
+def test_roi_tracker_researches_when_object_leaves_window(pipeline):
+    tracker = ROITracker()
+    COG, _ = tracker.locate(_centered_square(400, 360, 80), pipeline)
+    assert COG[0] == pytest.approx(400, abs=1)
+    # 窓の端からはみ出す位置に移動した場合は画像全体を探索し直す
+    COG, _ = tracker.locate(_centered_square(500, 360, 80), pipeline)
+    assert COG[0] == pytest.approx(500, abs=1)
+    # 窓の外に移動した場合も同様
+    COG, _ = tracker.locate(_centered_square(1000, 200, 80), pipeline)
+    assert COG[:2] == pytest.approx([1000, 200], abs=1)
+
+
+def test_roi_tracker_keeps_window_at_image_edge(pipeline):
+    # 画像の端に接している物体は窓からはみ出しているとはみなさない
+    tracker = ROITracker()
+    frame = _square_frame(0, 300, 80, (720, 1280))
+    tracker.locate(frame, pipeline)
+    roi = tracker.roi
+    assert roi[0] == 0
+    _, img = tracker.locate(frame, pipeline)
+    assert img["bin"].shape == (roi[3] - roi[1], roi[2] - roi[0])
+    assert tracker.roi == roi
+
+
+def test_coarse_to_fine_large_object(pipeline):
+    # 細かい探索の窓は縮小画像の外接矩形から決まるので，大きい物体も切り取られない
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    cv2.ellipse(frame, (850, 483), (450, 200), 0, 0, 360, (200, 200, 200), -1)
+    M = cv2.moments(frame[..., 0], True)
+    expected = [M["m10"] / M["m00"], M["m01"] / M["m00"]]
+
+    COG, img = CoarseToFineCOG(frame, pipeline, level=2)
+    assert COG[:2] == pytest.approx(expected, abs=1)
+    assert img["bin"].shape[0] > 400 and img["bin"].shape[1] > 900
+    COG, _ = CoarseToFineCOG(frame, pipeline, level=2, subpixel=True)
+    assert COG[:2] == pytest.approx(expected, abs=0.01)
+
+
+def test_roi_tracker_builds_pyramid_once_per_frame(pipeline):
+    tracker = ROITracker(pyramid_level=2)
+    frame = _centered_square(400, 300, 80)
+    tracker.locate(frame, pipeline)
+    pyr = tracker.cache.pyramid
+    tracker.reset()
+    COG, _ = tracker.locate(frame, pipeline)
+    assert tracker.cache.pyramid is pyr
+    assert COG[:2] == pytest.approx([400, 300], abs=1)
+
+    tracker.reset()
+    tracker.locate(_centered_square(420, 300, 80), pipeline)
+    assert tracker.cache.pyramid is not pyr
+
+
+@pytest.mark.parametrize("method", ["Mean", "Bradley"])
+def test_pipeline_shares_cache_between_settings(method):
+    rng = np.random.default_rng(6)
+    frame = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    cache = FrameCache(frame)
+    for C in (2, 5):
+        pipeline = ProcessingPipeline(
+            Color_Space="Gray",
+            Binarization="Adaptive",
+            AdaptiveThreshold_type=method,
+            AdaptiveThreshold_Constant=C,
+        )
+        for roi in (None, (10, 20, 100, 80)):
+            expected = pipeline.run(frame, roi=roi)[1]["bin"].copy()
+            np.testing.assert_array_equal(
+                pipeline.run(frame, roi=roi, cache=cache)[1]["bin"], expected
+            )
+    # 全体と ROI の2種類の入力画像の計算結果だけを保持する
+    assert len(cache._integrals) == 2
+
+
+def test_pipeline_rejects_cache_of_other_frame(pipeline):
+    frame = _square_frame(30, 40)
+    with pytest.raises(ValueError):
+        pipeline.run(frame, cache=FrameCache(frame.copy()))
+
+
+@pytest.mark.parametrize("HSV_range", [None, ((160, 0, 0), (20, 255, 255))])
+def test_hsv_mask_does_not_depend_on_color_space(HSV_range):
+    rng = np.random.default_rng(9)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    frame[:20] = frame[:20, :, :1]
+    masks = [
+        ProcessingPipeline(
+            Color_Space=space,
+            Binarization="HSV",
+            color=0,
+            background_color=1,
+            HSV_range=HSV_range,
+        ).run(frame)[1]["bin"].copy()
+        for space in ("RGB", "HSV")
+    ]
+    np.testing.assert_array_equal(masks[0], masks[1])
+    assert masks[0].any()
@@ -0,0 +1,268 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.CenterOfGravity import (
+    DetectCOG,
+    DetectObjects,
+    MomentOrientation,
+    OverlayRenderer,
+)
+
+
+def _triangle(shape=(120, 120)):
+    img = np.zeros(shape, dtype=np.uint8)
+    pts = np.array([[20, 20], [100, 20], [20, 100]], dtype=np.int32)
+    cv2.fillPoly(img, [pts], 255)
+    return img
+
+
+@pytest.mark.parametrize("cal_Method", ["outline", "components"])
+def test_refine_ignores_other_objects_in_bounding_box(cal_Method):
+    triangle = _triangle()
+    M = cv2.moments(triangle, True)
+    expected = [M["m10"] / M["m00"], M["m01"] / M["m00"]]
+
+    # 外接矩形の空いた角に min_area 未満の小さな物体を置く
+    img = triangle.copy()
+    img[88:97, 88:97] = 255
+    result = DetectCOG(img, cal_Method=cal_Method, refine_img=img)
+    assert result["rect"] == (20, 20, 81, 81)
+    assert result["COG"][:2] == pytest.approx(expected, abs=0.2)
+
+
+def test_refine_outline_with_offset():
+    triangle = _triangle()
+    M = cv2.moments(triangle, True)
+    expected = [M["m10"] / M["m00"] + 30, M["m01"] / M["m00"] + 40]
+
+    frame = np.zeros((200, 200), dtype=np.uint8)
+    frame[40:160, 30:150] = triangle
+    frame[128:137, 118:127] = 255
+    roi = frame[40:160, 30:150]
+    result = DetectCOG(roi, cal_Method="outline", offset=(30, 40), refine_img=frame)
+    assert result["COG"][:2] == pytest.approx(expected, abs=0.2)
+
+
+def _blobs(shape=(100, 200)):
+    """面積の異なる3つの長方形と min_area 以下の小さな点を描いた二値画像"""
+    img = np.zeros(shape, dtype=np.uint8)
+    img[10:20, 150:170] = 255  # 面積 200，重心 (159.5, 14.5)
+    img[60:90, 20:40] = 255  # 面積 600，重心 (29.5, 74.5)
+    img[40:60, 90:110] = 255  # 面積 400，重心 (99.5, 49.5)
+    img[5:13, 5:13] = 255  # 面積 64
+    return img
+
+
+def test_detect_objects_filters_by_min_area():
+    objects = DetectObjects(_blobs(), min_area=100)
+    assert sorted(objects["area"]) == [200, 400, 600]
+    assert len(DetectObjects(_blobs(), min_area=63)) == 4
+    # 面積が min_area と等しい場合は除く
+    assert len(DetectObjects(_blobs(), min_area=64)) == 3
+
+
+@pytest.mark.parametrize(
+    "sort_by, expected",
+    [("area", [600, 400, 200]), ("x", [600, 400, 200]), ("y", [200, 400, 600])],
+)
+def test_detect_objects_sort_order(sort_by, expected):
+    objects = DetectObjects(_blobs(), sort_by=sort_by)
+    assert list(objects["area"]) == expected
+
+
+def test_detect_objects_distance_order_with_offset():
+    # 基準点を省略した場合は画像の中心 (100, 50) に近い順
+    objects = DetectObjects(_blobs(), sort_by="distance")
+    assert list(objects["area"]) == [400, 200, 600]
+
+    offset = (30, 40)
+    shifted = DetectObjects(_blobs(), sort_by="distance", offset=offset)
+    assert list(shifted["area"]) == [400, 200, 600]
+    np.testing.assert_allclose(shifted["cx"], objects["cx"] + 30)
+    np.testing.assert_allclose(shifted["cy"], objects["cy"] + 40)
+    np.testing.assert_array_equal(shifted["x"], objects["x"] + 30)
+    np.testing.assert_array_equal(shifted["y"], objects["y"] + 40)
+
+    # 基準点は元画像の座標で指定する
+    near = DetectObjects(_blobs(), sort_by="distance", offset=offset, origin=(60, 115))
+    assert list(near["area"]) == [600, 400, 200]
+
+
+def test_detect_objects_angle_requires_orientation():
+    objects = DetectObjects(_blobs())
+    assert np.isnan(objects["angle"]).all()
+    assert np.isnan(objects["elongation"]).all()
+
+    objects = DetectObjects(_blobs(), orientation=True)
+    # 細長い長方形だけ角度が求まり，正方形は円に近いので NaN のまま
+    by_area = {int(o["area"]): o for o in objects}
+    # 主軸の角度 θ に対して (θ mod 180) - 90．横長は -90，縦長は 0
+    assert by_area[200]["angle"] == pytest.approx(-90, abs=1e-6)
+    assert by_area[600]["angle"] == pytest.approx(0, abs=1e-6)
+    assert np.isnan(by_area[400]["angle"])
+    assert not np.isnan(by_area[400]["elongation"])
+
+
+def test_detect_objects_rejects_invalid_input():
+    with pytest.raises(ValueError):
+        DetectObjects(_blobs(), sort_by="size")
+    with pytest.raises(ValueError):
+        DetectObjects(np.dstack([_blobs()] * 3))
+
+
+def _square_and_line():
+    """面積の大きい正方形と，面積は小さいが輪郭の点が多い細長い線"""
+    img = np.zeros((100, 200), dtype=np.uint8)
+    img[20:50, 20:50] = 255  # 面積 900，重心 (34.5, 34.5)
+    img[80:82, 30:190] = 255  # 面積 320
+    return img
+
+
+def test_components_pick_largest_area():
+    img = _square_and_line()
+    outline = DetectCOG(img, cal_Method="outline")
+    components = DetectCOG(img, cal_Method="components")
+    # 輪郭は点の数で選ぶため線が選ばれるが，連結成分は面積で選ぶ
+    assert outline["rect"] == (30, 80, 160, 2)
+    assert components["rect"] == (20, 20, 30, 30)
+    assert components["COG"][:2] == [34, 34]
+    assert components["contours"] is None
+
+
+def test_components_reject_small_area():
+    img = np.zeros((40, 40), dtype=np.uint8)
+    img[10:20, 10:20] = 255  # 面積 100
+    assert DetectCOG(img, cal_Method="components", min_area=100)["COG"] is None
+    assert DetectCOG(img, cal_Method="components", min_area=99)["COG"] is not None
+    assert DetectCOG(np.zeros_like(img), cal_Method="components")["COG"] is None
+
+
+def test_components_with_offset():
+    img = _square_and_line()
+    result = DetectCOG(img, cal_Method="components", offset=(100, 50))
+    assert result["rect"] == (120, 70, 30, 30)
+    assert result["COG"][:2] == [134, 84]
+
+
+def _ellipse(angle, axes=(60, 20), shape=(200, 200)):
+    """主軸を画像の x 軸から angle[deg] 回転させた楕円 (y 軸は下向き)"""
+    img = np.zeros(shape, dtype=np.uint8)
+    cv2.ellipse(img, (100, 100), axes, angle, 0, 360, 255, -1)
+    return img
+
+
+@pytest.mark.parametrize("theta", [0, 30, 45, 60, 90, 120, 135, 170])
+def test_moment_orientation_of_rotated_ellipse(theta):
+    M = cv2.moments(_ellipse(theta), True)
+    angle, elongation, ambiguous = MomentOrientation(M)
+    # 主軸の角度 θ に対して (θ mod 180) - 90 で，[-90, 90) の範囲
+    assert angle == pytest.approx(theta % 180 - 90, abs=0.5)
+    assert -90 <= angle < 90
+    assert elongation == pytest.approx(1 - (20 / 60) ** 2, abs=0.02)
+    assert not ambiguous
+
+
+def test_moment_orientation_of_rotated_rectangle():
+    img = np.zeros((200, 200), dtype=np.uint8)
+    box = cv2.boxPoints(((100, 100), (120, 30), 30))
+    cv2.fillPoly(img, [np.round(box).astype(np.int32)], 255)
+    angle, _, ambiguous = MomentOrientation(cv2.moments(img, True))
+    assert angle == pytest.approx(-60, abs=0.5)
+    assert not ambiguous
+
+
+def test_disc_orientation_is_ambiguous():
+    disc = np.zeros((100, 100), dtype=np.uint8)
+    cv2.circle(disc, (50, 50), 30, 255, -1)
+    angle, elongation, ambiguous = MomentOrientation(cv2.moments(disc, True))
+    assert ambiguous and elongation < 0.1
+    for cal_Method in ("image", "outline", "components"):
+        result = DetectCOG(disc, cal_Method=cal_Method, orientation=True)
+        assert result["COG"][:2] == [50, 50]
+        assert result["COG"][2] is None
+
+
+def test_moment_orientation_of_empty_moments():
+    M = cv2.moments(np.zeros((10, 10), dtype=np.uint8), True)
+    assert MomentOrientation(M) == (None, 0.0, True)
+
+
+@pytest.mark.parametrize("cal_Method", ["image", "outline", "components"])
+def test_detect_cog_orientation_uses_centroid_moments(cal_Method):
+    result = DetectCOG(_ellipse(30), cal_Method=cal_Method, orientation=True)
+    assert result["COG"][2] == pytest.approx(-60, abs=0.5)
+    assert result["M"] is not None
+
+
+@pytest.mark.parametrize("cal_Method", ["image", "outline", "components"])
+def test_detect_cog_leaves_inputs_untouched(cal_Method):
+    bin_img = _ellipse(30)
+    refine = cv2.GaussianBlur(bin_img, (5, 5), 0)
+    bin_copy, refine_copy = bin_img.copy(), refine.copy()
+    result = DetectCOG(
+        bin_img, cal_Method=cal_Method, orientation=True, refine_img=refine
+    )
+    assert result["COG"] is not None
+    np.testing.assert_array_equal(bin_img, bin_copy)
+    np.testing.assert_array_equal(refine, refine_copy)
+
+
+@pytest.fixture
+def detected():
+    bin_img = _ellipse(30)
+    rgb = np.dstack([bin_img // 2] * 3)
+    result = DetectCOG(bin_img, cal_Method="outline", orientation=True)
+    return result, bin_img, rgb
+
+
+def test_render_copies_when_dst_is_none(detected):
+    result, bin_img, rgb = detected
+    rgb_copy = rgb.copy()
+    out = OverlayRenderer(result, bin_img).render(rgb)
+    assert out is not rgb
+    np.testing.assert_array_equal(rgb, rgb_copy)
+    assert (out != rgb).any()
+
+
+def test_render_draws_in_place_when_dst_is_rgb(detected):
+    result, bin_img, rgb = detected
+    expected = OverlayRenderer(result, bin_img).render(rgb)
+    out = OverlayRenderer(result, bin_img).render(rgb, dst=rgb)
+    assert out is rgb
+    np.testing.assert_array_equal(rgb, expected)
+
+
+def test_render_to_other_buffer(detected):
+    result, bin_img, rgb = detected
+    rgb_copy = rgb.copy()
+    dst = np.zeros_like(rgb)
+    out = OverlayRenderer(result, bin_img).render(rgb, dst=dst)
+    assert out is dst
+    np.testing.assert_array_equal(rgb, rgb_copy)
+    np.testing.assert_array_equal(dst, OverlayRenderer(result, bin_img).render(rgb))
+
+
+def test_render_extracts_component_contours_from_rect():
+    frame = np.zeros((200, 200), dtype=np.uint8)
+    frame[60:100, 50:110] = 255
+    # L 字型のオブジェクトの外接矩形の空いた角に，小さなオブジェクトを置く
+    frame[80:100, 90:110] = 0
+    frame[90:96, 100:106] = 255
+    roi = frame[40:160, 30:170]
+    result = DetectCOG(roi, cal_Method="components", offset=(30, 40))
+    assert result["contours"] is None
+    assert result["rect"] == (50, 60, 60, 40)
+
+    renderer = OverlayRenderer(result, roi)
+    (contour,) = renderer._Contours()
+    # 輪郭は元画像の座標で，外接矩形内の面積が最大の輪郭のみ
+    assert cv2.boundingRect(contour) == result["rect"]
+    assert cv2.contourArea(contour) > 1500
+    # 二値画像がない場合は輪郭を描画しない
+    assert OverlayRenderer(result)._Contours() is None
+
+    rgb = np.zeros((200, 200, 3), dtype=np.uint8)
+    out = renderer.render(rgb)
+    assert out[60, 70, 0] == 255  # 上辺の輪郭
+    assert not rgb.any()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.Corners import CornerTracker
+
+
+def _squares(positions, shape=(160, 240)):
+    """黒い背景に白い正方形を描いた画像 (positions は各正方形の左上の座標)"""
+    img = np.zeros(shape, dtype=np.uint8)
+    for x, y in positions:
+        img[y : y + 20, x : x + 20] = 255
+    return img
+
+
+def test_replenish_keeps_surviving_tracks():
+    tracker = CornerTracker(max_corners=40, min_tracks=12)
+    points, ids = tracker.update(_squares([(20, 20), (80, 20), (140, 20)]))
+    assert len(points) == 12
+    first = dict(zip(ids.tolist(), points.copy()))
+
+    # 2つの正方形が消えて追跡点が min_tracks を下回り，別の位置に正方形が現れる
+    points, ids = tracker.update(_squares([(20, 20), (60, 100), (140, 100)]))
+    survivors = [i for i in ids.tolist() if i in first]
+    assert len(survivors) == 4
+    for i in survivors:
+        assert points[ids.tolist().index(i)] == pytest.approx(first[i], abs=0.5)
+
+    # 補充した点は新しい番号で，追跡中の点から min_distance 以上離れている
+    new = np.isin(ids, survivors, invert=True)
+    assert np.count_nonzero(new) == 8
+    assert ids[new].min() > max(first)
+    old_points = points[~new]
+    for p in points[new]:
+        assert np.linalg.norm(old_points - p, axis=1).min() >= tracker.min_distance
+    assert len(set(ids.tolist())) == len(ids)
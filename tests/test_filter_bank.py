@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.FilterBank import FilterBank
+
+
+@pytest.fixture
+def img():
+    rng = np.random.default_rng(7)
+    img = rng.integers(0, 256, (48, 64), dtype=np.uint8)
+    img[10:30, 20:50] = 200
+    return img
+
+
+@pytest.mark.parametrize("th1, th2", [(50, 100), (20, 200)])
+def test_canny_matches_opencv(img, th1, th2):
+    spec = "canny {}/{}".format(th1, th2)
+    dst = FilterBank([spec])(img)[spec]
+    np.testing.assert_array_equal(dst, cv2.Canny(img, th1, th2))
+
+
+def test_canny_with_sigma_matches_blurred_canny(img):
+    dst = FilterBank(["canny 50/100 1.5"])(img)["canny 50/100 1.5"]
+    blur = cv2.GaussianBlur(img, (0, 0), 1.5)
+    np.testing.assert_array_equal(dst, cv2.Canny(blur, 50, 100))
+
+
+def test_gaussian_with_zero_sigma_uses_ksize(img):
+    dsts = FilterBank(["gaussian 0 5", "gaussian 1.2"])(img)
+    np.testing.assert_array_equal(dsts["gaussian 0 5"], cv2.GaussianBlur(img, (5, 5), 0))
+    np.testing.assert_array_equal(
+        dsts["gaussian 1.2"], cv2.GaussianBlur(img, (0, 0), 1.2)
+    )
+
+
+def test_sobel_shares_gradients_with_canny(img):
+    dsts = FilterBank(["sobel x", "sobel y", "canny 50/100"])(img)
+    dx = cv2.Sobel(img, cv2.CV_16S, 1, 0, ksize=3, borderType=cv2.BORDER_REPLICATE)
+    dy = cv2.Sobel(img, cv2.CV_16S, 0, 1, ksize=3, borderType=cv2.BORDER_REPLICATE)
+    np.testing.assert_array_equal(dsts["sobel x"], dx)
+    np.testing.assert_array_equal(dsts["sobel y"], dy)
+    np.testing.assert_array_equal(dsts["canny 50/100"], cv2.Canny(dx, dy, 50, 100))
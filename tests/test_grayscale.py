@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.GrayScale import (
+    _rgb_to_srgb,
+    _srgb_to_rgb,
+    rgb_to_srgb,
+    srgb_to_rgb,
+    srgb_to_rgb_batch,
+)
+
+
+def _convert_loop(img, func, max_value):
+    """変換表を使う前の実装 (RGB の3チャンネルを1画素ずつ変換)"""
+    dst = img.copy()
+    h, w, _ = dst.shape
+    for i in range(h):
+        for j in range(w):
+            for k in range(3):
+                dst[i][j][k] = func(dst[i][j][k], quantum_max=max_value)
+    return dst
+
+
+@pytest.fixture
+def rgba():
+    rng = np.random.default_rng(3)
+    return rng.integers(0, 256, (9, 11, 4), dtype=np.uint8)
+
+
+def test_srgb_to_rgb_uint8_matches_loop(rgba):
+    np.testing.assert_array_equal(
+        srgb_to_rgb(rgba), _convert_loop(rgba, _srgb_to_rgb, 255)
+    )
+
+
+def test_rgb_to_srgb_uint8_matches_loop(rgba):
+    rgb = np.ascontiguousarray(rgba[..., :3])
+    np.testing.assert_array_equal(
+        rgb_to_srgb(rgb), _convert_loop(rgb, _rgb_to_srgb, 255)
+    )
+
+
+def test_uint16_matches_loop():
+    rng = np.random.default_rng(4)
+    img = rng.integers(0, 4096, (5, 6, 3), dtype=np.uint16)
+    np.testing.assert_array_equal(
+        srgb_to_rgb(img, max_value=4095), _convert_loop(img, _srgb_to_rgb, 4095)
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_float_images_use_formula(rgba, dtype):
+    img = rgba.astype(dtype) / 255
+    np.testing.assert_allclose(
+        srgb_to_rgb(img, max_value=1), _convert_loop(img, _srgb_to_rgb, 1), rtol=1e-6
+    )
+    rgb = np.ascontiguousarray(img[..., :3])
+    np.testing.assert_allclose(
+        rgb_to_srgb(rgb, max_value=1), _convert_loop(rgb, _rgb_to_srgb, 1), rtol=1e-6
+    )
+
+
+def test_out_of_range_values_raise():
+    img = np.full((2, 2, 3), 300, dtype=np.uint16)
+    with pytest.raises(ValueError):
+        srgb_to_rgb(img, max_value=255)
+
+
+def test_batch_matches_single(rgba):
+    stack = np.stack([rgba, rgba[::-1]])
+    dst = srgb_to_rgb_batch(stack)
+    np.testing.assert_array_equal(dst[0], srgb_to_rgb(rgba))
+    np.testing.assert_array_equal(dst[1], srgb_to_rgb(rgba[::-1]))
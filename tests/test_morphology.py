@@ -0,0 +1,90 @@
+import itertools
+
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.Morphology import (
+    AreaOpening,
+    CleanMask,
+    FillHoles,
+    StructuringElement,
+)
+
+
+@pytest.fixture
+def mask():
+    """大きさの異なる連結成分と，穴のある物体を描いた二値画像"""
+    img = np.zeros((60, 80), dtype=np.uint8)
+    img[5:7, 5:7] = 255  # 面積 4 の点
+    img[10:15, 60:70] = 255  # 面積 50
+    img[30:50, 10:30] = 255  # 面積 400 で，内側に穴がある
+    img[38:42, 18:22] = 0
+    # 画像の端に接した背景を囲む U 字型の物体
+    img[0:20, 30:32] = 255
+    img[0:20, 48:50] = 255
+    img[18:20, 30:50] = 255
+    return img
+
+
+def test_area_opening_removes_small_components(mask):
+    dst = AreaOpening(mask, min_area=50)
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    for label in range(1, n):
+        component = labels == label
+        expected = 255 if stats[label, cv2.CC_STAT_AREA] >= 50 else 0
+        assert (dst[component] == expected).all()
+    assert not dst[labels == 0].any()
+    assert dst[5, 5] == 0 and dst[12, 65] == 255
+
+
+def test_fill_holes_fills_only_enclosed_background(mask):
+    dst = FillHoles(mask)
+    # 物体に囲まれた穴は埋まる
+    assert (dst[38:42, 18:22] == 255).all()
+    # 画像の端に繋がった背景 (U 字の内側) は埋めない
+    assert not dst[0:18, 32:48].any()
+    np.testing.assert_array_equal(dst[mask > 0], 255)
+    assert np.count_nonzero(dst) == np.count_nonzero(mask) + 16
+
+
+@pytest.mark.parametrize(
+    "ksize, min_area, fill_holes",
+    list(itertools.product([0, 3], [0, 20], [False, True])),
+)
+def test_clean_mask_writes_to_dst(mask, ksize, min_area, fill_holes):
+    expected = CleanMask(mask, ksize=ksize, min_area=min_area, fill_holes=fill_holes)
+    dst = np.full(mask.shape, 7, dtype=np.uint8)
+    out = CleanMask(mask, ksize=ksize, min_area=min_area, fill_holes=fill_holes, dst=dst)
+    assert out is dst
+    np.testing.assert_array_equal(dst, expected)
+
+    # 入力と同じ配列を出力先にしてもよい
+    src = mask.copy()
+    out = CleanMask(src, ksize=ksize, min_area=min_area, fill_holes=fill_holes, dst=src)
+    assert out is src
+    np.testing.assert_array_equal(src, expected)
+
+
+def test_clean_mask_without_steps_copies_input(mask):
+    assert CleanMask(mask) is mask
+    dst = np.zeros_like(mask)
+    assert CleanMask(mask, dst=dst) is dst
+    np.testing.assert_array_equal(dst, mask)
+    with pytest.raises(ValueError):
+        CleanMask(np.dstack([mask] * 3))
+
+
+def test_structuring_element_is_cached_and_read_only():
+    kernel = StructuringElement(5, "RECT")
+    assert StructuringElement(5, "RECT") is kernel
+    assert not kernel.flags.writeable
+    np.testing.assert_array_equal(
+        kernel, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    )
+    with pytest.raises(ValueError):
+        kernel[0, 0] = 0
+    with pytest.raises(ValueError):
+        StructuringElement(0)
+    with pytest.raises(ValueError):
+        StructuringElement(3, "DISK")
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.CenterOfGravity import ObjectDtype
+from lib.utils.ImageProcessing.ObjectTracker import CentroidTracker
+
+
+def _objects(*points):
+    """重心位置だけを設定した `DetectObjects` の検出結果"""
+    objects = np.zeros(len(points), dtype=ObjectDtype)
+    for i, (cx, cy) in enumerate(points):
+        objects[i]["cx"], objects[i]["cy"] = cx, cy
+    return objects
+
+
+@pytest.mark.parametrize("method", ["nearest", "hungarian"])
+def test_ids_follow_objects_regardless_of_order(method):
+    tracker = CentroidTracker(method=method)
+    first = tracker.update(_objects((10, 10), (200, 100)))
+    a, b = first["track_id"]
+    for t in range(1, 6):
+        p, q = (10 + 8 * t, 10), (200 - 5 * t, 100 + 5 * t)
+        # 検出結果の順序はフレームごとに変わる
+        points = (p, q) if t % 2 else (q, p)
+        tracks = tracker.update(_objects(*points))
+        expected = (a, b) if t % 2 else (b, a)
+        assert tuple(tracks["track_id"]) == expected
+    assert tracker.predict(a) == pytest.approx((58, 10))
+
+
+@pytest.mark.parametrize("method", ["nearest", "hungarian"])
+def test_crossing_objects_keep_ids(method):
+    # すれ違う2つのオブジェクトは，前のフレームの位置ではなく速度で予測した位置で対応付ける
+    tracker = CentroidTracker(max_distance=30, method=method)
+    ids = None
+    for t in range(8):
+        tracks = tracker.update(_objects((40 + 10 * t, 50), (110 - 10 * t, 56)))
+        if ids is None:
+            ids = tuple(tracks["track_id"])
+        assert tuple(tracks["track_id"]) == ids
+    assert len(tracker.tracks) == 2
+
+
+def test_missed_frames_keep_id_until_max_missed():
+    tracker = CentroidTracker(max_missed=2)
+    (track_id,) = tracker.update(_objects((0, 0)))["track_id"]
+    tracker.update(_objects((10, 0)))
+    # 見失っている間は予測位置に進める
+    tracker.update(_objects())
+    tracker.update(_objects())
+    assert tracker.get(track_id)["missed"] == 2
+    (tracks,) = tracker.update(_objects((40, 0)))
+    assert tracks["track_id"] == track_id
+
+    for _ in range(3):
+        tracker.update(_objects())
+    assert tracker.get(track_id) is None
+    (tracks,) = tracker.update(_objects((80, 0)))
+    assert tracks["track_id"] != track_id
+
+
+def test_velocity_uses_timestamps():
+    tracker = CentroidTracker()
+    (track_id,) = tracker.update(_objects((0, 0)), timestamp=1.0)["track_id"]
+    tracker.update(_objects((5, 10)), timestamp=1.5)
+    track = tracker.get(track_id)
+    assert (track["vx"], track["vy"]) == pytest.approx((10, 20))
+    assert tracker.predict(track_id, dt=0.5) == pytest.approx((10, 20))
+
+
+def test_new_objects_get_new_ids():
+    tracker = CentroidTracker(max_distance=20)
+    first = tracker.update(_objects((0, 0)))
+    tracks = tracker.update(_objects((5, 0), (100, 100)))
+    assert tracks["track_id"][0] == first["track_id"][0]
+    assert tracks["track_id"][1] not in first["track_id"]
+    assert list(tracks["age"]) == [2, 1]
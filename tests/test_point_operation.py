@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib.utils.ImageProcessing.Binarization import GlobalThreshold
+from lib.utils.ImageProcessing.Contrast import Contrast_cvt
+from lib.utils.ImageProcessing.PointOperation import (
+    ApplyPointLUT,
+    CompilePointLUT,
+    IsPointOperation,
+)
+
+
+def _contrast_old(src, Color_Density):
+    """LUT をキャッシュする前の Contrast_cvt (線形濃度変換・ガンマ補正のみ)"""
+    if Color_Density == "Linear":
+        f, a = (lambda a, x: a * x), 0.7
+    elif Color_Density == "Non-Linear":
+        f, a = (lambda gamma, x: 255 * (x / 255) ** (1 / gamma)), 0.5
+    else:
+        return src
+    LUT = np.arange(256, dtype="uint8").reshape(-1, 1)
+    LUT = np.array([f(a, x).astype("uint8") for x in LUT])
+    return cv2.LUT(src, LUT)
+
+
+@pytest.fixture
+def gray():
+    return np.tile(np.arange(256, dtype=np.uint8), (4, 1))
+
+
+@pytest.mark.parametrize("Color_Density", ["None", "Linear", "Non-Linear"])
+def test_contrast_matches_old(gray, Color_Density):
+    np.testing.assert_array_equal(
+        Contrast_cvt(gray, Color_Density), _contrast_old(gray, Color_Density)
+    )
+
+
+@pytest.mark.parametrize("Color_Density", ["None", "Linear", "Non-Linear"])
+@pytest.mark.parametrize("invert", [False, True])
+def test_fused_global_threshold(gray, Color_Density, invert):
+    _, expected = GlobalThreshold(_contrast_old(gray, Color_Density), 100)
+    if invert:
+        expected = cv2.bitwise_not(expected)
+    lut = CompilePointLUT(Color_Density, "Global", LowerThreshold=100, invert=invert)
+    np.testing.assert_array_equal(ApplyPointLUT(gray, lut), expected)
+
+
+@pytest.mark.parametrize("Color_Density", ["None", "Linear", "Non-Linear"])
+def test_fused_two_threshold(gray, Color_Density):
+    contrast = _contrast_old(gray, Color_Density)
+    _, white = GlobalThreshold(contrast, 150)
+    _, black = GlobalThreshold(contrast, 10)
+    black = cv2.bitwise_not(black)
+
+    lut = CompilePointLUT(Color_Density, "Two", 10, 150, PickupColor=3)
+    np.testing.assert_array_equal(ApplyPointLUT(gray, lut), white)
+    lut = CompilePointLUT(Color_Density, "Two", 10, 150, PickupColor=4)
+    np.testing.assert_array_equal(ApplyPointLUT(gray, lut), black)
+
+
+def test_non_point_operations_are_rejected():
+    assert not IsPointOperation("Histogram-Flatten")
+    with pytest.raises(ValueError):
+        CompilePointLUT("Histogram-Flatten", "Global")
+    with pytest.raises(ValueError):
+        CompilePointLUT("None", "Two", PickupColor=0)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+# Camera.py は GUI の PySimpleGUI を読み込む
+pytest.importorskip("PySimpleGUI")
+
+from lib.utils.sweep_utils import ParameterGrid, RunSweep
+
+
+def _images():
+    """位置が少しずつずれた明るい正方形の画像と正解マスク"""
+    rng = np.random.default_rng(5)
+    images, masks = [], []
+    for i in range(4):
+        img = rng.integers(20, 60, (120, 160, 3), dtype=np.uint8)
+        mask = np.zeros((120, 160), dtype=np.uint8)
+        x, y = 30 + 4 * i, 40 + 3 * (i % 2)
+        img[y : y + 30, x : x + 30] = 200
+        mask[y : y + 30, x : x + 30] = 255
+        images.append(img)
+        masks.append(mask)
+    return images, masks
+
+
+def test_parameter_grid_order():
+    grid = ParameterGrid({"a": [1, 2], "b": ["x", "y"]})
+    assert grid == [
+        {"a": 1, "b": "x"},
+        {"a": 1, "b": "y"},
+        {"a": 2, "b": "x"},
+        {"a": 2, "b": "y"},
+    ]
+
+
+def test_cog_std_rejects_inverted_masks():
+    images, masks = _images()
+    grid = {
+        "Color_Space": ["Gray"],
+        "Binarization": ["Otsu"],
+        # 0 の場合は反転され，背景全体が前景になる
+        "background_color": [0, 1],
+    }
+    ranking = RunSweep(images, grid, masks=masks, objective="cog_std", max_workers=1)
+    best = ranking[0]
+    assert best["params"]["background_color"] == 1
+    assert best["iou"] > 0.9
+    assert best["found"] == len(images)
+    # 反転したマスクは前景の割合が大きすぎるため，重心が求まった画像として数えない
+    inverted = ranking[1]
+    assert inverted["fg_ratio"] > 0.5
+    assert inverted["found"] == 0
+
+
+def test_iou_objective_requires_masks():
+    images, _ = _images()
+    with pytest.raises(ValueError):
+        RunSweep(images, {"Binarization": ["Otsu"]}, objective="iou")
@@ -0,0 +1,102 @@
+import queue
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+# Camera.py は GUI の PySimpleGUI を読み込む
+pytest.importorskip("PySimpleGUI")
+
+from lib.DobotFunction import Camera
+
+
+class _FakeCapture(object):
+    """`frames` に値を入れるたびに，その値で塗りつぶしたフレームを1枚返すカメラ"""
+
+    def __init__(self, device_num):
+        self.frames = queue.Queue()
+        self._value = 0
+
+    def set(self, prop, value):
+        return True
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        value = self.frames.get()
+        if value is None:  # カメラが切断された
+            return False
+        self._value = value
+        return True
+
+    def retrieve(self, image=None):
+        if image is None:
+            image = np.empty((4, 6, 3), dtype=np.uint8)
+        image[:] = self._value
+        return True, image
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def wrapper(monkeypatch):
+    monkeypatch.setattr(cv2, "VideoCapture", _FakeCapture)
+    wrapper = Camera.VideoCaptureWrapper(0)
+    assert wrapper.isError() == 0
+    yield wrapper
+    wrapper.cam.frames.put(None)
+    wrapper.release()
+
+
+def test_read_next_times_out_without_new_frame(wrapper):
+    assert wrapper.read() == (False, None)
+    start = time.monotonic()
+    assert wrapper.read_next(timeout=0.05) == (False, None)
+    assert 0.04 <= time.monotonic() - start < 1.0
+
+    wrapper.cam.frames.put(1)
+    ret, frame = wrapper.read_next(timeout=1.0)
+    assert ret and frame[0, 0, 0] == 1
+    # 既に読み込んだフレームは返さずに待つ
+    assert wrapper.read_next(timeout=0.05) == (False, None)
+    assert wrapper.seq == 1
+
+
+def test_read_next_returns_frames_in_sequence_order(wrapper):
+    seqs, stamps = [], []
+    for value in (1, 2, 3, 4, 5):
+        wrapper.cam.frames.put(value)
+        ret, frame = wrapper.read_next(timeout=1.0)
+        assert ret and frame[0, 0, 0] == value
+        seqs.append(wrapper.seq)
+        stamps.append(wrapper.timestamp)
+    assert seqs == [1, 2, 3, 4, 5]
+    assert stamps == sorted(stamps)
+
+    # 読み込みが遅れた場合は途中のフレームを飛ばして最新のフレームを返す
+    for value in (6, 7, 8):
+        wrapper.cam.frames.put(value)
+    ret, frame = wrapper.read_next(after_seq=7, timeout=1.0)
+    assert ret and frame[0, 0, 0] == 8
+    assert wrapper.seq == 8
+    ret, frame = wrapper.read_next(after_seq=5, timeout=1.0)
+    assert ret and frame[0, 0, 0] == 8
+
+
+def test_read_without_copy_returns_read_only_view(wrapper):
+    wrapper.cam.frames.put(3)
+    ret, frame = wrapper.read_next(copy=False)
+    assert ret and not frame.flags.writeable
+    ret, copied = wrapper.read()
+    assert ret and copied.flags.writeable
+    assert copied is not frame
+
+
+def test_read_next_returns_when_camera_stops(wrapper):
+    wrapper.cam.frames.put(None)
+    start = time.monotonic()
+    assert wrapper.read_next(timeout=5.0) == (False, None)
+    assert time.monotonic() - start < 1.0